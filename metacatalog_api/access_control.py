@@ -1,5 +1,7 @@
 import hashlib
 import logging
+import threading
+import time
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship, Session, select
 from random import choice
@@ -24,13 +26,72 @@ class UserTokenTable(UserTokenBase, table=True):
 
 
 class UserToken(UserTokenBase):
+    id: int | None = None
     user: Author |  None = None
 
 
+class TokenCache:
+    """
+    In-process TTL cache of token hash -> UserToken. Unknown tokens are cached as
+    well (negative caching) for a shorter time, thus repeated bad keys do not hit
+    the database either. The expiry of a token is checked on every lookup, while
+    revoked tokens vanish from other processes once their ttl passed.
+    """
+    def __init__(self, ttl: float = 60, negative_ttl: float = 10, max_items: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_items = max_items
+        self._data: dict[str, tuple[UserToken | None, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str) -> tuple[bool, UserToken | None]:
+        """Returns (found, token). A found token of None is a cached invalid key"""
+        with self._lock:
+            cached = self._data.get(token_hash)
+            if cached is None:
+                return False, None
+            token, expires = cached
+            if expires < time.monotonic():
+                del self._data[token_hash]
+                return False, None
+
+        if token is not None and token.valid_until is not None and token.valid_until < datetime.now():
+            return True, None
+        return True, token
+
+    def set(self, token_hash: str, token: UserToken | None) -> None:
+        ttl = self.ttl if token is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if len(self._data) >= self.max_items:
+                # drop expired entries first, then the oldest ones
+                now = time.monotonic()
+                for key in [k for k, (_, expires) in self._data.items() if expires < now]:
+                    del self._data[key]
+                while len(self._data) >= self.max_items:
+                    del self._data[next(iter(self._data))]
+            self._data[token_hash] = (token, time.monotonic() + ttl)
+
+    def invalidate(self, token_hash: str | None = None) -> None:
+        with self._lock:
+            if token_hash is None:
+                self._data.clear()
+            else:
+                self._data.pop(token_hash, None)
+
+
+token_cache = TokenCache()
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
 def register_new_token(session: Session, user: Author | None, valid_until: datetime | None = None) -> str:
     #new_key = Fernet.generate_key().decode()
     new_key = 'k' + ''.join(choice(ascii_letters + digits) for i in range(31))
-    token_hash = hashlib.sha256(new_key.encode('utf-8')).hexdigest()
+    token_hash = hash_token(new_key)
 
     token = UserTokenTable(
         user_id=user.id if user is not None else None,
@@ -43,20 +104,53 @@ def register_new_token(session: Session, user: Author | None, valid_until: datet
     return new_key 
 
 
-def validate_token(session: Session, token: str) -> UserToken | None:
-    token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
-    logger.info(f"🔍 Validating token hash: {token_hash[:16]}...")
+def validate_token(session: Session, token: str) -> UserTokenTable | None:
+    token_hash = hash_token(token)
+    logger.debug(f"Validating token hash: {token_hash[:16]}...")
     
     user_token = session.exec(select(UserTokenTable).where(UserTokenTable.token_hash == token_hash)).first()
     
-    if user_token:
-        logger.info(f"✅ Token found in database: ID {user_token.id}")
-    else:
-        logger.info(f"❌ Token not found in database")
+    if user_token is None:
+        logger.debug("Token not found in database")
+        return None
     
+    if user_token.valid_until is not None and user_token.valid_until < datetime.now():
+        logger.debug(f"Token ID {user_token.id} expired at {user_token.valid_until}")
+        return None
+    
+    logger.debug(f"Token found in database: ID {user_token.id}")
     return user_token
 
 
+def load_token(session: Session, token: str) -> UserToken | None:
+    """Validate the token and return it as a model that is independent of the session"""
+    user_token = validate_token(session, token)
+    if user_token is None:
+        return None
+    
+    return UserToken(
+        id=user_token.id,
+        token_hash=user_token.token_hash,
+        created_at=user_token.created_at,
+        valid_until=user_token.valid_until,
+        user=Author.model_validate(user_token.user) if user_token.user is not None else None
+    )
+
+
+def revoke_token(session: Session, token: str) -> bool:
+    """Delete the token. Other processes drop it from their token_cache after the cache ttl"""
+    token_hash = hash_token(token)
+    user_token = session.exec(select(UserTokenTable).where(UserTokenTable.token_hash == token_hash)).first()
+    token_cache.invalidate(token_hash)
+    
+    if user_token is None:
+        return False
+    
+    session.delete(user_token)
+    session.commit()
+    return True
+
+
 def is_development_mode(server=None) -> bool:
     """Check if we're running in development mode"""
     if server is None:
@@ -123,7 +217,7 @@ def get_or_create_admin_token(session: Session, server=None) -> str:
             logger.info(f"⚠️  Environment token not found in database, adding it to make it valid...")
             # Add the environment token to the database to make it valid
             admin_user = create_or_get_admin_user(session)
-            token_hash = hashlib.sha256(env_token.encode('utf-8')).hexdigest()
+            token_hash = hash_token(env_token)
             
             token = UserTokenTable(
                 user_id=admin_user.id,
@@ -131,6 +225,8 @@ def get_or_create_admin_token(session: Session, server=None) -> str:
             )
             session.add(token)
             session.commit()
+            # the token may have been cached as invalid before
+            token_cache.invalidate(token_hash)
             logger.info(f"✅ Environment token added to database and is now valid")
             return env_token
     
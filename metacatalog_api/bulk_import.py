@@ -0,0 +1,185 @@
+"""
+Bulk loader for initial catalog loads from JSONL or CSV files.
+
+Every line is validated as a EntryCreate and streamed with COPY into a
+temporary staging table. Foreign keys (persons by id, ORCID or name, licenses,
+variables, keywords, datasource types and groups) are resolved with set based
+SQL and all tables are filled with one INSERT each, see sql/import_entries.sql.
+Geometries, timestamps and numbers are checked before the INSERTs cast them,
+thus lines with errors are skipped and reported, everything else is imported
+in one transaction.
+
+JSONL files contain one EntryCreate per line. CSV files have one column per
+EntryCreate field; cells starting with '{' or '[' are parsed as JSON, author
+and license may be given as id and keywords and coAuthors as ';' separated ids.
+"""
+from typing import Iterator, Literal
+from pathlib import Path
+from uuid import uuid4
+import csv
+import io
+import json
+
+from pydantic import BaseModel, ValidationError
+from sqlmodel import Session, text
+
+from metacatalog_api import models
+from metacatalog_api.db import load_sql
+
+
+# columns of the CSV format holding ';' separated lists of ids
+CSV_LIST_COLUMNS = ('keywords', 'coAuthors', 'groups')
+
+
+class EntryImportError(BaseModel):
+    line: int
+    title: str | None = None
+    error: str
+
+
+class EntryImportReport(BaseModel):
+    path: str
+    dry_run: bool
+    total: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[EntryImportError] = []
+
+
+def _csv_value(column: str, value: str):
+    value = value.strip()
+    if value == '':
+        return None
+    if value[0] in '{[':
+        return json.loads(value)
+    if column in CSV_LIST_COLUMNS:
+        return [int(v) if v.strip().isdigit() else v.strip() for v in value.split(';') if v.strip()]
+    if column in ('author', 'license', 'variable') and value.isdigit():
+        return int(value)
+    return value
+
+
+def read_records(path: str | Path, format: Literal['jsonl', 'csv'] = None) -> Iterator[tuple[int, dict | Exception]]:
+    """
+    Yield the line number and the raw record of every entry in the file. Lines that can't
+    be parsed are yielded with the exception instead of the record.
+    The format is derived from the file extension, if not given.
+    """
+    path = Path(path)
+    if format is None:
+        format = 'csv' if path.suffix.lower() == '.csv' else 'jsonl'
+
+    with open(path, 'r', newline='' if format == 'csv' else None, encoding='utf-8') as f:
+        if format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                try:
+                    yield reader.line_num, {col: _csv_value(col, val) for col, val in row.items() if col is not None and val is not None}
+                except ValueError as e:
+                    yield reader.line_num, e
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip() == '':
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, e
+
+
+def _strip_coordinates(coordinates):
+    # the GeoJSON models carry an optional third coordinate, PostGIS does not accept null
+    if isinstance(coordinates, list):
+        return [_strip_coordinates(c) for c in coordinates if c is not None]
+    return coordinates
+
+
+def _staging_document(payload: models.EntryCreate) -> str:
+    doc = payload.model_dump(mode='json', exclude_none=True)
+    if 'location' in doc:
+        doc['location']['coordinates'] = _strip_coordinates(doc['location']['coordinates'])
+    spatial_scale = doc.get('datasource', {}).get('spatial_scale', {})
+    if 'extent' in spatial_scale:
+        spatial_scale['extent']['coordinates'] = _strip_coordinates(spatial_scale['extent']['coordinates'])
+    return json.dumps(doc)
+
+
+def _validation_error(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return '; '.join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+def iter_staging_rows(records: Iterator[tuple[int, dict | Exception]], report: EntryImportReport) -> Iterator[bytes]:
+    """Validate the records and yield the valid ones as CSV rows of the import_entries staging table"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    for line_no, record in records:
+        report.total += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            payload = models.EntryCreate.model_validate(record)
+        except (ValidationError, ValueError) as e:
+            title = record.get('title') if isinstance(record, dict) else None
+            report.errors.append(EntryImportError(line=line_no, title=title, error=_validation_error(e)))
+            continue
+
+        writer.writerow([line_no, str(uuid4()), _staging_document(payload)])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class _RowStream(io.RawIOBase):
+    """File-like object reading from an iterator of rows, as expected by COPY FROM STDIN"""
+    def __init__(self, rows: Iterator[bytes]):
+        self._rows = rows
+        self._buffer = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer.extend(row)
+        if size < 0:
+            size = len(self._buffer)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+
+
+def copy_staging_rows(session: Session, rows: Iterator[bytes]) -> None:
+    """Stream the rows into the import_entries staging table on the connection of the session"""
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert("COPY import_entries (line_no, uuid, doc) FROM STDIN WITH (FORMAT csv)", _RowStream(rows))
+    finally:
+        cursor.close()
+
+
+def import_entries(session: Session, path: str | Path, format: Literal['jsonl', 'csv'] = None, dry_run: bool = False, schema: str = 'public') -> EntryImportReport:
+    """
+    Import all entries of a JSONL or CSV file. Lines that are not valid, reference missing
+    records or hold values the database cannot cast (GeoJSON, timestamps, numbers) are
+    reported and skipped. Nothing is committed, the caller commits the transaction or
+    rolls it back for a dry run.
+    """
+    report = EntryImportReport(path=str(path), dry_run=dry_run)
+
+    session.exec(text(load_sql('import_staging.sql')))
+    copy_staging_rows(session, iter_staging_rows(read_records(path, format=format), report))
+    session.exec(text(load_sql('import_entries.sql').format(schema=schema)))
+
+    failed = session.exec(text("SELECT line_no, doc->>'title', error FROM import_entries WHERE error IS NOT NULL")).all()
+    report.errors.extend(EntryImportError(line=line_no, title=title, error=error) for line_no, title, error in failed)
+    report.errors.sort(key=lambda e: e.line)
+    report.failed = len(report.errors)
+    report.imported = report.total - report.failed
+
+    return report
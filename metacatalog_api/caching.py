@@ -0,0 +1,644 @@
+from typing import Any, Callable, Dict, Iterable, Literal
+from collections import OrderedDict
+from pathlib import Path
+from datetime import datetime
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
+import threading
+import json
+import tempfile
+import time
+import os
+
+from pydantic import PrivateAttr
+from pydantic_core import to_json
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlmodel import text
+
+logger = logging.getLogger('uvicorn.error')
+
+
+def _sizeof(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    elif isinstance(value, str):
+        return len(value.encode('utf-8'))
+    elif isinstance(value, CachedResponse):
+        return len(value.body)
+    return 1
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded least recently used cache. The cache is bounded
+    by the number of items and the total size of the values in bytes.
+    Hits, misses and evictions are counted and can be read via stats().
+    """
+    def __init__(self, max_items: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Any, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][0]
+
+    def set(self, key: Any, value: Any) -> None:
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+
+            # values larger than the whole cache are not stored at all
+            if size > self.max_bytes:
+                return
+
+            self._data[key] = (value, size)
+            self._bytes += size
+
+            while len(self._data) > self.max_items or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+
+    def invalidate(self, predicate: Callable[[Any], bool]) -> int:
+        """Remove all keys for which predicate(key) is True. Returns the number of removed keys"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self._bytes -= self._data.pop(key)[1]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'items': len(self._data),
+                'bytes': self._bytes,
+                'max_items': self.max_items,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class ExportCache(BaseSettings):
+    """
+    Cache for rendered metadata exports. Rendered documents are kept in an in-memory
+    LRU and, if a disk_directory is configured, in an on-disk tier that survives
+    restarts and is shared between workers. Keys are derived from the entry id,
+    the export format, the lastUpdate of the entry and a hash of the template, thus
+    changed entries and changed templates never hit stale documents.
+    """
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_EXPORT_CACHE_")
+
+    enabled: bool = True
+    max_items: int = 2048
+    max_bytes: int = 64 * 1024 * 1024
+    disk_directory: Path | None = None
+
+    _memory: LRUCache = PrivateAttr()
+    _disk_hits: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+
+        self._memory = LRUCache(max_items=self.max_items, max_bytes=self.max_bytes)
+        self._disk_hits = 0
+
+        if self.disk_directory is not None:
+            self.disk_directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(entry_id: int, format_name: str, last_update: datetime | None, template_hash: str = '') -> str:
+        stamp = last_update.isoformat() if last_update is not None else ''
+        digest = hashlib.sha256(f"{entry_id}|{format_name}|{stamp}|{template_hash}".encode('utf-8')).hexdigest()
+        return f"{entry_id}-{digest[:32]}"
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_directory / f"{key}.export"
+
+    def get(self, key: str) -> str | None:
+        if not self.enabled:
+            return None
+
+        content = self._memory.get(key)
+        if content is not None or self.disk_directory is None:
+            return content
+
+        # check the disk tier and promote the document into memory
+        try:
+            content = self._disk_path(key).read_text(encoding='utf-8')
+        except OSError:
+            return None
+        self._disk_hits += 1
+        self._memory.set(key, content)
+        return content
+
+    def set(self, key: str, content: str) -> None:
+        if not self.enabled:
+            return
+
+        self._memory.set(key, content)
+
+        if self.disk_directory is not None:
+            # write to a temporary file first, so that concurrent readers never see partial documents
+            fd, tmp_name = tempfile.mkstemp(dir=self.disk_directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp_name, self._disk_path(key))
+            except OSError:
+                Path(tmp_name).unlink(missing_ok=True)
+
+    def invalidate(self, entry_id: int | list[int]) -> None:
+        """Drop all cached exports of the given entries"""
+        entry_ids = entry_id if isinstance(entry_id, (list, tuple, set)) else [entry_id]
+        prefixes = tuple(f"{id_}-" for id_ in entry_ids)
+
+        self._memory.invalidate(lambda key: key.startswith(prefixes))
+
+        if self.disk_directory is not None:
+            for prefix in prefixes:
+                for path in self.disk_directory.glob(f"{prefix}*.export"):
+                    path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self.disk_directory is not None:
+            for path in self.disk_directory.glob("*.export"):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._memory.stats(), 'disk_hits': self._disk_hits, 'disk_directory': str(self.disk_directory) if self.disk_directory else None}
+
+
+class LookupCache(BaseSettings):
+    """
+    Cache for the small, near-static lookup tables like licenses, variables, datasource types
+    and group types. Every cached value is stamped with the change counters of the tables it
+    was loaded from (see the table_versions table). The counters are read at most every
+    check_interval seconds, or by keep_fresh in the background, thus cached values are served
+    without a database round trip and are outdated by no more than check_interval seconds.
+    The JSON serialization of the values is cached alongside.
+    """
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_LOOKUP_CACHE_")
+
+    enabled: bool = True
+    check_interval: float = 5.0
+    max_items: int = 512
+
+    _memory: LRUCache = PrivateAttr()
+    _versions: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _checked: float = PrivateAttr(default=0.0)
+    _versions_loader: Callable[[], Dict[str, int]] | None = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr()
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._memory = LRUCache(max_items=self.max_items)
+        self._lock = threading.Lock()
+
+    def bind(self, versions_loader: Callable[[], Dict[str, int]]) -> None:
+        """Set the function loading the change counters of all tables"""
+        self._versions_loader = versions_loader
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """Return the change counters, they are re-read if older than check_interval"""
+        if force or time.monotonic() - self._checked > self.check_interval:
+            versions = self._versions_loader()
+            with self._lock:
+                self._versions = versions
+                self._checked = time.monotonic()
+        return self._versions
+
+    def table_versions(self, tables: tuple[str, ...] | list[str]) -> Dict[str, int]:
+        versions = self.refresh()
+        return {table: versions.get(table, 0) for table in tables}
+
+    def get(self, key: tuple, tables: tuple[str, ...], load: Callable[[], Any], as_json: bool = False) -> Any:
+        """
+        Return the cached value of the key, if none of the tables changed since it was loaded.
+        Otherwise the value is loaded again. With as_json the serialized value is returned.
+        """
+        if not self.enabled or self._versions_loader is None:
+            value = load()
+            return to_json(value) if as_json else value
+
+        # the counters are read before the value, thus a value is never stamped newer than it is
+        stamp = tuple(sorted(self.table_versions(tables).items()))
+        cached = self._memory.get(key)
+        if cached is None or cached[0] != stamp:
+            value = load()
+            cached = (stamp, value, to_json(value))
+            self._memory.set(key, cached)
+        return cached[2] if as_json else cached[1]
+
+    async def keep_fresh(self) -> None:
+        """Re-read the change counters every check_interval seconds, run as a task of the server"""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh, True)
+            except Exception as e:
+                logger.warning(f"Reading the table versions failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._checked = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._memory.stats(), 'versions': dict(self._versions)}
+
+
+class CachedResponse:
+    def __init__(self, status_code: int, headers: list[list[str]], body: bytes, tags: list[str], expires_at: float):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.tags = tags
+        # wall clock timestamp, as the SQL backend shares it between processes
+        self.expires_at = expires_at
+
+
+class MemoryResponseBackend:
+    """Responses of this process in a LRUCache, with an index of the keys by tag"""
+    def __init__(self, max_items: int, max_bytes: int):
+        self._memory = LRUCache(max_items=max_items, max_bytes=max_bytes)
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedResponse | None:
+        response = self._memory.get(key)
+        if response is not None and response.expires_at < time.time():
+            self._memory.pop(key)
+            return None
+        return response
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        self._memory.set(key, response)
+        with self._lock:
+            for tag in response.tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            # the index still holds keys evicted by the LRU, rebuild it once it grew too large
+            if sum(len(keys) for keys in self._tags.values()) > 4 * self._memory.max_items:
+                index: Dict[str, set] = {}
+                for k, (cached, _) in list(self._memory._data.items()):
+                    for tag in cached.tags:
+                        index.setdefault(tag, set()).add(k)
+                self._tags = index
+
+    def invalidate(self, tags: list[str]) -> int:
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.pop(tag, ()))
+        removed = 0
+        for key in keys:
+            if key in self._memory:
+                self._memory.pop(key)
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tags.clear()
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._memory.stats()
+        return {'items': stats['items'], 'bytes': stats['bytes'], 'max_items': stats['max_items'], 'max_bytes': stats['max_bytes'], 'lru_evictions': stats['evictions']}
+
+
+class SQLResponseBackend:
+    """Responses in the response_cache table, shared by all workers using the same database"""
+    def __init__(self, connect: Callable, purge_interval: float = 600):
+        self._connect = connect
+        self.purge_interval = purge_interval
+        self._last_purge = time.monotonic()
+        self.expired = 0
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._connect() as session:
+            row = session.exec(
+                text("SELECT status_code, headers, body, tags, EXTRACT(EPOCH FROM expires_at) FROM response_cache WHERE key = :key AND expires_at > now()"),
+                params={'key': key}
+            ).first()
+        if row is None:
+            return None
+        return CachedResponse(row[0], row[1], bytes(row[2]), row[3], float(row[4]))
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        with self._connect() as session:
+            session.exec(text("""
+                INSERT INTO response_cache (key, tags, status_code, headers, body, expires_at) VALUES (:key, :tags, :status_code, :headers, :body, to_timestamp(:expires_at))
+                ON CONFLICT (key) DO UPDATE SET tags = excluded.tags, status_code = excluded.status_code, headers = excluded.headers, body = excluded.body, expires_at = excluded.expires_at
+            """), params={
+                'key': key,
+                'tags': list(response.tags),
+                'status_code': response.status_code,
+                'headers': json.dumps(response.headers),
+                'body': response.body,
+                'expires_at': response.expires_at
+            })
+            if time.monotonic() - self._last_purge > self.purge_interval:
+                self._last_purge = time.monotonic()
+                self.expired += session.exec(text("DELETE FROM response_cache WHERE expires_at < now()")).rowcount
+            session.commit()
+
+    def invalidate(self, tags: list[str]) -> int:
+        with self._connect() as session:
+            removed = session.exec(text("DELETE FROM response_cache WHERE tags && :tags"), params={'tags': list(tags)}).rowcount
+            session.commit()
+        return removed
+
+    def clear(self) -> None:
+        with self._connect() as session:
+            session.exec(text("DELETE FROM response_cache"))
+            session.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as session:
+            items, size = session.exec(text("SELECT count(*), COALESCE(sum(length(body)), 0) FROM response_cache WHERE expires_at > now()")).one()
+        return {'items': items, 'bytes': int(size), 'expired': self.expired}
+
+
+class ResponseCache(BaseSettings):
+    """
+    Cache for complete responses of the read routes, see the response_cache module.
+    Responses are tagged, i.e. by the ids of the entries they contain, and the write
+    paths of core invalidate the tags they touched. The memory backend is local to
+    the process, other workers and CLI imports reach it after ttl seconds at the latest.
+    The sql backend is shared by all processes and invalidated for all of them.
+    Thus, the cache is only enabled by default with the sql backend, the memory backend
+    needs METACATALOG_RESPONSE_CACHE_ENABLED=true and should only be used with one worker.
+    """
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_RESPONSE_CACHE_")
+
+    # None enables the cache for the sql backend only
+    enabled: bool | None = None
+    backend: Literal['memory', 'sql'] = 'memory'
+    ttl: float = 300
+    max_items: int = 4096
+    max_bytes: int = 128 * 1024 * 1024
+    # larger responses are not cached
+    max_response_size: int = 2 * 1024 * 1024
+
+    _backend: Any = PrivateAttr(default=None)
+    _connect: Callable | None = PrivateAttr(default=None)
+    _counters: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr()
+    _generation: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidated': 0}
+        self._generation = 0
+        if self.enabled is None:
+            self.enabled = self.backend == 'sql'
+
+    def bind(self, connect: Callable) -> None:
+        """Set the session factory of the sql backend"""
+        self._connect = connect
+
+    @property
+    def is_local(self) -> bool:
+        return self.backend == 'memory'
+
+    @property
+    def generation(self) -> int:
+        """Counted up by every invalidation of this process"""
+        return self._generation
+
+    def _get_backend(self):
+        if self._backend is None:
+            if self.backend == 'sql':
+                self._backend = SQLResponseBackend(self._connect)
+            else:
+                self._backend = MemoryResponseBackend(max_items=self.max_items, max_bytes=self.max_bytes)
+        return self._backend
+
+    def _count(self, counter: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += value
+
+    def get(self, key: str) -> CachedResponse | None:
+        response = self._get_backend().get(key)
+        self._count('hits' if response is not None else 'misses')
+        return response
+
+    def set(self, key: str, status_code: int, headers: list[list[str]], body: bytes, tags: Iterable[str], generation: int = None) -> None:
+        """
+        Store a response. Responses built before the generation of an invalidation may
+        contain outdated data and are not stored.
+        """
+        if len(body) > self.max_response_size or (generation is not None and generation != self._generation):
+            return
+        self._get_backend().set(key, CachedResponse(status_code, headers, body, sorted(tags), time.time() + self.ttl))
+        self._count('stores')
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Drop all responses carrying any of the tags"""
+        tags = list(tags)
+        if not self.enabled or len(tags) == 0:
+            return
+        with self._lock:
+            self._generation += 1
+        self._count('invalidated', self._get_backend().invalidate(tags))
+
+    def clear(self) -> None:
+        if self.enabled:
+            with self._lock:
+                self._generation += 1
+            self._get_backend().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'backend': self.backend,
+            **counters,
+            'hit_ratio': counters['hits'] / lookups if lookups > 0 else None,
+            **self._get_backend().stats()
+        }
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable version of call arguments, to be used in the keys of SingleFlight"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(BaseSettings):
+    """
+    Coalescing of identical concurrent calls. The first call of a key executes, calls of the
+    same key arriving while it runs wait for it and share its result, or its exception.
+    Nothing is kept after the call returned, thus the results are as fresh as without
+    coalescing. The shared results must not be changed by the callers.
+    Sync calls wait at most timeout seconds for the running call, then they execute on their own.
+    """
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_SINGLE_FLIGHT_")
+
+    enabled: bool = True
+    timeout: float = 30.0
+
+    _flights: Dict[Any, _Flight] = PrivateAttr(default_factory=dict)
+    _tasks: Dict[Any, asyncio.Task] = PrivateAttr(default_factory=dict)
+    _counters: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr()
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'executed': 0, 'coalesced': 0, 'timeouts': 0}
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def call(self, key: Any, func: Callable, *args, **kwargs) -> Any:
+        """Call func, or wait for the running call of the same key and return its result"""
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        with self._lock:
+            self._counters['calls'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counters['executed'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            if flight.done.wait(self.timeout):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            self._count('timeouts')
+            return func(*args, **kwargs)
+
+        try:
+            flight.result = func(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    async def acall(self, key: Any, func: Callable, *args, **kwargs) -> Any:
+        """
+        Async variant of call, functions that are not coroutine functions run in a thread.
+        The call runs as a task of its own, thus a cancelled caller does not cancel it for the others.
+        """
+        async def run():
+            if inspect.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+        if not self.enabled:
+            return await run()
+
+        # tasks belong to one event loop
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = asyncio.ensure_future(run())
+            self._tasks[task_key] = task
+
+            def done(finished: asyncio.Task) -> None:
+                if self._tasks.get(task_key) is finished:
+                    del self._tasks[task_key]
+                # all callers may be gone, the exception is retrieved anyway
+                if not finished.cancelled():
+                    finished.exception()
+            task.add_done_callback(done)
+            self._count('executed')
+        else:
+            self._count('coalesced')
+        self._count('calls')
+        return await asyncio.shield(task)
+
+    def forget(self) -> None:
+        """
+        Let new calls execute on their own, instead of waiting for the running calls.
+        Used after writes, as the running calls may have read the data before the change.
+        """
+        with self._lock:
+            self._flights.clear()
+            self._tasks.clear()
+
+    def coalesce(self, func: Callable) -> Callable:
+        """Decorator coalescing the concurrent calls of func with equal arguments"""
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return self.call((func.__qualname__, _freeze(bound.arguments)), func, *args, **kwargs)
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = len(self._flights)
+        return {
+            **counters,
+            'in_flight': in_flight + len(self._tasks),
+            'coalesced_ratio': counters['coalesced'] / counters['calls'] if counters['calls'] > 0 else None
+        }
@@ -0,0 +1,170 @@
+"""
+Live entry changes for the /changes/stream Server-Sent Events endpoint.
+
+The triggers of the entry_changes log NOTIFY the entry_changes channel on every
+change. Each server process holds one listening connection, wakes up on the
+notifications and reads the new changes from the change feed, which are fanned
+out to all subscribers of the process. The feed is also read every poll_interval
+seconds, thus changes are delivered if a notification is lost or the listening
+connection is down. Subscribers that fall behind by more than queue_size pages
+are disconnected and resume from their last token.
+"""
+from typing import AsyncIterator
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from metacatalog_api import core
+from metacatalog_api import models
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class ChangeBroadcaster:
+    def __init__(self, channel: str = 'entry_changes', poll_interval: float = 5.0, keepalive: float = 15.0, queue_size: int = 100, page_size: int = 1000):
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self.page_size = page_size
+
+        self.token: str | None = None
+        self.subscribers: set[asyncio.Queue] = set()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._connection = None
+
+    async def start(self) -> None:
+        """Start listening, the first subscriber starts the broadcaster of its event loop"""
+        if self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._close_listener()
+        for queue in list(self.subscribers):
+            self._disconnect(queue)
+
+    def _connect(self):
+        # a dedicated connection, detached from the pool as it listens as long as the server runs
+        connection = core.get_engine().raw_connection()
+        connection.detach()
+        dbapi_connection = connection.dbapi_connection
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel}")
+        return dbapi_connection
+
+    def _on_notify(self) -> None:
+        try:
+            self._connection.poll()
+            self._connection.notifies.clear()
+        except Exception as e:
+            logger.warning(f"Listening for entry changes failed, polling every {self.poll_interval}s: {e}")
+            self._close_listener()
+        self._wake.set()
+
+    def _close_listener(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._connection.fileno())
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+    async def _run(self) -> None:
+        self.token = None
+        while True:
+            if self._connection is None:
+                try:
+                    self._connection = await run_in_threadpool(self._connect)
+                    asyncio.get_running_loop().add_reader(self._connection.fileno(), self._on_notify)
+                except Exception as e:
+                    logger.warning(f"Can't listen for entry changes, polling every {self.poll_interval}s: {e}")
+                    self._connection = None
+
+            try:
+                await self._publish()
+            except Exception as e:
+                logger.error(f"Reading the entry changes failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _publish(self) -> None:
+        if self.token is None:
+            # changes before the broadcaster started are read from the feed by the subscribers
+            self.token = (await run_in_threadpool(core.changes, since='now')).next
+        while True:
+            feed = await run_in_threadpool(core.changes, since=self.token, limit=self.page_size)
+            self.token = feed.next
+            if len(feed.changes) > 0:
+                for queue in list(self.subscribers):
+                    try:
+                        queue.put_nowait(feed)
+                    except asyncio.QueueFull:
+                        logger.info("Disconnected a change stream subscriber that fell behind")
+                        self._disconnect(queue)
+            if not feed.has_more:
+                return
+
+    def _disconnect(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def subscribe(self, since: str | None = None) -> AsyncIterator[models.ChangeFeed | None]:
+        """
+        Yield a ChangeFeed page for every batch of changes, None as keepalive. With a since
+        token, the changes after it are read from the feed first. Pages may be delivered twice
+        around the switch from the feed to the live changes, but none is left out.
+        """
+        await self.start()
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+
+        try:
+            # the queue buffers the live changes while catching up
+            position = None
+            if since is not None:
+                while True:
+                    feed = await run_in_threadpool(core.changes, since=since, limit=self.page_size)
+                    since = feed.next
+                    if len(feed.changes) > 0:
+                        yield feed
+                    if not feed.has_more:
+                        break
+                position = core.decode_change_token(since)
+
+            while True:
+                try:
+                    feed = await asyncio.wait_for(queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if feed is None:
+                    return
+                if position is not None and core.decode_change_token(feed.next) <= position:
+                    continue
+                yield feed
+        finally:
+            self.subscribers.discard(queue)
+
+
+change_broadcaster = ChangeBroadcaster()
@@ -5,7 +5,7 @@ CLI entrypoint for metacatalog-api administration tasks
 
 import sys
 import argparse
-from metacatalog_api.core import connect
+from metacatalog_api.core import connect, import_entries
 from metacatalog_api.access_control import create_admin_token, validate_token, is_development_mode
 
 
@@ -17,6 +17,8 @@ def main():
 Examples:
   python -m metacatalog_api.cli --create-admin-token
   python -m metacatalog_api.cli --validate-admin-token your-token-here
+  python -m metacatalog_api.cli --worker --worker-threads 2
+  python -m metacatalog_api.cli --import-entries entries.jsonl --dry-run
         """
     )
     
@@ -32,6 +34,24 @@ Examples:
         help='Validate an admin token'
     )
     
+    parser.add_argument(
+        '--worker',
+        action='store_true',
+        help='Run background job workers until interrupted'
+    )
+    parser.add_argument('--worker-threads', type=int, default=1, help='Number of worker threads')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the job queue is empty')
+
+    parser.add_argument(
+        '--import-entries',
+        type=str,
+        metavar='FILE',
+        help='Bulk import entries from a JSONL or CSV file'
+    )
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None, help='Format of the import file, derived from the file extension by default')
+    parser.add_argument('--dry-run', action='store_true', help='Validate the import file and roll back without importing')
+    parser.add_argument('--schema', default='public', help='Database schema to import into')
+    
     # Add server configuration options
     parser.add_argument('--host', default='0.0.0.0', help='Server host')
     parser.add_argument('--port', type=int, default=8000, help='Server port')
@@ -69,6 +89,43 @@ Examples:
             print(f"❌ Failed to validate token: {e}")
             return 1
     
+    # Handle background job workers
+    if args.worker:
+        # the job handlers import the server settings, which parse the command line on their own
+        sys.argv = sys.argv[:1]
+        import threading
+        from metacatalog_api import jobs
+
+        handlers = jobs.load_job_handlers()
+        stop = threading.Event()
+        workers = jobs.start_workers(args.worker_threads, stop, poll_interval=args.poll_interval)
+        print(f"👷 Started {len(workers)} job worker(s) for: {', '.join(handlers.keys())}")
+        try:
+            while any(worker.is_alive() for worker in workers):
+                stop.wait(1)
+        except KeyboardInterrupt:
+            print("Stopping job workers...")
+            stop.set()
+            for worker in workers:
+                worker.join()
+        return 0
+    
+    # Handle bulk imports
+    if args.import_entries:
+        try:
+            report = import_entries(args.import_entries, format=args.format, dry_run=args.dry_run, schema=args.schema)
+        except Exception as e:
+            print(f"❌ Import failed, nothing was imported: {e}")
+            return 1
+
+        for error in report.errors[:50]:
+            print(f"  line {error.line}: {error.error}")
+        if report.failed > 50:
+            print(f"  ... and {report.failed - 50} more errors")
+        action = "would be imported" if report.dry_run else "imported"
+        print(f"{'🔍' if report.dry_run else '✅'} {report.imported} of {report.total} entries {action}, {report.failed} failed")
+        return 0 if report.failed == 0 else 1
+    
     # Default: show help
     print("Metacatalog API Server")
     print(f"Environment: {args.environment}")
@@ -77,6 +134,8 @@ Examples:
     print("Available CLI options:")
     print("  --create-admin-token     Create a new admin token")
     print("  --validate-admin-token <token>  Validate an admin token")
+    print("  --worker                 Run background job workers")
+    print("  --import-entries <file>  Bulk import entries from JSONL or CSV")
     print("  --help                   Show full help")
     return 0
 
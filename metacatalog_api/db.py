@@ -1,20 +1,28 @@
-from typing import List
+from typing import List, Generator
 from pathlib import Path
+from datetime import datetime
+from uuid import uuid4
 import warnings
 
 from sqlmodel import Session, text, func
 from sqlmodel import select, exists, col, or_, and_
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from psycopg2.errors import UndefinedTable
-from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.exc import ProgrammingError, IntegrityError, DataError
 from pydantic_geojson import FeatureCollectionModel
 from pydantic import BaseModel
 
 from metacatalog_api import models
 from metacatalog_api.extra import geocoder
 
-DB_VERSION = 5
+DB_VERSION = 16
 SQL_DIR = Path(__file__).parent / "sql"
 
+# key of session.info collecting the ids of the persons updated by resolve_authors
+UPDATED_PERSONS = 'metacatalog_updated_persons'
+
 # helper function to load sql files
 def load_sql(file_name: str) -> str:
     path = Path(file_name)
@@ -73,7 +81,7 @@ def check_installed(session: Session, schema: str = 'public') -> bool:
         return False
     
 
-def get_entries(session: Session, limit: int = None, offset: int = None, variable: str | int = None, title: str = None, geolocation: str = None) -> list[models.Metadata]:
+def get_entries(session: Session, limit: int = None, offset: int = None, variable: str | int = None, title: str = None, geolocation: str = None, all_versions: bool = False) -> list[models.Metadata]:
     if geolocation is not None:
         try:
             geolocation = geocoder.geolocation_to_postgres_wkt(geolocation=geolocation, tolerance=0.5)
@@ -115,6 +123,10 @@ def get_entries(session: Session, limit: int = None, offset: int = None, variabl
     if title is not None:
         sql = sql.where(col(models.EntryTable.title).ilike(title))
     
+    # only the latest versions, unless the whole history is requested
+    if not all_versions:
+        sql = sql.where(col(models.EntryTable.latest_version_id).is_(None))
+    
     # handle offset and limit
     sql = sql.offset(offset).limit(limit)
 
@@ -146,10 +158,140 @@ def get_entries_by_id(session: Session, entry_ids: int | list[int], limit: int =
         return [models.Metadata.model_validate(entry) for entry in entries]
 
 
+def get_entry_last_update(session: Session, entry_id: int) -> tuple[bool, datetime | None]:
+    """
+    Cheap lookup of the lastUpdate column of an entry without loading the full entry.
+    Returns a tuple of (exists, lastUpdate) as lastUpdate itself may be NULL.
+    """
+    row = session.exec(select(models.EntryTable.id, models.EntryTable.lastUpdate).where(models.EntryTable.id == entry_id)).first()
+    if row is None:
+        return False, None
+    return True, row[1]
+
+
+def _bulk_entries_query(ids: List[int] = None, group_id: int = None, all_versions: bool = False):
+    sql = select(models.EntryTable)
+    if ids is not None:
+        sql = sql.where(col(models.EntryTable.id).in_(ids))
+    elif not all_versions:
+        # like get_entries, only the latest versions unless the ids are given explicitly
+        sql = sql.where(col(models.EntryTable.latest_version_id).is_(None))
+    if group_id is not None:
+        sql = sql.join(models.NMGroupsEntries, models.NMGroupsEntries.entry_id == models.EntryTable.id).where(models.NMGroupsEntries.group_id == group_id)
+    return sql
+
+
+def count_entries(session: Session, ids: List[int] = None, group_id: int = None, all_versions: bool = False) -> int:
+    sql = _bulk_entries_query(ids=ids, group_id=group_id, all_versions=all_versions).with_only_columns(func.count(models.EntryTable.id))
+    return session.exec(sql).one()
+
+
+def iter_entries(session: Session, ids: List[int] = None, group_id: int = None, batch_size: int = 200, all_versions: bool = False) -> Generator[models.Metadata, None, None]:
+    """
+    Iterate over the latest versions of all entries, all versions with all_versions=True,
+    or the given ids or members of a group, without loading
+    them all at once. The rows are fetched through a server-side cursor in batches of
+    batch_size and all relationships needed by models.Metadata are eager loaded with
+    one SELECT ... IN per relationship and batch. The session is cleared after each
+    batch, thus memory usage is bounded by the batch_size, not the catalog size.
+    """
+    sql = (
+        _bulk_entries_query(ids=ids, group_id=group_id, all_versions=all_versions)
+        .options(
+            selectinload(models.EntryTable.license),
+            selectinload(models.EntryTable.author),
+            selectinload(models.EntryTable.coAuthors),
+            selectinload(models.EntryTable.variable).selectinload(models.VariableTable.unit),
+            selectinload(models.EntryTable.keywords),
+            selectinload(models.EntryTable.details),
+            selectinload(models.EntryTable.datasource).selectinload(models.DatasourceTable.type),
+            selectinload(models.EntryTable.datasource).selectinload(models.DatasourceTable.temporal_scale),
+            selectinload(models.EntryTable.datasource).selectinload(models.DatasourceTable.spatial_scale),
+        )
+        .order_by(models.EntryTable.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    for partition in session.exec(sql).partitions():
+        batch = [models.Metadata.model_validate(entry) for entry in partition]
+        session.expunge_all()
+        yield from batch
+
+
+def _datestamp_query(from_: datetime = None, until: datetime = None, all_versions: bool = False):
+    sql = select(models.EntryTable.id, models.EntryTable.lastUpdate)
+    if not all_versions:
+        sql = sql.where(col(models.EntryTable.latest_version_id).is_(None))
+    if from_ is not None:
+        sql = sql.where(models.EntryTable.lastUpdate >= from_)
+    if until is not None:
+        sql = sql.where(models.EntryTable.lastUpdate < until)
+    return sql
+
+
+def count_entries_by_datestamp(session: Session, from_: datetime = None, until: datetime = None, all_versions: bool = False) -> int:
+    sql = _datestamp_query(from_=from_, until=until, all_versions=all_versions).with_only_columns(func.count(models.EntryTable.id))
+    return session.exec(sql).one()
+
+
+def get_entry_datestamps(session: Session, from_: datetime = None, until: datetime = None, after: tuple[datetime, int] = None, limit: int = None, all_versions: bool = False) -> list[tuple[int, datetime]]:
+    """
+    Get (id, lastUpdate) of the latest versions of the entries, or of all versions with
+    all_versions=True, ordered by lastUpdate and id. Paging uses the
+    keyset given by after=(lastUpdate, id) of the last entry of the previous page,
+    which is backed by the entries_lastupdate_id_idx index and does not slow down
+    on deep pages like OFFSET does. until is exclusive.
+    """
+    sql = _datestamp_query(from_=from_, until=until, all_versions=all_versions)
+    if after is not None:
+        sql = sql.where(tuple_(models.EntryTable.lastUpdate, models.EntryTable.id) > tuple_(*after))
+    sql = sql.order_by(models.EntryTable.lastUpdate, models.EntryTable.id).limit(limit)
+
+    return [(row[0], row[1]) for row in session.exec(sql).all()]
+
+
+def get_table_versions(session: Session, tables: list[str] = None) -> dict[str, int]:
+    """Change counters of the given or all tables, tables that never changed have version 0"""
+    if tables is None:
+        rows = session.exec(text("SELECT table_name, version FROM table_versions")).all()
+        return {table_name: version for table_name, version in rows}
+
+    rows = session.exec(
+        text("SELECT table_name, version FROM table_versions WHERE table_name = ANY(:tables)"),
+        params={'tables': list(tables)}
+    ).all()
+    versions = {table: 0 for table in tables}
+    versions.update({table_name: version for table_name, version in rows})
+    return versions
+
+
+def get_entry_changes(session: Session, after: tuple[int, int] = (0, 0), limit: int = 1000) -> list[tuple[int, int, int, str, datetime]]:
+    """
+    Get (txid, id, entry_id, operation, changed_at) from the entry_changes log, ordered by
+    transaction and id. Paging uses the keyset after=(txid, id) of the last change of the
+    previous page. Only changes of transactions that are not running anymore are returned,
+    thus a transaction that commits later always sorts after the keyset already consumed.
+    """
+    sql = text("""
+        SELECT txid, id, entry_id, operation, changed_at FROM entry_changes
+        WHERE txid < txid_snapshot_xmin(txid_current_snapshot())
+          AND (txid, id) > (:txid, :id)
+        ORDER BY txid, id
+        LIMIT :limit
+    """)
+    return [tuple(row) for row in session.exec(sql, params={'txid': after[0], 'id': after[1], 'limit': limit}).all()]
+
+
+def get_entry_changes_head(session: Session) -> tuple[int, int]:
+    """Get the keyset after the last change of all finished transactions"""
+    txid = session.exec(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).one()[0]
+    return (txid - 1, 2 ** 63 - 1)
+
+
 def get_entries_locations(session: Session, ids: List[int] = None, limit: int = None, offset: int = None) -> FeatureCollectionModel:
     # build the id filter
     if ids is None or len(ids) == 0:
-        filt = ""
+        filt = " AND entries.latest_version_id IS NULL"
     else:
         filt = f" AND entries.id IN ({', '.join([str(i) for i in ids])})"
     
@@ -175,7 +317,7 @@ class SearchResult(BaseModel):
     weight: int
 
 
-def search_entries(session: Session, search: str, full_text: bool = True, limit: int = None, offset: int = None, variable: int | str = None, geolocation: str = None) -> list[SearchResult]:
+def search_entries(session: Session, search: str, full_text: bool = True, limit: int = None, offset: int = None, variable: int | str = None, geolocation: str = None, all_versions: bool = False) -> list[SearchResult]:
     # build the limit and offset
     lim = f" LIMIT {limit} " if limit is not None else ""
     off = f" OFFSET {offset} " if offset is not None else ""
@@ -189,6 +331,8 @@ def search_entries(session: Session, search: str, full_text: bool = True, limit:
         variable = get_variables(session, name=variable)
         filt = " AND entries.variable_id in (:variable) "
         params["variable"] = [v.id for v in variable]
+    if not all_versions:
+        filt += " AND entries.latest_version_id IS NULL "
     
     if geolocation is not None:
         try:
@@ -290,59 +434,12 @@ def get_author_by_name(session: Session, name: str, strict: bool = False) -> mod
 
 
 def create_or_get_author(session: Session, author: models.AuthorCreate) -> models.Author:
-    # Priority 1: Check by ORCID if author has ORCID
-    # ORCID is a unique identifier, so if provided, we should only match by ORCID
-    if author.orcid:
-        orcid_query = select(models.PersonTable).where(
-            func.lower(col(models.PersonTable.orcid)) == func.lower(author.orcid)
-        )
-        existing_by_orcid = session.exec(orcid_query).first()
-        if existing_by_orcid is not None:
-            # Found by ORCID - update missing fields if needed
-            updated = False
-            if author.first_name and not existing_by_orcid.first_name:
-                existing_by_orcid.first_name = author.first_name
-                updated = True
-            if author.last_name and not existing_by_orcid.last_name:
-                existing_by_orcid.last_name = author.last_name
-                updated = True
-            if author.affiliation and not existing_by_orcid.affiliation:
-                existing_by_orcid.affiliation = author.affiliation
-                updated = True
-            if updated:
-                session.add(existing_by_orcid)
-                session.commit()
-                session.refresh(existing_by_orcid)
-            return models.Author.model_validate(existing_by_orcid)
-        else:
-            # Not found by ORCID - create new author
-            # Do NOT fall back to name-based matching to avoid incorrectly assigning
-            # ORCID to a different person with the same name
-            return add_author(session, author)
-    
-    # Priority 2: Name-based duplicate check (only when no ORCID is provided)
-    sql = select(models.PersonTable)
-    if author.is_organisation:
-        sql = sql.where(
-            (models.PersonTable.is_organisation == True) & 
-            (models.PersonTable.organisation_name == author.organisation_name) &
-            (models.PersonTable.organisation_abbrev == author.organisation_abbrev)
-        )
-    else:
-        sql = sql.where(
-            (models.PersonTable.is_organisation == False) & 
-            (models.PersonTable.first_name == author.first_name) &
-            (models.PersonTable.last_name == author.last_name)
-        )
+    # resolve_authors implements the matching: ORCID first, then person or organisation name
+    person = resolve_authors(session, [author])[0]
+    session.commit()
+    session.refresh(person)
 
-    existing_author = session.exec(sql).first()
-    if existing_author is not None:
-        # Found by name - return existing author
-        # Note: We don't update ORCID here since author.orcid is None at this point
-        return models.Author.model_validate(existing_author)
-    else:
-        # Not found - create new author
-        return add_author(session, author)
+    return models.Author.model_validate(person)
 
 
 def add_author(session: Session, author: models.AuthorCreate) -> models.Author:
@@ -491,29 +588,9 @@ def add_entry(session: Session, payload: models.EntryCreate, author_duplicates:
     else:
         keywords = []
     
-    # add or set the author
-    if isinstance(payload.author, int):
-        author = session.get(models.PersonTable, payload.author)
-    elif not author_duplicates:
-        author = create_or_get_author(session, payload.author)
-        author = session.get(models.PersonTable, author.id)
-    else:
-        author = models.PersonTable.model_validate(payload.author)
-    
-    # handle co-authors
-    if payload.coAuthors is None or len(payload.coAuthors) == 0:
-        coAuthors = []
-    else:
-        coAuthors = []
-        for coAuthor in payload.coAuthors:
-            if isinstance(coAuthor, int):
-                coAuthors.append(session.get(models.PersonTable, coAuthor))
-            elif not author_duplicates:
-                coAuthor = create_or_get_author(session, coAuthor)
-                coAuthor = session.get(models.PersonTable, coAuthor.id)
-                coAuthors.append(coAuthor)
-            else:
-                coAuthors.append(models.PersonTable.model_validate(coAuthor))
+    # resolve the author and all co-authors at once
+    people = _resolve_people(session, [payload.author, *(payload.coAuthors or [])], duplicates=author_duplicates)
+    author, coAuthors = people[0], people[1:]
     
     # handle license
     if isinstance(payload.license, int):
@@ -566,22 +643,7 @@ def add_entry(session: Session, payload: models.EntryCreate, author_duplicates:
     return models.Metadata.model_validate(entry)
 
 
-def add_datasource(session: Session, entry_id: int, datasource: models.DatasourceCreate) -> models.Metadata:
-    # get the entry
-    entry = session.get(models.EntryTable, entry_id)
-    if entry is None:
-        raise ValueError(f"Entry with id {entry_id} not found")
-    # look up the datasource type
-    if isinstance(datasource.type, str):
-        sql = select(models.DatasourceTypeTable.id).where(col(models.DatasourceTypeTable.name) == datasource.type)
-    else:
-        sql = select(models.DatasourceTypeTable.id).where(models.DatasourceTypeTable.id == datasource.type)
-    
-    # get the datasource type id
-    datasource_type_id = session.exec(sql).first()
-    if datasource_type_id is None:
-        raise ValueError(f"Datasource type with name or id {datasource.type} was not found in the database")
-    
+def _datasource_table(datasource: models.DatasourceCreate, datasource_type_id: int) -> models.DatasourceTable:
     # check if a temporal scale is provided
     if datasource.temporal_scale is not None:
         temporal_scale = models.TemporalScaleTable.model_validate(datasource.temporal_scale)
@@ -594,8 +656,7 @@ def add_datasource(session: Session, entry_id: int, datasource: models.Datasourc
     else:
         spatial_scale = None
 
-    # create the table entry
-    datasource = models.DatasourceTable(
+    return models.DatasourceTable(
         path=datasource.path,
         encoding=datasource.encoding,
         type_id=datasource_type_id,
@@ -605,8 +666,298 @@ def add_datasource(session: Session, entry_id: int, datasource: models.Datasourc
         variable_names=datasource.variable_names if datasource.variable_names is not None else []
     )
 
+
+def _author_key(author: models.AuthorCreate | models.PersonTable) -> tuple:
+    # ORCID is a unique identifier, if given the author is only matched by ORCID
+    if author.orcid:
+        return ('orcid', author.orcid.lower())
+    if author.is_organisation:
+        return ('organisation', author.organisation_name, author.organisation_abbrev)
+    return ('person', author.first_name, author.last_name)
+
+
+def _person_keys(person: models.PersonTable) -> list[tuple]:
+    # all keys an existing person can be found by
+    keys = []
+    if person.orcid:
+        keys.append(('orcid', person.orcid.lower()))
+    if person.is_organisation == True:
+        keys.append(('organisation', person.organisation_name, person.organisation_abbrev))
+    elif person.is_organisation == False:
+        keys.append(('person', person.first_name, person.last_name))
+    return keys
+
+
+def resolve_authors(session: Session, authors: list[models.AuthorCreate], duplicates: bool = False) -> list[models.PersonTable]:
+    """
+    Find or create the authors of one or many entries at once. Existing authors are looked
+    up with one query on the ORCID and name keys, missing authors are inserted with one
+    INSERT ... ON CONFLICT (orcid) ... RETURNING statement.
+    Authors with ORCID are only matched by ORCID and fill in missing names and affiliation,
+    they never fall back to a name match, to not assign the ORCID to a different person with
+    the same name. The same author given twice resolves to the same row. Nothing is committed.
+    """
+    if len(authors) == 0:
+        return []
+
+    if duplicates:
+        persons = [models.PersonTable.model_validate(author) for author in authors]
+        session.add_all(persons)
+        session.flush()
+        return persons
+
+    keys = [_author_key(author) for author in authors]
+    wanted = set(keys)
+
+    # names may be NULL, thus the pairs are compared with == instead of a tuple IN
+    conditions = []
+    orcids = {key[1] for key in wanted if key[0] == 'orcid'}
+    if len(orcids) > 0:
+        conditions.append(func.lower(col(models.PersonTable.orcid)).in_(orcids))
+    for kind, first, second in [key for key in wanted if key[0] != 'orcid']:
+        if kind == 'person':
+            conditions.append(and_(models.PersonTable.is_organisation == False, models.PersonTable.first_name == first, models.PersonTable.last_name == second))
+        else:
+            conditions.append(and_(models.PersonTable.is_organisation == True, models.PersonTable.organisation_name == first, models.PersonTable.organisation_abbrev == second))
+
+    found: dict[tuple, models.PersonTable] = {}
+    sql = select(models.PersonTable).where(or_(*conditions)).order_by(models.PersonTable.id)
+    for person in session.exec(sql).all():
+        for key in _person_keys(person):
+            if key in wanted:
+                found.setdefault(key, person)
+
+    # insert the missing authors, an ORCID inserted concurrently returns the existing row
+    missing = {}
+    for author, key in zip(authors, keys):
+        if key not in found:
+            missing.setdefault(key, author)
+    if len(missing) > 0:
+        stmt = pg_insert(models.PersonTable).values([{**author.model_dump(), 'uuid': uuid4()} for author in missing.values()])
+        stmt = stmt.on_conflict_do_update(index_elements=[models.PersonTable.orcid], set_={'orcid': stmt.excluded.orcid})
+        inserted = session.scalars(stmt.returning(models.PersonTable), execution_options={'populate_existing': True}).all()
+        for person in inserted:
+            found[_author_key(person)] = person
+
+    persons = []
+    for author, key in zip(authors, keys):
+        person = found[key]
+        if key[0] == 'orcid' and key not in missing:
+            # Found by ORCID - update missing fields if needed
+            filled = False
+            for field in ('first_name', 'last_name', 'affiliation'):
+                if getattr(author, field) and not getattr(person, field):
+                    setattr(person, field, getattr(author, field))
+                    filled = True
+            if filled:
+                # the metadata of the entries of this person changed, see pop_updated_persons
+                session.info.setdefault(UPDATED_PERSONS, set()).add(person.id)
+        persons.append(person)
+
+    session.flush()
+    return persons
+
+
+def pop_updated_persons(session: Session) -> set[int]:
+    """Ids of the existing persons resolve_authors filled in on this session since the last call"""
+    return session.info.pop(UPDATED_PERSONS, set())
+
+
+def _resolve_people(session: Session, people: list[models.AuthorCreate | int], duplicates: bool = False) -> list[models.PersonTable | None]:
+    # persons given by id are looked up at once, unknown ids resolve to None
+    persons = _lookup(session, models.PersonTable, {a for a in people if isinstance(a, int)})
+    resolved = iter(resolve_authors(session, [a for a in people if not isinstance(a, int)], duplicates=duplicates))
+    return [persons.get(a) if isinstance(a, int) else next(resolved) for a in people]
+
+
+def _lookup(session: Session, table, ids: set) -> dict:
+    if len(ids) == 0:
+        return {}
+    return {obj.id: obj for obj in session.exec(select(table).where(col(table.id).in_(ids))).all()}
+
+
+def _check_bulk_entry(payload: models.EntryCreate, refs: dict) -> list[str]:
+    """Check all references of an entry against the batched lookups in refs"""
+    errors = []
+    if payload.title in refs['titles']:
+        errors.append(f"An entry with the title '{payload.title}' already exists")
+    if payload.variable not in refs['variables']:
+        errors.append(f"Variable with id {payload.variable} not found")
+    if isinstance(payload.license, int) and payload.license not in refs['licenses']:
+        errors.append(f"License with id {payload.license} not found")
+    person_ids = [a for a in [payload.author, *(payload.coAuthors or [])] if isinstance(a, int)]
+    for person_id in person_ids:
+        if person_id not in refs['persons']:
+            errors.append(f"Author with id {person_id} not found")
+    for keyword_id in payload.keywords or []:
+        if keyword_id not in refs['keywords']:
+            errors.append(f"Keyword with id {keyword_id} not found")
+    if payload.datasource is not None and payload.datasource.type not in refs['datasource_types']:
+        errors.append(f"Datasource type with name or id {payload.datasource.type} was not found in the database")
+    for group in payload.groups or []:
+        if isinstance(group, int) and group not in refs['groups']:
+            errors.append(f"Group with id {group} not found")
+        elif not isinstance(group, int) and group.type.lower() not in refs['group_types']:
+            errors.append(f"The group type {group.type} is not valid")
+    return errors
+
+
+def add_entries_bulk(session: Session, payloads: list[models.EntryCreate], author_duplicates: bool = False, indices: list[int] = None) -> list[models.BulkEntryResult]:
+    """
+    Add a batch of entries. All referenced keywords, licenses, variables, authors, datasource
+    types and groups are looked up with one query each and the entries are inserted with
+    multi-row statements in a single flush. Entries with invalid references fail on their
+    own, if the database rejects the batch, the entries are inserted one by one in savepoints
+    to find the failing ones. Nothing is committed, the caller commits the batch.
+    indices are the positions of the payloads in the whole import, used in the results.
+    """
+    results: dict[int, models.BulkEntryResult] = {}
+    if indices is None:
+        indices = list(range(len(payloads)))
+
+    # batched lookups of everything the entries reference
+    licenses = _lookup(session, models.LicenseTable, {p.license for p in payloads if isinstance(p.license, int)})
+    persons = _lookup(session, models.PersonTable, {a for p in payloads for a in [p.author, *(p.coAuthors or [])] if isinstance(a, int)})
+    keywords = _lookup(session, models.KeywordTable, {k for p in payloads for k in p.keywords or []})
+    groups = _lookup(session, models.EntryGroupTable, {g for p in payloads for g in p.groups or [] if isinstance(g, int)})
+    variables = set(session.exec(select(models.VariableTable.id).where(col(models.VariableTable.id).in_({p.variable for p in payloads}))).all())
+    titles = set(session.exec(select(models.EntryTable.title).where(col(models.EntryTable.title).in_({p.title for p in payloads}))).all())
+    datasource_types = {}
+    for dtype in session.exec(select(models.DatasourceTypeTable)).all():
+        datasource_types[dtype.id] = dtype.id
+        datasource_types[dtype.name] = dtype.id
+    group_types = {t.name.lower(): t.id for t in get_grouptypes(session)}
+    refs = dict(licenses=licenses, persons=persons, keywords=keywords, groups=groups, variables=variables, titles=titles, datasource_types=datasource_types, group_types=group_types)
+
+    valid = []
+    for index, payload in enumerate(payloads):
+        errors = _check_bulk_entry(payload, refs)
+        if len(errors) > 0:
+            results[index] = models.BulkEntryResult(index=indices[index], success=False, title=payload.title, error='; '.join(errors))
+        else:
+            # titles are unique, the second entry with the same title fails
+            titles.add(payload.title)
+            valid.append(index)
+
+    # resolve all new authors of the batch at once
+    creates = [(index, position, author) for index in valid for position, author in enumerate([payloads[index].author, *(payloads[index].coAuthors or [])]) if not isinstance(author, int)]
+    resolved = resolve_authors(session, [author for _, _, author in creates], duplicates=author_duplicates)
+    new_authors = {(index, position): person for (index, position, _), person in zip(creates, resolved)}
+
+    # licenses and groups created inline are shared by all entries of the batch
+    inline_licenses = {}
+    inline_groups = {}
+    inline_license_titles = {p.license.short_title for i, p in enumerate(payloads) if i in valid and not isinstance(p.license, int)}
+    if len(inline_license_titles) > 0:
+        sql = select(models.LicenseTable).where(col(models.LicenseTable.short_title).in_(inline_license_titles))
+        inline_licenses = {lic.short_title: lic for lic in session.exec(sql).all()}
+    inline_group_titles = {g.title for i, p in enumerate(payloads) if i in valid for g in p.groups or [] if not isinstance(g, int)}
+    if len(inline_group_titles) > 0:
+        sql = select(models.EntryGroupTable).where(col(models.EntryGroupTable.title).in_(inline_group_titles))
+        inline_groups = {group.title: group for group in session.exec(sql).all()}
+
+    def build(index: int) -> models.EntryTable:
+        payload = payloads[index]
+        people = [persons[a] if isinstance(a, int) else new_authors[(index, pos)] for pos, a in enumerate([payload.author, *(payload.coAuthors or [])])]
+
+        if isinstance(payload.license, int):
+            license = licenses[payload.license]
+        else:
+            license = inline_licenses.get(payload.license.short_title)
+            if license is None:
+                license = models.LicenseTable.model_validate(payload.license)
+                inline_licenses[license.short_title] = license
+
+        entry_groups = []
+        for group in payload.groups or []:
+            if isinstance(group, int):
+                entry_groups.append(groups[group])
+                continue
+            group_obj = inline_groups.get(group.title)
+            if group_obj is None:
+                group_obj = models.EntryGroupTable(title=group.title, description=group.description, type_id=group_types[group.type.lower()])
+                inline_groups[group.title] = group_obj
+            entry_groups.append(group_obj)
+
+        entry = models.EntryTable(
+            title=payload.title,
+            abstract=payload.abstract,
+            external_id=payload.external_id,
+            version=payload.version,
+            is_partial=payload.is_partial,
+            comment=payload.comment,
+            citation=payload.citation,
+            license=license,
+            variable_id=payload.variable,
+            author=people[0],
+            coAuthors=people[1:],
+            keywords=[keywords[k] for k in payload.keywords or []],
+            details=[
+                models.DetailTable(key=d.key, raw_value=d.raw_value, thesaurus_id=d.thesaurus, title=d.title, description=d.description)
+                for d in payload.details or []
+            ],
+            groups=entry_groups
+        )
+        if payload.location is not None:
+            entry.location = models.EntryTable.validate_location(payload.location, None)
+        if payload.datasource is not None:
+            entry.datasource = _datasource_table(payload.datasource, datasource_types[payload.datasource.type])
+        return entry
+
+    entries = {index: build(index) for index in valid}
+    try:
+        with session.begin_nested():
+            session.add_all(entries.values())
+            session.flush()
+    except (IntegrityError, DataError) as e:
+        # the rolled back savepoint expunged the new objects, thus the batch is built again
+        inline_licenses = {title: lic for title, lic in inline_licenses.items() if lic.id is not None and lic in session}
+        inline_groups = {title: group for title, group in inline_groups.items() if group.id is not None and group in session}
+        entries = {}
+        for index in valid:
+            try:
+                with session.begin_nested():
+                    entry = build(index)
+                    session.add(entry)
+                    session.flush()
+                entries[index] = entry
+            except (IntegrityError, DataError) as e:
+                error = str(e.orig).split('\n')[0] if e.orig is not None else str(e)
+                results[index] = models.BulkEntryResult(index=indices[index], success=False, title=payloads[index].title, error=error)
+
+    for index, entry in entries.items():
+        results[index] = models.BulkEntryResult(index=indices[index], success=True, id=entry.id, uuid=entry.uuid, title=entry.title)
+
+    return [results[index] for index in range(len(payloads))]
+
+
+def _datasource_type_id(session: Session, datasource_type: int | str) -> int:
+    if isinstance(datasource_type, str):
+        sql = select(models.DatasourceTypeTable.id).where(col(models.DatasourceTypeTable.name) == datasource_type)
+    else:
+        sql = select(models.DatasourceTypeTable.id).where(models.DatasourceTypeTable.id == datasource_type)
+    
+    # get the datasource type id
+    datasource_type_id = session.exec(sql).first()
+    if datasource_type_id is None:
+        raise ValueError(f"Datasource type with name or id {datasource_type} was not found in the database")
+    return datasource_type_id
+
+
+def add_datasource(session: Session, entry_id: int, datasource: models.DatasourceCreate) -> models.Metadata:
+    # get the entry
+    entry = session.get(models.EntryTable, entry_id)
+    if entry is None:
+        raise ValueError(f"Entry with id {entry_id} not found")
+    # look up the datasource type
+    datasource_type_id = _datasource_type_id(session, datasource.type)
+    
+    # create the table entry
+    datasource = _datasource_table(datasource, datasource_type_id)
+
     # add the datasource
     entry.datasource = datasource
+    entry.lastUpdate = datetime.now()
     session.add(entry)
     session.commit()
 
@@ -614,11 +965,319 @@ def add_datasource(session: Session, entry_id: int, datasource: models.Datasourc
     return models.Metadata.model_validate(entry)
 
 
+# columns of the entries table that are copied from an update as they are
+ENTRY_UPDATE_COLUMNS = ('title', 'abstract', 'external_id', 'version', 'is_partial', 'comment', 'citation', 'embargo', 'embargo_end', 'publication')
+ENTRY_REQUIRED_FIELDS = ('title', 'version', 'is_partial', 'embargo', 'variable', 'author', 'license')
+
+
+def _assign(obj, values: dict) -> None:
+    # only attributes with a different value are written
+    for attr, value in values.items():
+        if getattr(obj, attr) != value:
+            setattr(obj, attr, value)
+
+
+def _update_datasource(session: Session, entry: models.EntryTable, datasource: models.DatasourceCreate | None) -> None:
+    if datasource is None:
+        if entry.datasource is not None:
+            old = entry.datasource
+            entry.datasource = None
+            session.delete(old)
+        return
+
+    type_id = _datasource_type_id(session, datasource.type)
+    if entry.datasource is None:
+        entry.datasource = _datasource_table(datasource, type_id)
+        return
+
+    current = entry.datasource
+    _assign(current, dict(
+        path=datasource.path,
+        encoding=datasource.encoding,
+        type_id=type_id,
+        args=datasource.args if datasource.args is not None else {},
+        variable_names=datasource.variable_names if datasource.variable_names is not None else []
+    ))
+
+    if datasource.temporal_scale is None:
+        current.temporal_scale = None
+    elif current.temporal_scale is None:
+        current.temporal_scale = models.TemporalScaleTable.model_validate(datasource.temporal_scale)
+    else:
+        _assign(current.temporal_scale, datasource.temporal_scale.model_dump())
+
+    if datasource.spatial_scale is None:
+        current.spatial_scale = None
+    else:
+        spatial_scale = models.SpatialScaleTable.model_validate(datasource.spatial_scale)
+        if current.spatial_scale is None:
+            current.spatial_scale = spatial_scale
+        else:
+            values = datasource.spatial_scale.model_dump(exclude={'extent'})
+            if models.EntryTable.validate_location(current.spatial_scale.extent, None) != spatial_scale.extent:
+                values['extent'] = spatial_scale.extent
+            _assign(current.spatial_scale, values)
+
+
+def _update_details(session: Session, entry: models.EntryTable, details: list[models.DetailCreate]) -> None:
+    # details are matched by key, thus unchanged details are not touched
+    current = {detail.key: detail for detail in entry.details}
+    new = {detail.key: detail for detail in details}
+
+    for key, detail in current.items():
+        if key not in new:
+            entry.details.remove(detail)
+            session.delete(detail)
+
+    for key, d in new.items():
+        values = dict(raw_value=d.raw_value, stem=d.stem, title=d.title, description=d.description, thesaurus_id=d.thesaurus)
+        if key in current:
+            _assign(current[key], values)
+        else:
+            entry.details.append(models.DetailTable(key=key, **values))
+
+
+def update_entry(session: Session, entry_id: int, payload: models.EntryUpdate | models.EntryCreate, replace: bool = False, author_duplicates: bool = False) -> models.Metadata | None:
+    """
+    Update an entry in place. Only the fields set in the payload are changed, with replace=True
+    all fields are replaced, except publication and embargo_end if not given.
+    Columns are only written if their value differs, the co-author, keyword and group links are
+    diffed against the current rows and details are matched by key. lastUpdate is only bumped
+    if anything changed. Raises a ValueError for invalid changes, returns None if the entry
+    does not exist. Nothing is committed.
+    """
+    entry = session.get(models.EntryTable, entry_id)
+    if entry is None:
+        return None
+
+    if replace:
+        fields = (set(models.EntryUpdate.model_fields) - {'publication', 'embargo_end'}) | payload.model_fields_set
+    else:
+        fields = payload.model_fields_set
+    for name in ENTRY_REQUIRED_FIELDS:
+        if name in fields and getattr(payload, name) is None:
+            raise ValueError(f"The field '{name}' can't be null")
+
+    # new authors are flushed on their own, before the entry is changed
+    people = []
+    if 'author' in fields:
+        people.append(payload.author)
+    if 'coAuthors' in fields:
+        people.extend(payload.coAuthors or [])
+    resolved = _resolve_people(session, people, duplicates=author_duplicates)
+    for person, given in zip(resolved, people):
+        if person is None:
+            raise ValueError(f"Author with id {given} not found")
+
+    with session.no_autoflush:
+        _assign(entry, {name: getattr(payload, name) for name in ENTRY_UPDATE_COLUMNS if name in fields})
+
+        if 'location' in fields:
+            location = models.EntryTable.validate_location(payload.location, None) if payload.location is not None else None
+            current = models.EntryTable.validate_location(entry.location, None) if entry.location is not None else None
+            if location != current:
+                entry.location = location
+
+        if 'variable' in fields and entry.variable_id != payload.variable:
+            if session.get(models.VariableTable, payload.variable) is None:
+                raise ValueError(f"Variable with id {payload.variable} not found")
+            entry.variable_id = payload.variable
+
+        if 'license' in fields:
+            if isinstance(payload.license, int):
+                license = session.get(models.LicenseTable, payload.license)
+                if license is None:
+                    raise ValueError(f"License with id {payload.license} not found")
+            else:
+                sql = select(models.LicenseTable).where(models.LicenseTable.short_title == payload.license.short_title)
+                license = session.exec(sql).first() or models.LicenseTable.model_validate(payload.license)
+            if license.id is None or license.id != entry.license_id:
+                entry.license = license
+
+        if 'author' in fields:
+            author = resolved.pop(0)
+            if author.id != entry.author_id:
+                entry.author = author
+
+        if 'coAuthors' in fields and {p.id for p in resolved} != {p.id for p in entry.coAuthors}:
+            entry.coAuthors = resolved
+
+        if 'keywords' in fields:
+            ids = set(payload.keywords or [])
+            if ids != {k.id for k in entry.keywords}:
+                keywords = _lookup(session, models.KeywordTable, ids)
+                for keyword_id in ids - set(keywords.keys()):
+                    raise ValueError(f"Keyword with id {keyword_id} not found")
+                entry.keywords = list(keywords.values())
+
+        if 'groups' in fields:
+            groups = []
+            for group in payload.groups or []:
+                if isinstance(group, int):
+                    group_obj = session.get(models.EntryGroupTable, group)
+                    if group_obj is None:
+                        raise ValueError(f"Group with id {group} not found")
+                else:
+                    group_obj = session.exec(select(models.EntryGroupTable).where(models.EntryGroupTable.title == group.title)).first()
+                    if group_obj is None:
+                        group_types = {t.name.lower(): t.id for t in get_grouptypes(session)}
+                        if group.type.lower() not in group_types:
+                            raise ValueError(f"The group type {group.type} is not valid")
+                        group_obj = models.EntryGroupTable(title=group.title, description=group.description, type_id=group_types[group.type.lower()])
+                groups.append(group_obj)
+            if {g.id for g in groups} != {g.id for g in entry.groups} or any(g.id is None for g in groups):
+                entry.groups = groups
+
+        if 'details' in fields:
+            _update_details(session, entry, payload.details or [])
+
+        if 'datasource' in fields:
+            _update_datasource(session, entry, payload.datasource)
+
+        changed = len(session.new) > 0 or len(session.deleted) > 0 or any(session.is_modified(obj) for obj in session.dirty)
+
+    if changed:
+        entry.lastUpdate = datetime.now()
+        session.flush()
+
+    return models.Metadata.model_validate(entry)
+
+
+def _copy_datasource(datasource: models.DatasourceTable) -> models.DatasourceTable:
+    # every version owns its datasource, as datasources are updated in place
+    temporal_scale = datasource.temporal_scale
+    if temporal_scale is not None:
+        temporal_scale = models.TemporalScaleTable(**temporal_scale.model_dump(exclude={'id'}))
+    spatial_scale = datasource.spatial_scale
+    if spatial_scale is not None:
+        spatial_scale = models.SpatialScaleTable(**spatial_scale.model_dump(exclude={'id'}))
+
+    return models.DatasourceTable(
+        path=datasource.path,
+        encoding=datasource.encoding,
+        type_id=datasource.type_id,
+        args=datasource.args,
+        variable_names=datasource.variable_names,
+        temporal_scale=temporal_scale,
+        spatial_scale=spatial_scale
+    )
+
+
+def add_entry_version(session: Session, entry_id: int, payload: models.EntryUpdate | models.EntryCreate, replace: bool = False, author_duplicates: bool = False) -> models.Metadata | None:
+    """
+    Create a new version of an entry, that is the entry with the changes of the payload applied.
+    The new version becomes the latest version and all former versions reference it by
+    latest_version_id. Only the latest version can be versioned. Returns None if the entry
+    does not exist. Nothing is committed.
+    """
+    entry = session.get(models.EntryTable, entry_id)
+    if entry is None:
+        return None
+    if entry.latest_version_id is not None:
+        raise ValueError(f"Entry {entry_id} is not the latest version, the latest version is entry {entry.latest_version_id}")
+
+    version = models.EntryTable(
+        title=entry.title,
+        abstract=entry.abstract,
+        external_id=entry.external_id,
+        location=entry.location,
+        version=entry.version + 1,
+        is_partial=entry.is_partial,
+        comment=entry.comment,
+        citation=entry.citation,
+        embargo=entry.embargo,
+        embargo_end=entry.embargo_end,
+        license_id=entry.license_id,
+        variable_id=entry.variable_id,
+        author_id=entry.author_id,
+        coAuthors=list(entry.coAuthors),
+        keywords=list(entry.keywords),
+        groups=list(entry.groups),
+        details=[
+            models.DetailTable(key=d.key, stem=d.stem, title=d.title, raw_value=d.raw_value, description=d.description, thesaurus_id=d.thesaurus_id)
+            for d in entry.details
+        ],
+        datasource=_copy_datasource(entry.datasource) if entry.datasource is not None else None
+    )
+    session.add(version)
+    session.flush()
+
+    # link the whole history to the new version, the former versions changed as well
+    sql = (
+        update(models.EntryTable)
+        .where(or_(models.EntryTable.id == entry.id, models.EntryTable.latest_version_id == entry.id))
+        .values(latest_version_id=version.id, lastUpdate=datetime.now())
+    )
+    session.exec(sql)
+
+    # the version number is counted up, unless the payload sets it
+    if 'version' not in payload.model_fields_set:
+        payload = payload.model_copy(update={'version': version.version})
+    return update_entry(session, version.id, payload=payload, replace=replace, author_duplicates=author_duplicates)
+
+
+def get_entry_versions(session: Session, entry_id: int) -> list[models.EntryVersion] | None:
+    """List all versions of an entry, newest first. Returns None if the entry does not exist."""
+    latest_version_id = session.exec(
+        select(func.coalesce(models.EntryTable.latest_version_id, models.EntryTable.id)).where(models.EntryTable.id == entry_id)
+    ).first()
+    if latest_version_id is None:
+        return None
+
+    # both lookups are served by the partial indexes of migration 11
+    sql = (
+        select(
+            models.EntryTable.id,
+            models.EntryTable.uuid,
+            models.EntryTable.title,
+            models.EntryTable.version,
+            models.EntryTable.publication,
+            models.EntryTable.lastUpdate,
+            models.EntryTable.latest_version_id
+        )
+        .where(or_(models.EntryTable.id == latest_version_id, models.EntryTable.latest_version_id == latest_version_id))
+        .order_by(col(models.EntryTable.version).desc(), col(models.EntryTable.id).desc())
+    )
+    return [
+        models.EntryVersion(
+            id=row.id,
+            uuid=row.uuid,
+            title=row.title,
+            version=row.version,
+            publication=row.publication,
+            lastUpdate=row.lastUpdate,
+            is_latest=row.latest_version_id is None
+        )
+        for row in session.exec(sql).all()
+    ]
+
+
 def get_grouptypes(session: Session) -> list[models.EntryGroupType]:
     types = session.exec(select(models.EntryGroupTypeTable)).all()
     return [models.EntryGroupType.model_validate(t) for t in types]
 
 
+def get_entry_references(session: Session, entry_id: int) -> dict[str, list[int]]:
+    """Ids of the persons, license and variable embedded in the metadata of the entry"""
+    entry = session.get(models.EntryTable, entry_id)
+    if entry is None:
+        return {'persons': [], 'licenses': [], 'variables': []}
+    coauthors = session.exec(select(models.NMPersonEntries.person_id).where(models.NMPersonEntries.entry_id == entry_id)).all()
+    return {
+        'persons': [i for i in [entry.author_id, *coauthors] if i is not None],
+        'licenses': [entry.license_id] if entry.license_id is not None else [],
+        'variables': [entry.variable_id]
+    }
+
+
+def get_group_ids(session: Session, entry_ids: list[int]) -> list[int]:
+    """Ids of the groups listing any of the entries"""
+    if len(entry_ids) == 0:
+        return []
+    sql = select(models.NMGroupsEntries.group_id).where(models.NMGroupsEntries.entry_id.in_(entry_ids)).distinct()
+    return list(session.exec(sql).all())
+
+
 def get_groups(session: Session, title: str = None, description: str = None, type: str = None, entry_id: int = None, limit: int = None, offset: int = None, with_metadata: bool = False) -> list[models.EntryGroup] | list[models.EntryGroupWithMetadata]:
     sql = select(models.EntryGroupTable)
 
@@ -662,8 +1321,19 @@ def get_group(session: Session, id: int = None, title: str = None, with_metadata
         return models.EntryGroup.model_validate(group)
 
 
-def add_group(session: Session, title: str, description: str, type: str, entry_ids: list[int] = []) -> models.EntryGroup:
-    types = get_grouptypes(session=session)
+def touch_entries(session: Session, entry_ids: list[int]) -> None:
+    """
+    Bump the lastUpdate of the entries, i.e. after their groups changed. The rendered exports,
+    ETags and the change feed of an entry are keyed on its lastUpdate.
+    """
+    if len(entry_ids) == 0:
+        return
+    session.exec(update(models.EntryTable).where(models.EntryTable.id.in_(entry_ids)).values(lastUpdate=datetime.now()))
+
+
+def add_group(session: Session, title: str, description: str, type: str, entry_ids: list[int] = [], types: list[models.EntryGroupType] = None) -> models.EntryGroup:
+    if types is None:
+        types = get_grouptypes(session=session)
     grouptype = next(filter(lambda t: t.name.lower() == type.lower(), types), None)
     if grouptype is None:
         raise ValueError(f"The type {type} is not valid. Maybe you misspelled? Supported types: [{','.join([t.title for t in types])}]")
@@ -681,6 +1351,7 @@ def add_group(session: Session, title: str, description: str, type: str, entry_i
     if len(entry_ids) > 0:
         for entry_id in entry_ids:
             session.add(models.NMGroupsEntries(entry_id=entry_id, group_id=group.id))
+        touch_entries(session, entry_ids)
         session.commit()
 
     return models.EntryGroup.model_validate(group)
@@ -699,10 +1370,10 @@ def group_entries(session: Session, group: models.EntryGroupBase | int, entry_id
             group = new_group
         group_id = group.id
     
+    entry_ids = [entry_id if isinstance(entry_id, int) else entry_id.id for entry_id in entry_ids]
     for entry_id in entry_ids:
-        if not isinstance(entry_id, int):
-            entry_id = entry_id.id 
         session.add(models.NMGroupsEntries(group_id=group_id, entry_id=entry_id))
+    touch_entries(session, entry_ids)
     session.commit()
 
     group = get_group(session=session, id=group_id)
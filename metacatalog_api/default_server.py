@@ -22,12 +22,24 @@ from metacatalog_api.router.api.upload import upload_router
 from metacatalog_api.router.api.data import data_router
 from metacatalog_api.router.api.preview import preview_router
 from metacatalog_api.router.api.export import export_router as api_export_router
+from metacatalog_api.router.api.oai import oai_router
+from metacatalog_api.router.api.jobs import jobs_router
+from metacatalog_api.router.api.changes import changes_router, changes_stream_router
 from metacatalog_api.router.api.share import share_router as api_share_router
 from metacatalog_api.router.api.security import validate_api_key, router as security_router
+from metacatalog_api.rate_limit import rate_limit
+from metacatalog_api.idempotency import IdempotencyMiddleware
+from metacatalog_api.response_cache import ResponseCacheMiddleware
 
 # Import share providers to register their routes
 from metacatalog_api.router.api.share import download, zenodo, radar  # noqa: F401
 
+# retried create requests with an Idempotency-Key replay the stored response, this has to run inside of CORS
+app.add_middleware(IdempotencyMiddleware)
+
+# read routes are answered from the response cache, inside of CORS as well
+app.add_middleware(ResponseCacheMiddleware)
+
 # at first we add the cors middleware to allow everyone to reach the API
 app.add_middleware(
     CORSMiddleware, 
@@ -59,13 +71,17 @@ def index(request: Request):
 
 
 # add all api routes - currently this is only splitted into read and create
-app.include_router(api_read_router)
-app.include_router(api_export_router)
+app.include_router(api_read_router, dependencies=[rate_limit('read', per='ip')])
+app.include_router(api_export_router, dependencies=[rate_limit('read', per='ip')])
+app.include_router(oai_router, dependencies=[rate_limit('read', per='ip')])
+app.include_router(jobs_router, dependencies=[rate_limit('read', per='ip')])
+app.include_router(changes_router, dependencies=[rate_limit('read', per='ip')])
+app.include_router(changes_stream_router, dependencies=[rate_limit('stream', per='ip')])
 app.include_router(api_share_router)
-app.include_router(api_create_router, dependencies=[Depends(validate_api_key)])
-app.include_router(upload_router, dependencies=[Depends(validate_api_key)])
-app.include_router(data_router, dependencies=[Depends(validate_api_key)])
-app.include_router(preview_router, prefix="/preview", dependencies=[Depends(validate_api_key)])
+app.include_router(api_create_router, dependencies=[Depends(validate_api_key), rate_limit('write')])
+app.include_router(upload_router, dependencies=[Depends(validate_api_key), rate_limit('upload')])
+app.include_router(data_router, dependencies=[Depends(validate_api_key), rate_limit('data')])
+app.include_router(preview_router, prefix="/preview", dependencies=[Depends(validate_api_key), rate_limit('preview')])
 app.include_router(security_router)
 
 # add the manager application (SvelteKit)
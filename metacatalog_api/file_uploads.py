@@ -87,7 +87,8 @@ class UploadCache(BaseSettings):
         metadata = self._load_metadata()
         
         for file in self.temporary_directory.glob("*"):
-            if file.name == 'metadata.json':
+            # uploads are single files, directories are not part of the cache
+            if file.name == 'metadata.json' or not file.is_file():
                 continue
             file_hash = file.name  # The file name is the hash
             if file_hash in metadata:
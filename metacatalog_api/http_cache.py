@@ -0,0 +1,98 @@
+"""
+ETags and Cache-Control headers for conditional GET requests.
+
+Entries are tagged by their lastUpdate, the lookup tables by the change counters
+of the table_versions table, which are counted up by triggers on every change
+and held by the core.lookup_cache.
+The tags are resolved by a FastAPI dependency before the route loads anything,
+requests with a matching If-None-Match header are answered with 304 Not Modified:
+
+    @read_router.get('/licenses', dependencies=[lookup_etag('licenses', 'licenses')])
+
+The Cache-Control header of every route can be changed like
+METACATALOG_CACHE_CONTROL_LICENSES="public, max-age=3600".
+"""
+import hashlib
+
+from fastapi import Depends, HTTPException, Request, Response
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from starlette.concurrency import run_in_threadpool
+
+from metacatalog_api import core
+
+
+class CacheControlSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_CACHE_CONTROL_")
+
+    # entries can change any time, clients revalidate with the ETag on every use
+    entries: str = "no-cache"
+    licenses: str = "public, max-age=60"
+    variables: str = "public, max-age=60"
+    keywords: str = "public, max-age=60"
+    group_types: str = "public, max-age=60"
+    datasource_types: str = "public, max-age=60"
+
+    def header(self, route: str) -> str:
+        return getattr(self, route)
+
+
+cache_control_settings = CacheControlSettings()
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag of the given parts"""
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is None:
+        return False
+    return if_none_match.strip() == '*' or etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+
+
+def json_response(content: bytes, response: Response) -> Response:
+    """Response of pre-serialized JSON, with the headers set on the response of the route, like the ETag"""
+    headers = {k: v for k, v in response.headers.items() if k.lower() != 'content-length'}
+    return Response(content=content, media_type='application/json', headers=headers)
+
+
+def _conditional(request: Request, response: Response, route: str, etag: str) -> None:
+    headers = {'ETag': etag, 'Cache-Control': cache_control_settings.header(route)}
+    if is_not_modified(request, etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def lookup_etag(route: str, *tables: str, unless: str = None):
+    """
+    Dependency tagging the response by the change counters of the given tables and the query.
+    The counters are taken from the lookup cache of core, which reads them at most every
+    few seconds, thus no query is made for most requests. Responses of requests setting the
+    query parameter unless to true depend on more than these tables and are not tagged.
+    """
+    async def dependency(request: Request, response: Response):
+        if unless is not None and request.query_params.get(unless, '').lower() in ('1', 'true', 'yes', 'on'):
+            return
+        versions = await run_in_threadpool(core.table_versions, list(tables))
+        etag = make_etag(route, request.url.path, request.url.query, *sorted(versions.items()))
+        _conditional(request, response, route, etag)
+
+    return Depends(dependency)
+
+
+def entry_etag(route: str = 'entries'):
+    """
+    Dependency tagging the response of the entry of the id path parameter by its lastUpdate.
+    Updates of the embedded persons, licenses and variables bump the lastUpdate by trigger.
+    """
+    async def dependency(id: int, request: Request, response: Response):
+        exists, last_update = await run_in_threadpool(core.entry_last_update, id)
+        if not exists:
+            # the route answers with 404
+            return
+        etag = make_etag(route, request.url.path, id, last_update.isoformat() if last_update is not None else '')
+        _conditional(request, response, route, etag)
+
+    return Depends(dependency)
@@ -0,0 +1,288 @@
+"""
+Idempotency keys for the create endpoints.
+
+Clients retrying a POST on timeouts send the same Idempotency-Key header with
+every attempt. The first request claims the key in the idempotency_keys table,
+runs as usual and its response is stored with the key. Retries with the same
+key are answered with the stored response and an Idempotent-Replayed header,
+without running the endpoint again. While the first request is still running,
+retries get 409 Conflict, a key reused for a different request gets 422.
+
+Keys are scoped to the API token (or client IP) and the route, and expire
+after METACATALOG_IDEMPOTENCY_TTL seconds. The claim of a running request is
+renewed while it runs, thus slow bulk creates or uploads are never executed
+twice. Only claims of crashed workers expire, after lock_timeout seconds. Server errors and responses worth
+retrying (408, 409, 429, auth errors) are not stored and release the key.
+"""
+from tempfile import SpooledTemporaryFile
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+
+from fastapi import Request
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlmodel import Session, text
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metacatalog_api import core
+from metacatalog_api.rate_limit import client_key
+
+
+class IdempotencySettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_IDEMPOTENCY_")
+
+    enabled: bool = True
+    # seconds a stored response is replayed
+    ttl: int = 86400
+    # seconds a key stays claimed by a request that did not finish, i.e. of a crashed worker.
+    # Running requests renew their claim every third of it.
+    lock_timeout: int = 300
+    # larger responses are not stored, the key is released instead
+    max_response_size: int = 1024 * 1024
+    # request bodies are buffered in memory up to this size, larger bodies are spooled to disk
+    max_memory_body: int = 1024 * 1024
+
+
+idempotency_settings = IdempotencySettings()
+
+# method and path of the routes accepting an Idempotency-Key
+IDEMPOTENT_ROUTES = [
+    ('POST', re.compile(r'/entries')),
+    ('POST', re.compile(r'/entries/bulk')),
+    ('POST', re.compile(r'/entries/\d+/datasource')),
+    ('POST', re.compile(r'/uploads')),
+    ('POST', re.compile(r'/authors')),
+    ('POST', re.compile(r'/groups')),
+]
+
+# status codes that are not replayed, as a retry may succeed
+RETRYABLE_STATUS = (401, 403, 408, 409, 429)
+
+
+class StoredResponse:
+    def __init__(self, status_code: int, headers: list[list[str]], body: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+class IdempotencyStore:
+    """Claimed keys and stored responses in the idempotency_keys table"""
+    def __init__(self, purge_interval: float = 600):
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    def claim_in_session(self, session: Session, key: str, request_hash: str) -> tuple[str, StoredResponse | None]:
+        """
+        Claim the key for a request. Returns 'claimed' if the request should run, 'done' with the
+        stored response, 'pending' if another request holds the key or 'mismatch' if the key was
+        used for a different request.
+        """
+        session.exec(text("DELETE FROM idempotency_keys WHERE key = :key AND expires_at < now()"), params={'key': key})
+        claimed = session.exec(text("""
+            INSERT INTO idempotency_keys (key, request_hash, expires_at) VALUES (:key, :request_hash, now() + make_interval(secs => :lock_timeout))
+            ON CONFLICT (key) DO NOTHING
+            RETURNING key
+        """), params={'key': key, 'request_hash': request_hash, 'lock_timeout': idempotency_settings.lock_timeout}).first()
+        session.commit()
+        if claimed is not None:
+            return 'claimed', None
+
+        row = session.exec(
+            text("SELECT request_hash, status_code, headers, body FROM idempotency_keys WHERE key = :key"),
+            params={'key': key}
+        ).first()
+        if row is None:
+            # released in the meantime, the client can retry
+            return 'pending', None
+        if row.request_hash != request_hash:
+            return 'mismatch', None
+        if row.status_code is None:
+            return 'pending', None
+        return 'done', StoredResponse(row.status_code, row.headers, bytes(row.body))
+
+    def complete_in_session(self, session: Session, key: str, response: StoredResponse) -> None:
+        session.exec(text("""
+            UPDATE idempotency_keys SET status_code = :status_code, headers = :headers, body = :body, expires_at = now() + make_interval(secs => :ttl)
+            WHERE key = :key
+        """), params={
+            'key': key,
+            'status_code': response.status_code,
+            'headers': json.dumps(response.headers),
+            'body': response.body,
+            'ttl': idempotency_settings.ttl
+        })
+        session.commit()
+
+    def extend_in_session(self, session: Session, key: str) -> None:
+        """Renew the claim of a request that is still running"""
+        session.exec(text("""
+            UPDATE idempotency_keys SET expires_at = now() + make_interval(secs => :lock_timeout)
+            WHERE key = :key AND status_code IS NULL
+        """), params={'key': key, 'lock_timeout': idempotency_settings.lock_timeout})
+        session.commit()
+
+    def release_in_session(self, session: Session, key: str) -> None:
+        session.exec(text("DELETE FROM idempotency_keys WHERE key = :key AND status_code IS NULL"), params={'key': key})
+        session.commit()
+
+    def purge_in_session(self, session: Session) -> None:
+        session.exec(text("DELETE FROM idempotency_keys WHERE expires_at < now()"))
+        session.commit()
+
+    def claim(self, key: str, request_hash: str) -> tuple[str, StoredResponse | None]:
+        with core.connect() as session:
+            with self._lock:
+                purge = time.monotonic() - self._last_purge > self.purge_interval
+                if purge:
+                    self._last_purge = time.monotonic()
+            if purge:
+                self.purge_in_session(session)
+            return self.claim_in_session(session, key, request_hash)
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        with core.connect() as session:
+            self.complete_in_session(session, key, response)
+
+    def extend(self, key: str) -> None:
+        with core.connect() as session:
+            self.extend_in_session(session, key)
+
+    def release(self, key: str) -> None:
+        with core.connect() as session:
+            self.release_in_session(session, key)
+
+
+store = IdempotencyStore()
+
+
+def is_idempotent_route(method: str, path: str) -> bool:
+    return any(method == m and pattern.fullmatch(path) for m, pattern in IDEMPOTENT_ROUTES)
+
+
+async def _buffer_body(receive: Receive) -> tuple[SpooledTemporaryFile, str]:
+    """Read the request body into a spooled file and hash it"""
+    body = SpooledTemporaryFile(max_size=idempotency_settings.max_memory_body)
+    digest = hashlib.sha256()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        body.write(chunk)
+        digest.update(chunk)
+        if not message.get('more_body', False):
+            break
+    body.seek(0)
+    return body, digest.hexdigest()
+
+
+async def _keep_claimed(key: str) -> None:
+    """Renew the claim of the key until cancelled"""
+    while True:
+        await asyncio.sleep(idempotency_settings.lock_timeout / 3)
+        try:
+            await run_in_threadpool(store.extend, key)
+        except Exception:
+            # the next renewal may succeed before the claim expires
+            pass
+
+
+class IdempotencyMiddleware:
+    """
+    Replay stored responses for requests with an Idempotency-Key header.
+    Add it before the CORS middleware, so that replayed responses pass the CORS middleware, too.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not idempotency_settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        idempotency_key = request.headers.get('Idempotency-Key')
+        path = scope['path'].removeprefix(scope.get('root_path', ''))
+        if idempotency_key is None or not is_idempotent_route(scope['method'], path):
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) == 0 or len(idempotency_key) > 255:
+            await JSONResponse({'detail': 'The Idempotency-Key header must have 1 to 255 characters'}, status_code=400)(scope, receive, send)
+            return
+
+        body, body_hash = await _buffer_body(receive)
+        try:
+            key = hashlib.sha256(f"{client_key(request, 'token')}|{scope['method']}|{path}|{idempotency_key}".encode('utf-8')).hexdigest()
+            request_hash = hashlib.sha256(f"{scope['query_string'].decode('latin-1')}|{body_hash}".encode('utf-8')).hexdigest()
+
+            state, stored = await run_in_threadpool(store.claim, key, request_hash)
+            if state == 'done':
+                response = Response(stored.body, status_code=stored.status_code)
+                response.raw_headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in stored.headers]
+                response.raw_headers.append((b'idempotent-replayed', b'true'))
+                await response(scope, receive, send)
+                return
+            if state == 'pending':
+                detail = 'A request with this Idempotency-Key is still being processed'
+                await JSONResponse({'detail': detail}, status_code=409, headers={'Retry-After': '1'})(scope, receive, send)
+                return
+            if state == 'mismatch':
+                detail = 'The Idempotency-Key was already used for a different request'
+                await JSONResponse({'detail': detail}, status_code=422)(scope, receive, send)
+                return
+
+            await self._run(key, body, scope, receive, send)
+        finally:
+            body.close()
+
+    async def _run(self, key: str, body: SpooledTemporaryFile, scope: Scope, receive: Receive, send: Send) -> None:
+        size = body.seek(0, 2)
+        body.seek(0)
+        body_sent = False
+
+        async def replay_body() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            chunk = body.read(65536)
+            body_sent = body.tell() >= size
+            return {'type': 'http.request', 'body': chunk, 'more_body': not body_sent}
+
+        status_code = None
+        headers: list[list[str]] = []
+        content = bytearray()
+        too_large = False
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code, too_large
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                headers.extend([k.decode('latin-1'), v.decode('latin-1')] for k, v in message.get('headers', []))
+            elif message['type'] == 'http.response.body':
+                if len(content) + len(message.get('body', b'')) > idempotency_settings.max_response_size:
+                    too_large = True
+                elif not too_large:
+                    content.extend(message.get('body', b''))
+            await send(message)
+
+        # retries are answered with 409 as long as this request runs
+        keep_claimed = asyncio.create_task(_keep_claimed(key))
+        try:
+            await self.app(scope, replay_body, capture)
+        except Exception:
+            await run_in_threadpool(store.release, key)
+            raise
+        finally:
+            keep_claimed.cancel()
+
+        if status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUS or too_large:
+            await run_in_threadpool(store.release, key)
+        else:
+            await run_in_threadpool(store.complete, key, StoredResponse(status_code, headers, bytes(content)))
@@ -0,0 +1,438 @@
+"""
+Durable background jobs stored in PostgreSQL.
+
+Jobs are enqueued into the jobs table and claimed by workers with
+SELECT ... FOR UPDATE SKIP LOCKED, thus any number of workers in any number
+of processes can work on the same queue. Workers run inside the server
+process (see Server.job_workers) or standalone via the CLI:
+
+    python -m metacatalog_api.cli --worker
+
+Handlers are registered per job kind with the register_job decorator. A handler
+gets the payload and a JobContext to report progress and returns a JSON
+serializable result. Third-party packages can register handlers through the
+'metacatalog_api.jobs' entry point group.
+
+Result files are written into a directory per job below
+METACATALOG_JOBS_RESULT_DIRECTORY. The workers remove the results of finished
+and failed jobs after METACATALOG_JOBS_RESULT_RETENTION seconds.
+"""
+from typing import Any, Callable
+from datetime import datetime
+from importlib.metadata import entry_points
+from pathlib import Path
+import asyncio
+import inspect
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlmodel import SQLModel, Field, Column, Session, JSON, select, text
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class JobSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_JOBS_")
+
+    # not below the temporary directory of the UploadCache, which indexes everything in it
+    result_directory: Path = Path("/tmp/metacatalog-jobs")
+    # seconds the result files of finished and failed jobs are kept
+    result_retention: float = 7 * 24 * 3600
+    # seconds between two purges of each worker
+    purge_interval: float = 3600
+
+
+job_settings = JobSettings()
+
+
+class JobTable(SQLModel, table=True):
+    __tablename__ = 'jobs'
+
+    id: int | None = Field(default=None, primary_key=True)
+    uuid: str
+    kind: str
+    status: str = 'queued'
+    payload: dict = Field(sa_column=Column(JSON), default={})
+    result: dict | None = Field(sa_column=Column(JSON), default=None)
+    error: str | None = None
+    progress: float = 0.0
+    progress_message: str | None = None
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime | None = None
+    locked_by: str | None = None
+    locked_at: datetime | None = None
+    created_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: float
+    progress_message: str | None = None
+    attempts: int
+    max_attempts: int
+    created_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+    result: dict | None = None
+
+    @classmethod
+    def from_table(cls, job: JobTable) -> 'Job':
+        return cls(
+            id=job.uuid,
+            kind=job.kind,
+            status=job.status,
+            progress=job.progress,
+            progress_message=job.progress_message,
+            attempts=job.attempts,
+            max_attempts=job.max_attempts,
+            created_at=job.created_at,
+            finished_at=job.finished_at,
+            error=job.error,
+            result=job.result
+        )
+
+
+class JobHandler(BaseModel):
+    kind: str
+    func: Callable
+    secrets: list[str] = []
+    max_attempts: int = 3
+
+
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+# modules registering the built-in job handlers
+BUILTIN_JOB_MODULES = [
+    'metacatalog_api.router.api.export',
+    'metacatalog_api.router.api.share.download',
+    'metacatalog_api.router.api.share.zenodo',
+    'metacatalog_api.router.api.share.radar',
+]
+
+_handlers_loaded = False
+
+
+def register_job(kind: str, secrets: list[str] = None, max_attempts: int = 3):
+    """
+    Decorator to register a handler for a job kind. The handler is called as
+    func(payload, context) and may be a coroutine function.
+    Payload keys listed in secrets, like access tokens, are removed from the
+    database as soon as the job finished or finally failed.
+    """
+    def decorator(func: Callable):
+        JOB_HANDLERS[kind] = JobHandler(kind=kind, func=func, secrets=secrets or [], max_attempts=max_attempts)
+        return func
+    return decorator
+
+
+def load_job_handlers() -> dict[str, JobHandler]:
+    """Import the built-in job handlers and all handlers registered as entry points"""
+    global _handlers_loaded
+    if not _handlers_loaded:
+        import importlib
+        for module in BUILTIN_JOB_MODULES:
+            importlib.import_module(module)
+        for ep in entry_points(group='metacatalog_api.jobs'):
+            try:
+                ep.load()
+            except Exception as e:
+                logger.warning(f"Could not load job handlers from entry point {ep.name}: {e}")
+        _handlers_loaded = True
+    return JOB_HANDLERS
+
+
+class PermanentJobError(Exception):
+    """Raise from a handler to fail a job without retrying it"""
+    pass
+
+
+def enqueue_job(session: Session, kind: str, payload: dict, max_attempts: int = None) -> Job:
+    if max_attempts is None:
+        max_attempts = JOB_HANDLERS[kind].max_attempts if kind in JOB_HANDLERS else 3
+
+    sql = text("""
+        INSERT INTO jobs (uuid, kind, status, payload, attempts, max_attempts, progress, run_after, created_at)
+        VALUES (:uuid, :kind, 'queued', CAST(:payload AS jsonb), 0, :max_attempts, 0, now(), now())
+        RETURNING id
+    """)
+    job_id = session.exec(sql, params={'uuid': str(uuid.uuid4()), 'kind': kind, 'payload': json.dumps(payload, default=str), 'max_attempts': max_attempts}).scalar()
+    session.commit()
+
+    return Job.from_table(session.get(JobTable, job_id))
+
+
+def get_job(session: Session, job_id: str) -> Job | None:
+    job = session.exec(select(JobTable).where(JobTable.uuid == job_id)).first()
+    if job is None:
+        return None
+    return Job.from_table(job)
+
+
+def claim_job(session: Session, worker_id: str, kinds: list[str], lease_seconds: int = 3600) -> JobTable | None:
+    """
+    Claim the next due job. Running workers renew their lock by heartbeats, thus jobs
+    of crashed workers, which did not renew their lock for lease_seconds, are claimed again. SKIP LOCKED lets concurrent workers
+    pass over rows that are being claimed by others instead of waiting.
+    """
+    sql = text("""
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = :worker, locked_at = now()
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE kind = ANY(:kinds) AND (
+                (status = 'queued' AND run_after <= now())
+                OR (status = 'running' AND locked_at < now() - make_interval(secs => :lease))
+            )
+            ORDER BY run_after, id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id
+    """)
+    job_id = session.exec(sql, params={'worker': worker_id, 'kinds': kinds, 'lease': lease_seconds}).scalar()
+    session.commit()
+
+    if job_id is None:
+        return None
+    return session.get(JobTable, job_id)
+
+
+def heartbeat(session: Session, job_id: int, worker_id: str) -> bool:
+    """Renew the lock of a running job. Returns False if the worker does not hold the lock anymore"""
+    renewed = session.exec(
+        text("UPDATE jobs SET locked_at = now() WHERE id = :id AND locked_by = :worker AND status = 'running'"),
+        params={'id': job_id, 'worker': worker_id}
+    ).rowcount
+    session.commit()
+    return renewed > 0
+
+
+def report_progress(session: Session, job_id: int, progress: float, message: str = None, worker_id: str = None) -> None:
+    """Report the progress of a job, the worker holding the lock renews it at the same time"""
+    session.exec(
+        text("""
+            UPDATE jobs SET progress = :progress, progress_message = :message,
+                locked_at = CASE WHEN locked_by = :worker THEN now() ELSE locked_at END
+            WHERE id = :id
+        """),
+        params={'id': job_id, 'progress': max(0.0, min(1.0, progress)), 'message': message, 'worker': worker_id}
+    )
+    session.commit()
+
+
+def purge_results(session: Session, directory: Path = None, retention: float = None) -> int:
+    """
+    Remove the result directories of jobs that finished or failed more than retention
+    seconds ago, and of jobs that do not exist anymore. Returns the number of removed directories.
+    """
+    directory = directory or job_settings.result_directory
+    retention = job_settings.result_retention if retention is None else retention
+    if not directory.is_dir():
+        return 0
+    found = {path.name: path for path in directory.iterdir() if path.is_dir()}
+    if len(found) == 0:
+        return 0
+
+    # jobs that are queued, running or finished recently keep their results
+    keep = set(session.exec(
+        text("""
+            SELECT uuid FROM jobs
+            WHERE uuid = ANY(:uuids) AND (finished_at IS NULL OR finished_at > now() - make_interval(secs => :retention))
+        """),
+        params={'uuids': list(found.keys()), 'retention': retention}
+    ).scalars().all())
+
+    removed = 0
+    for name, path in found.items():
+        if name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def _owned_by(worker_id: str | None) -> str:
+    # a worker whose lock expired must not overwrite the job of the worker that claimed it again
+    return "" if worker_id is None else " AND locked_by = :worker"
+
+
+def complete_job(session: Session, job_id: int, result: dict | None, secrets: list[str] = [], worker_id: str = None) -> bool:
+    """Mark the job as finished. With worker_id, only if the worker still holds the lock"""
+    sql = text(f"""
+        UPDATE jobs SET status = 'finished', result = CAST(:result AS jsonb), error = NULL, progress = 1,
+            finished_at = now(), locked_by = NULL, payload = payload - CAST(:secrets AS text[])
+        WHERE id = :id{_owned_by(worker_id)}
+    """)
+    updated = session.exec(sql, params={'id': job_id, 'result': json.dumps(result, default=str), 'secrets': secrets, 'worker': worker_id}).rowcount
+    session.commit()
+    return updated > 0
+
+
+def fail_job(session: Session, job: JobTable, error: str, secrets: list[str] = [], retry: bool = True, backoff_seconds: int = 30, worker_id: str = None) -> bool:
+    """
+    Requeue the job with exponential backoff, or mark it as failed if no attempts are left.
+    With worker_id, only if the worker still holds the lock.
+    """
+    if retry and job.attempts < job.max_attempts:
+        sql = text(f"""
+            UPDATE jobs SET status = 'queued', error = :error, locked_by = NULL, locked_at = NULL,
+                run_after = now() + make_interval(secs => :delay)
+            WHERE id = :id{_owned_by(worker_id)}
+        """)
+        params = {'id': job.id, 'error': error, 'delay': backoff_seconds * 2 ** (job.attempts - 1), 'worker': worker_id}
+    else:
+        sql = text(f"""
+            UPDATE jobs SET status = 'failed', error = :error, finished_at = now(), locked_by = NULL,
+                payload = payload - CAST(:secrets AS text[])
+            WHERE id = :id{_owned_by(worker_id)}
+        """)
+        params = {'id': job.id, 'error': error, 'secrets': secrets, 'worker': worker_id}
+    updated = session.exec(sql, params=params).rowcount
+    session.commit()
+    return updated > 0
+
+
+class JobContext:
+    """Handed to job handlers to report progress and to find a place for result files"""
+    def __init__(self, job: JobTable, connect: Callable, worker_id: str = None):
+        self.job_id = job.id
+        self.uuid = job.uuid
+        self.attempt = job.attempts
+        self.worker_id = worker_id
+        self._connect = connect
+
+    def progress(self, progress: float, message: str = None) -> None:
+        try:
+            with self._connect() as session:
+                report_progress(session, self.job_id, progress, message, worker_id=self.worker_id)
+        except Exception as e:
+            # progress is informative, it must never fail the job
+            logger.debug(f"Could not report progress of job {self.uuid}: {e}")
+
+    @property
+    def result_directory(self) -> Path:
+        path = job_settings.result_directory / self.uuid
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+
+class JobWorker:
+    def __init__(self, worker_id: str = None, poll_interval: float = 2.0, lease_seconds: int = 3600, backoff_seconds: int = 30, heartbeat_interval: float = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.backoff_seconds = backoff_seconds
+        # the lock is renewed several times per lease, a missed heartbeat does not lose the job
+        self.heartbeat_interval = heartbeat_interval or max(1.0, lease_seconds / 4)
+        self._next_purge = 0.0
+
+    def _heartbeat(self, job: JobTable, connect: Callable, stop: threading.Event) -> None:
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                with connect() as session:
+                    if not heartbeat(session, job.id, self.worker_id):
+                        logger.warning(f"Worker {self.worker_id} lost the lock of job {job.uuid}")
+                        return
+            except Exception as e:
+                logger.warning(f"Heartbeat of job {job.uuid} failed: {e}")
+
+    def run_once(self) -> bool:
+        """Claim and run a single job. Returns False if no job was due"""
+        # Import here to avoid circular imports
+        from metacatalog_api.core import connect
+
+        handlers = load_job_handlers()
+        with connect() as session:
+            job = claim_job(session, self.worker_id, list(handlers.keys()), lease_seconds=self.lease_seconds)
+            if job is None:
+                return False
+            session.expunge(job)
+
+        handler = handlers[job.kind]
+        logger.info(f"Worker {self.worker_id} runs job {job.uuid} ({job.kind}), attempt {job.attempts}/{job.max_attempts}")
+
+        # a job that got reclaimed after a crash may have used up its attempts already
+        if job.attempts > job.max_attempts:
+            with connect() as session:
+                fail_job(session, job, job.error or "Worker stopped while running the job", secrets=handler.secrets, retry=False, worker_id=self.worker_id)
+            return True
+
+        context = JobContext(job, connect, worker_id=self.worker_id)
+        stop_heartbeat = threading.Event()
+        heartbeat_thread = threading.Thread(target=self._heartbeat, args=(job, connect, stop_heartbeat), name=f"metacatalog-job-heartbeat-{job.id}", daemon=True)
+        heartbeat_thread.start()
+        try:
+            if inspect.iscoroutinefunction(handler.func):
+                result = asyncio.run(handler.func(job.payload, context))
+            else:
+                result = handler.func(job.payload, context)
+        except Exception as e:
+            stop_heartbeat.set()
+            # client errors, like invalid tokens, will not succeed on the next attempt either
+            permanent = isinstance(e, PermanentJobError) or 400 <= getattr(e, 'status_code', 500) < 500
+            error = getattr(e, 'detail', None) or str(e) or e.__class__.__name__
+            logger.warning(f"Job {job.uuid} ({job.kind}) failed: {error}")
+            logger.debug(traceback.format_exc())
+            with connect() as session:
+                owned = fail_job(session, job, str(error), secrets=handler.secrets, retry=not permanent, backoff_seconds=self.backoff_seconds, worker_id=self.worker_id)
+        else:
+            stop_heartbeat.set()
+            with connect() as session:
+                owned = complete_job(session, job.id, result, secrets=handler.secrets, worker_id=self.worker_id)
+            if owned:
+                logger.info(f"Job {job.uuid} ({job.kind}) finished")
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        if not owned:
+            logger.warning(f"Job {job.uuid} ({job.kind}) was claimed by another worker, the result of worker {self.worker_id} is dropped")
+        return True
+
+    def purge(self) -> None:
+        """Remove expired job results, at most every purge_interval seconds"""
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + job_settings.purge_interval
+
+        from metacatalog_api.core import connect
+        try:
+            with connect() as session:
+                removed = purge_results(session)
+            if removed > 0:
+                logger.info(f"Worker {self.worker_id} removed the results of {removed} jobs")
+        except Exception as e:
+            logger.warning(f"Purging job results failed: {e}")
+
+    def run(self, stop_event: threading.Event) -> None:
+        while not stop_event.is_set():
+            self.purge()
+            try:
+                worked = self.run_once()
+            except Exception as e:
+                logger.error(f"Job worker {self.worker_id} error: {e}")
+                worked = False
+            if not worked:
+                stop_event.wait(self.poll_interval)
+
+
+def start_workers(count: int, stop_event: threading.Event, **kwargs: Any) -> list[threading.Thread]:
+    """Start count worker threads, which run until stop_event is set"""
+    threads = []
+    for i in range(count):
+        worker = JobWorker(**kwargs)
+        thread = threading.Thread(target=worker.run, args=(stop_event,), name=f"metacatalog-job-worker-{i}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
@@ -1,4 +1,4 @@
-from typing import Optional, Annotated, Any
+from typing import Optional, Annotated, Any, Literal
 from datetime import timedelta
 import json
 
@@ -519,6 +519,71 @@ class EntryCreate(EntryBase):
     groups: list[int | EntryGroupCreate] | None = None
 
 
+class EntryUpdate(SQLModel):
+    """Partial update of an entry, only the fields set are changed"""
+    title: str | None = None
+    abstract: str | None = None
+    external_id: str | None = None
+    location: PointModel | None = None
+    version: int | None = None
+    is_partial: bool | None = None
+    comment: str | None = None
+    citation: str | None = None
+    embargo: bool | None = None
+    embargo_end: datetime | None = None
+    publication: datetime | None = None
+    license: LicenseCreate | int | None = None
+    variable: int | None = None
+    author: AuthorCreate | int | None = None
+    coAuthors: list[AuthorCreate | int] | None = None
+    keywords: list[int] | None = None
+    details: list[DetailCreate] | None = None
+    datasource: DatasourceCreate | None = None
+    groups: list[int | EntryGroupCreate] | None = None
+
+    @field_validator('location', mode='before')
+    def validate_location(cls, v, info):
+        return EntryBase.validate_location(v, info)
+
+
+class EntryVersion(SQLModel):
+    id: int
+    uuid: UUID4
+    title: str
+    version: int
+    publication: datetime | None = None
+    lastUpdate: datetime | None = None
+    is_latest: bool
+
+
+class EntryChange(SQLModel):
+    entry_id: int
+    operation: Literal['created', 'updated', 'deleted']
+    changed_at: datetime
+
+
+class ChangeFeed(SQLModel):
+    changes: list[EntryChange]
+    next: str
+    has_more: bool
+
+
+class BulkEntryResult(SQLModel):
+    index: int
+    success: bool
+    id: int | None = None
+    uuid: UUID4 | None = None
+    title: str | None = None
+    error: str | None = None
+
+
+class BulkEntryResponse(SQLModel):
+    total: int
+    created: int
+    failed: int
+    items: list[BulkEntryResult]
+
+
 class Metadata(EntryBase):
     id: int
     uuid: UUID4
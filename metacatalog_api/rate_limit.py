@@ -0,0 +1,236 @@
+"""
+Token bucket rate limits and concurrency quotas per API token or client IP.
+
+Routes are grouped into route classes (read, write, upload, preview, data, share, stream),
+each with its own RouteLimit. The limits are applied as a FastAPI dependency:
+
+    app.include_router(upload_router, dependencies=[rate_limit('upload')])
+
+Buckets live in memory by default. With METACATALOG_RATE_LIMIT_STORE=sql the
+buckets are kept in the rate_limits table and are shared by all workers. The
+concurrency quotas always count the requests of the current process.
+Exceeded limits are answered with 429 Too Many Requests and a Retry-After header.
+
+Behind a reverse proxy, all requests come from the address of the proxy. List the
+proxies in METACATALOG_RATE_LIMIT_TRUSTED_PROXIES, like '["172.16.0.0/12"]', to
+identify anonymous clients by the X-Forwarded-For header set by the proxies.
+"""
+from typing import Literal
+import ipaddress
+import math
+import threading
+import time
+
+from fastapi import Depends, HTTPException, Request
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlmodel import Session, text
+from starlette.concurrency import run_in_threadpool
+
+from metacatalog_api import access_control
+
+
+class RouteLimit(BaseModel):
+    # sustained requests per second and the number of requests allowed in a burst
+    rate: float
+    burst: int
+    # requests of one client processed at the same time, 0 disables the quota
+    concurrency: int = 0
+
+
+class RateLimitSettings(BaseSettings):
+    """
+    The limits of a route class can be changed like METACATALOG_RATE_LIMIT_UPLOAD__RATE=0.5.
+    Set rate and burst together, fields of a class that are not set fall back to the RouteLimit defaults.
+    """
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_RATE_LIMIT_", env_nested_delimiter='__')
+
+    enabled: bool = True
+    store: Literal['memory', 'sql'] = 'memory'
+    # addresses or networks of reverse proxies, their X-Forwarded-For header is honoured
+    trusted_proxies: list[str] = []
+
+    read: RouteLimit = RouteLimit(rate=20, burst=50, concurrency=20)
+    write: RouteLimit = RouteLimit(rate=5, burst=20, concurrency=5)
+    upload: RouteLimit = RouteLimit(rate=1, burst=5, concurrency=2)
+    preview: RouteLimit = RouteLimit(rate=5, burst=10, concurrency=4)
+    data: RouteLimit = RouteLimit(rate=2, burst=10, concurrency=4)
+    share: RouteLimit = RouteLimit(rate=0.1, burst=3, concurrency=2)
+    # the concurrency of streaming responses, like the SSE change stream, counts the open connections
+    stream: RouteLimit = RouteLimit(rate=1, burst=10, concurrency=10)
+
+    def limit(self, route_class: str) -> RouteLimit:
+        return getattr(self, route_class)
+
+
+rate_limit_settings = RateLimitSettings()
+
+
+class MemoryRateLimitStore:
+    """Token buckets of this process"""
+    def __init__(self, max_items: int = 100000):
+        self.max_items = max_items
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RouteLimit) -> float:
+        """Take one token from the bucket. Returns 0 if allowed, otherwise the seconds until a token is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / limit.rate
+
+            if len(self._buckets) > self.max_items:
+                # buckets of idle clients are full again and can be forgotten
+                for k in [k for k, (_, t) in self._buckets.items() if now - t > 3600]:
+                    del self._buckets[k]
+        return retry_after
+
+
+class SQLRateLimitStore:
+    """Token buckets in the rate_limits table, shared by all workers using the same database"""
+    def take_in_session(self, session: Session, key: str, limit: RouteLimit) -> float:
+        # refill and take in one statement, the row lock serializes concurrent workers
+        sql = text("""
+            INSERT INTO rate_limits AS r (key, tokens, granted, updated_at) VALUES (:key, :burst - 1, true, clock_timestamp())
+            ON CONFLICT (key) DO UPDATE SET
+                granted = LEAST(:burst, r.tokens + EXTRACT(EPOCH FROM clock_timestamp() - r.updated_at) * :rate) >= 1,
+                tokens = LEAST(:burst, r.tokens + EXTRACT(EPOCH FROM clock_timestamp() - r.updated_at) * :rate)
+                    - CASE WHEN LEAST(:burst, r.tokens + EXTRACT(EPOCH FROM clock_timestamp() - r.updated_at) * :rate) >= 1 THEN 1 ELSE 0 END,
+                updated_at = clock_timestamp()
+            RETURNING tokens, granted
+        """)
+        tokens, granted = session.exec(sql, params={'key': key, 'burst': limit.burst, 'rate': limit.rate}).one()
+        session.commit()
+
+        if granted:
+            return 0.0
+        return (1 - tokens) / limit.rate
+
+    def take(self, key: str, limit: RouteLimit) -> float:
+        # Import here to avoid circular imports
+        from metacatalog_api.core import connect
+
+        with connect() as session:
+            return self.take_in_session(session, key, limit)
+
+
+class ConcurrencyQuota:
+    """Number of running requests per client in this process"""
+    def __init__(self):
+        self._active: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: int) -> bool:
+        with self._lock:
+            active = self._active.get(key, 0)
+            if active >= limit:
+                return False
+            self._active[key] = active + 1
+            return True
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            active = self._active.get(key, 1) - 1
+            if active <= 0:
+                self._active.pop(key, None)
+            else:
+                self._active[key] = active
+
+
+memory_store = MemoryRateLimitStore()
+sql_store = SQLRateLimitStore()
+concurrency_quota = ConcurrencyQuota()
+
+
+def _is_trusted(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(proxy, strict=False) for proxy in rate_limit_settings.trusted_proxies)
+
+
+def client_address(request: Request) -> str:
+    """
+    IP address of the client. Requests of trusted proxies are attributed to the last address
+    in X-Forwarded-For that is not a trusted proxy, as the addresses before it can be forged.
+    """
+    host = request.client.host if request.client is not None else 'unknown'
+    if not rate_limit_settings.trusted_proxies or not _is_trusted(host):
+        return host
+
+    forwarded = [a.strip() for value in request.headers.getlist('X-Forwarded-For') for a in value.split(',') if a.strip()]
+    for address in reversed(forwarded):
+        if not _is_trusted(address):
+            return address
+    return forwarded[0] if len(forwarded) > 0 else host
+
+
+def client_key(request: Request, per: Literal['token', 'ip']) -> str:
+    """
+    Identify the client by the hash of its API key, or by its IP address. Only keys that
+    were validated before, i.e. are held by the token_cache, get their own bucket, thus a
+    client can't escape its limit by sending a new random key with every request.
+    """
+    api_key = request.headers.get('X-API-Key')
+    if per == 'token' and api_key:
+        token_hash = access_control.hash_token(api_key)
+        _, token = access_control.token_cache.get(token_hash)
+        if token is not None:
+            return f"token:{token_hash[:32]}"
+    return f"ip:{client_address(request)}"
+
+
+def too_many_requests(retry_after: float, detail: str) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={'Retry-After': str(max(1, math.ceil(retry_after)))})
+
+
+async def take_token(request: Request, route_class: str, per: Literal['token', 'ip'] = 'token') -> float:
+    """
+    Take one token from the bucket of the client. Returns 0 if the request is allowed,
+    otherwise the seconds until a token is available.
+    """
+    limit = rate_limit_settings.limit(route_class)
+    key = f"{route_class}:{client_key(request, per)}"
+    if rate_limit_settings.store == 'sql':
+        return await run_in_threadpool(sql_store.take, key, limit)
+    return memory_store.take(key, limit)
+
+
+def rate_limit(route_class: str, per: Literal['token', 'ip'] = 'token'):
+    """
+    Dependency limiting the requests of one client to the RouteLimit of the route class.
+    Per token limits fall back to the client IP for requests without a validated X-API-Key.
+    """
+    async def dependency(request: Request):
+        if not rate_limit_settings.enabled:
+            yield
+            return
+
+        limit = rate_limit_settings.limit(route_class)
+        key = f"{route_class}:{client_key(request, per)}"
+
+        retry_after = await take_token(request, route_class, per)
+        if retry_after > 0:
+            raise too_many_requests(retry_after, f"Rate limit of {limit.rate:g} requests per second exceeded")
+
+        if limit.concurrency <= 0:
+            yield
+            return
+
+        if not concurrency_quota.acquire(key, limit.concurrency):
+            raise too_many_requests(1, f"Not more than {limit.concurrency} concurrent requests allowed")
+        try:
+            yield
+        finally:
+            concurrency_quota.release(key)
+
+    return Depends(dependency)
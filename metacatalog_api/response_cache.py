@@ -0,0 +1,268 @@
+"""
+Server side cache of complete responses of the read routes.
+
+The GET routes listed in CACHED_ROUTES are answered from core.response_cache if
+possible. The cache key is built from the route, its path parameters and the
+normalized query parameters, thus /entries.json?limit=10&offset=0 and
+/entries?offset=0&limit=10 share one response. Every response is tagged:
+
+    entry:<id>      the response contains the entry
+    person:<id>     the response embeds the person as author or co-author
+    license:<id>    the response embeds the license
+    variable:<id>   the response embeds the variable, or the entries of a variable filter may change
+    entries         any new or changed entry may change the result
+    locations       any new location or datasource may change the result
+    group:<id>      the response contains the group
+
+The write paths of core invalidate the tags they touch, including the persons
+they filled in while matching authors by ORCID. Changes made in the database
+directly are served until the ttl expired. With the memory backend this only
+reaches the cache of the writing process, other workers and a server running
+next to CLI imports serve their responses until the ttl expired. Thus, the
+cache is enabled by default only with METACATALOG_RESPONSE_CACHE_BACKEND=sql,
+which invalidates the cache of all processes. Requests with Cache-Control: no-cache skip the lookup but
+refresh the cached response.
+
+Identical unconditional requests arriving while a 200 response is built wait
+for it and replay it, see core.single_flight. Like the responses replayed from
+the cache, they take a token of the rate limit of the route, as its dependencies
+do not run for them. Responses are sent with an X-Cache header of HIT or MISS.
+"""
+from typing import Callable
+import hashlib
+import json
+import re
+
+from fastapi import Request
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import QueryParams
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metacatalog_api import core
+from metacatalog_api.caching import CachedResponse
+from metacatalog_api.http_cache import is_not_modified
+from metacatalog_api.rate_limit import rate_limit_settings, take_token, too_many_requests
+
+
+def _entry_ids(items) -> set[str]:
+    return {f"entry:{item['id']}" for item in items if isinstance(item, dict) and 'id' in item}
+
+
+def _metadata_tags(items) -> set[str]:
+    """Tags of the entries and of the persons, licenses and variables embedded in their metadata"""
+    tags = _entry_ids(items)
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for person in [item.get('author'), *(item.get('coAuthors') or [])]:
+            if isinstance(person, dict) and 'id' in person:
+                tags.add(f"person:{person['id']}")
+        for name in ('license', 'variable'):
+            if isinstance(item.get(name), dict) and 'id' in item[name]:
+                tags.add(f"{name}:{item[name]['id']}")
+    return tags
+
+
+def entries_tags(params: dict, query: QueryParams, body: bytes) -> set[str]:
+    tags = _metadata_tags(json.loads(body))
+    variable = query.get('variable', '')
+    if variable.isdigit() and not any(query.get(p) for p in ('search', 'title', 'geolocation')):
+        # only new entries of this variable can be added to the result
+        tags.add(f"variable:{variable}")
+    else:
+        tags.add('entries')
+    if query.get('geolocation'):
+        tags.add('locations')
+    return tags
+
+
+def entry_tags(params: dict, query: QueryParams, body: bytes) -> set[str]:
+    return {f"entry:{params['id']}", *_metadata_tags([json.loads(body)])}
+
+
+def export_tags(params: dict, query: QueryParams, body: bytes) -> set[str]:
+    # the rendered formats can't be parsed, the references are looked up instead
+    references = core.entry_references(int(params['id']))
+    return {
+        f"entry:{params['id']}",
+        *[f"person:{i}" for i in references['persons']],
+        *[f"license:{i}" for i in references['licenses']],
+        *[f"variable:{i}" for i in references['variables']]
+    }
+
+
+def locations_tags(params: dict, query: QueryParams, body: bytes) -> set[str]:
+    features = json.loads(body).get('features') or []
+    tags = _entry_ids([feature.get('properties', {}) for feature in features])
+    if query.get('search'):
+        tags.add('entries')
+    if not query.get('ids'):
+        tags.add('locations')
+    return tags
+
+
+def group_tags(params: dict, query: QueryParams, body: bytes) -> set[str]:
+    return {f"group:{params['id']}", *_metadata_tags(json.loads(body).get('entries') or [])}
+
+
+class CachedRoute:
+    def __init__(self, name: str, pattern: str, tags: Callable[[dict, QueryParams, bytes], set[str]], route_class: str = 'read', per: str = 'ip'):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.tags = tags
+        # the rate limit of the router, see default_server
+        self.route_class = route_class
+        self.per = per
+
+
+CACHED_ROUTES = [
+    CachedRoute('entries', r'/entries(\.json)?', entries_tags),
+    CachedRoute('entry', r'/entries/(?P<id>\d+)(\.json)?', entry_tags),
+    CachedRoute('locations', r'/locations\.json', locations_tags),
+    CachedRoute('group', r'/groups/(?P<id>\d+)(\.json)?', group_tags),
+    CachedRoute('export', r'/export/(?P<id>\d+)/(?P<format>[\w-]+)', export_tags),
+]
+
+
+def find_route(path: str) -> tuple[CachedRoute, dict] | tuple[None, None]:
+    for route in CACHED_ROUTES:
+        match = route.pattern.fullmatch(path)
+        if match is not None:
+            return route, {k: v for k, v in match.groupdict().items() if v is not None}
+    return None, None
+
+
+def cache_key(route: CachedRoute, params: dict, query: QueryParams) -> str:
+    # empty parameters are dropped and the order of the parameters does not matter
+    normalized = sorted((k, v.strip()) for k, v in query.multi_items() if v.strip() != '')
+    raw = f"{route.name}|{sorted(params.items())}|{normalized}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _header(headers: list[list[str]], name: str) -> str | None:
+    return next((v for k, v in headers if k.lower() == name), None)
+
+
+CONDITIONAL_HEADERS = (b'if-none-match', b'if-modified-since')
+
+
+def is_conditional(scope: Scope) -> bool:
+    return any(k.lower() in CONDITIONAL_HEADERS for k, _ in scope['headers'])
+
+
+class ResponseCacheMiddleware:
+    """
+    Answer the read routes from the response cache.
+    Add it before the CORS middleware, so that cached responses pass the CORS middleware, too.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def _call(self, func, *args):
+        # the memory backend does not block, the sql backend runs in the threadpool
+        if core.response_cache.is_local:
+            return func(*args)
+        return await run_in_threadpool(func, *args)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] != 'GET' or not core.response_cache.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path'].removeprefix(scope.get('root_path', ''))
+        route, params = find_route(path)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        key = cache_key(route, params, request.query_params)
+        if 'no-cache' not in request.headers.get('cache-control', ''):
+            cached = await self._call(core.response_cache.get, key)
+            if cached is not None:
+                if not await self._rate_limited(route, request, scope, receive, send):
+                    await self._replay(cached, request, scope, receive, send)
+                return
+
+        # the response of a conditional request may be a 304, which can't be shared
+        if is_conditional(scope):
+            await self._execute(route, params, key, request, scope, receive, send)
+            return
+
+        # identical requests arriving meanwhile wait for this one and replay its response
+        executed = False
+
+        async def execute() -> CachedResponse | None:
+            nonlocal executed
+            executed = True
+            return await self._execute(route, params, key, request, scope, receive, send)
+
+        response = await core.single_flight.acall(('response', key), execute)
+        if executed:
+            return
+        if response is None:
+            # only 200 responses are shared, i.e. the first request may have been rate limited
+            await self._execute(route, params, key, request, scope, receive, send)
+            return
+
+        if not await self._rate_limited(route, request, scope, receive, send):
+            await self._replay(response, request, scope, receive, send, x_cache='MISS')
+
+    async def _rate_limited(self, route: CachedRoute, request: Request, scope: Scope, receive: Receive, send: Send) -> bool:
+        """
+        Take a token of the rate limit of the route for a request that is answered without
+        running the route and its dependencies. Answers with 429 if no token is left.
+        """
+        if not rate_limit_settings.enabled:
+            return False
+        retry_after = await take_token(request, route.route_class, route.per)
+        if retry_after <= 0:
+            return False
+        error = too_many_requests(retry_after, 'Rate limit exceeded')
+        await JSONResponse({'detail': error.detail}, status_code=error.status_code, headers=error.headers)(scope, receive, send)
+        return True
+
+    async def _execute(self, route: CachedRoute, params: dict, key: str, request: Request, scope: Scope, receive: Receive, send: Send) -> CachedResponse | None:
+        # writes during the request invalidate before the response is stored
+        generation = core.response_cache.generation
+        status_code = None
+        headers: list[list[str]] = []
+        body = bytearray()
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                headers.extend([k.decode('latin-1'), v.decode('latin-1')] for k, v in message.get('headers', []))
+                message = {**message, 'headers': [*message.get('headers', []), (b'x-cache', b'MISS')]}
+            elif message['type'] == 'http.response.body' and len(body) <= core.response_cache.max_response_size:
+                body.extend(message.get('body', b''))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+        # only complete 200 responses are shared with waiting requests and stored
+        if status_code != 200 or len(body) > core.response_cache.max_response_size:
+            return None
+        response = CachedResponse(status_code, headers, bytes(body), [], 0.0)
+        try:
+            # tagging parses the body and may query the database
+            tags = await run_in_threadpool(route.tags, params, request.query_params, response.body)
+        except (ValueError, AttributeError, TypeError, SQLAlchemyError):
+            # responses that can't be tagged can't be invalidated either
+            return response
+        await self._call(core.response_cache.set, key, status_code, headers, response.body, tags, generation)
+        return response
+
+    async def _replay(self, cached: CachedResponse, request: Request, scope: Scope, receive: Receive, send: Send, x_cache: str = 'HIT') -> None:
+        etag = _header(cached.headers, 'etag')
+        if etag is not None and is_not_modified(request, etag):
+            headers = {k: v for k, v in cached.headers if k.lower() in ('etag', 'cache-control')}
+            response = Response(status_code=304, headers={**headers, 'X-Cache': x_cache})
+        else:
+            response = Response(cached.body, status_code=cached.status_code)
+            response.raw_headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in cached.headers]
+            response.raw_headers.append((b'x-cache', x_cache.encode('latin-1')))
+        await response(scope, receive, send)
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from metacatalog_api import core
+from metacatalog_api import models
+from metacatalog_api.change_stream import change_broadcaster
+
+
+changes_router = APIRouter()
+# the stream holds its connection open, thus it is limited by its own route class
+changes_stream_router = APIRouter()
+
+
+@changes_router.get('/changes')
+@changes_router.get('/changes.json')
+async def get_changes(since: str = None, limit: int = Query(1000, ge=1, le=10000)) -> models.ChangeFeed:
+    """
+    Entries created, updated or deleted after the since token, in the order of their changes.
+    Pass the next token of the response as since to get the following changes; if has_more
+    is false, the consumer caught up. Without since, the feed starts at the first recorded
+    change, since=now only returns a token to follow future changes.
+    """
+    try:
+        return await run_in_threadpool(core.changes, since=since, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@changes_stream_router.get('/changes/stream')
+async def stream_changes(since: str = None, last_event_id: str = Header(None)):
+    """
+    Server-Sent Events stream of the entry changes. Every 'changes' event carries one page of
+    the change feed, its id is the token of the page. Clients reconnecting with the
+    Last-Event-ID header, or passing a since token, first receive the changes they missed.
+    """
+    since = last_event_id or since
+    try:
+        core.decode_change_token(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        async for feed in change_broadcaster.subscribe(since=since):
+            if feed is None:
+                yield ": keepalive\n\n"
+            else:
+                data = feed.model_dump_json(include={'changes'})
+                yield f"id: {feed.next}\nevent: changes\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -1,4 +1,10 @@
-from fastapi import APIRouter
+from typing import Any, AsyncIterator
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 
 from metacatalog_api import core
 from metacatalog_api import models
@@ -11,6 +17,105 @@ def add_entry(payload: models.EntryCreate, author_duplicates: bool = False) -> m
     return metadata
 
 
+async def _iter_bulk_items(request: Request) -> AsyncIterator[Any]:
+    """Yield the raw items of a JSON array or a NDJSON stream"""
+    content_type = request.headers.get('content-type', '')
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        buffer = b''
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+    else:
+        try:
+            items = await request.json()
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}") from e
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of entries or a NDJSON stream")
+        for item in items:
+            yield item
+
+
+@create_router.post('/entries/bulk')
+async def add_entries_bulk(
+    request: Request,
+    author_duplicates: bool = False,
+    batch_size: int = Query(500, ge=1, le=5000)
+) -> models.BulkEntryResponse:
+    """
+    Create many entries at once. The body is a JSON array of entries, or a NDJSON stream
+    with one entry per line (Content-Type: application/x-ndjson). The entries are inserted
+    in batches of batch_size, each batch is committed in one transaction.
+    The response reports the success or failure of every item by its position in the body.
+    """
+    results: list[models.BulkEntryResult] = []
+    batch: list[models.EntryCreate] = []
+    indices: list[int] = []
+
+    index = 0
+    async for item in _iter_bulk_items(request):
+        try:
+            if isinstance(item, bytes):
+                payload = models.EntryCreate.model_validate_json(item)
+            else:
+                payload = models.EntryCreate.model_validate(item)
+        except ValidationError as e:
+            results.append(models.BulkEntryResult(index=index, success=False, error=str(e)))
+        else:
+            batch.append(payload)
+            indices.append(index)
+        index += 1
+
+        if len(batch) >= batch_size:
+            results.extend(await run_in_threadpool(core.add_entries_bulk, batch, author_duplicates, indices))
+            batch, indices = [], []
+
+    if len(batch) > 0:
+        results.extend(await run_in_threadpool(core.add_entries_bulk, batch, author_duplicates, indices))
+
+    results.sort(key=lambda r: r.index)
+    created = sum(1 for r in results if r.success)
+    return models.BulkEntryResponse(total=len(results), created=created, failed=len(results) - created, items=results)
+
+
+def _update_entry(entry_id: int, payload: models.EntryUpdate | models.EntryCreate, replace: bool, author_duplicates: bool, new_version: bool) -> models.Metadata:
+    try:
+        metadata = core.update_entry(entry_id, payload=payload, replace=replace, author_duplicates=author_duplicates, new_version=new_version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except IntegrityError as e:
+        raise HTTPException(status_code=409, detail=str(e.orig)) from e
+    if metadata is None:
+        raise HTTPException(status_code=404, detail=f"Entry of id {entry_id} not found")
+    return metadata
+
+
+@create_router.patch('/entries/{entry_id}')
+def update_entry(entry_id: int, payload: models.EntryUpdate, author_duplicates: bool = False, new_version: bool = False) -> models.Metadata:
+    """
+    Change the given fields of an entry, all other fields are kept. Lists like keywords,
+    coAuthors, details or groups replace the current list. Setting datasource to null
+    removes the datasource. With new_version=true, the entry is kept as it is and a new
+    version with the changes is returned.
+    """
+    return _update_entry(entry_id, payload, replace=False, author_duplicates=author_duplicates, new_version=new_version)
+
+
+@create_router.put('/entries/{entry_id}')
+def replace_entry(entry_id: int, payload: models.EntryCreate, author_duplicates: bool = False, new_version: bool = False) -> models.Metadata:
+    """
+    Replace an entry. Fields missing in the payload are reset, the id, uuid and
+    publication date of the entry are kept. With new_version=true, the payload
+    becomes a new version of the entry.
+    """
+    return _update_entry(entry_id, payload, replace=True, author_duplicates=author_duplicates, new_version=new_version)
+
+
 @create_router.post('/entries/{entry_id}/datasource')
 def add_datasource(entry_id: int, payload: models.DatasourceCreate) -> models.Metadata:
     metadata = core.add_datasource(entry_id=entry_id, payload=payload)
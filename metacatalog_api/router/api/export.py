@@ -1,11 +1,24 @@
 from pathlib import Path
+from typing import Callable, Generator, Iterator, Literal
+from functools import lru_cache
+from collections import OrderedDict
+from datetime import datetime
+from uuid import uuid4
+import hashlib
+import json
+import re
 
 import httpx
 
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
 
 from metacatalog_api import core
+from metacatalog_api import models
+from metacatalog_api.jobs import register_job, JobContext
+from metacatalog_api.http_cache import is_not_modified
 from metacatalog_api.server import server
 
 export_router = APIRouter()
@@ -13,65 +26,235 @@ export_router = APIRouter()
 templates = Jinja2Templates(directory=Path(__file__).parent / 'templates')
 
 
-def render_export(app, entry_id: int, format_name: str, request: Request) -> tuple[str, str]:
+class ExportRenderer(BaseModel):
+    """A registered export format, rendering an already loaded Metadata object"""
+    format: str
+    render: Callable[[models.Metadata, Request | None], str]
+    media_type: str = 'application/xml'
+    filename: str
+    display_name: str | None = None
+    template: str | None = None
+
+    @property
+    def template_hash(self) -> str:
+        """Hash of the template source, so that changed templates do not hit cached exports"""
+        if self.template is None:
+            return ''
+        path = Path(__file__).parent / 'templates' / self.template
+        return _hash_template(str(path), path.stat().st_mtime_ns)
+
+
+EXPORT_RENDERERS: dict[str, ExportRenderer] = {}
+
+
+class ExportProgress(BaseModel):
+    id: str
+    format: str
+    total: int
+    done: int = 0
+    status: Literal['running', 'finished', 'failed', 'cancelled'] = 'running'
+    started: datetime
+    finished: datetime | None = None
+    error: str | None = None
+
+
+# progress of the most recent bulk exports of this process
+EXPORT_PROGRESS: OrderedDict[str, ExportProgress] = OrderedDict()
+MAX_TRACKED_EXPORTS = 256
+
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>\s*')
+
+
+@lru_cache(maxsize=64)
+def _hash_template(path: str, mtime: int) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def export_filename(format_name: str) -> str:
+    """Suggested filename of an export format inside a package"""
+    if format_name == 'json':
+        return "entry.json"
+    elif format_name == 'schemaorg':
+        return "entry_schemaorg.json"
+    elif format_name.endswith('.json'):
+        return f"entry_{format_name}"
+    else:
+        return f"entry_{format_name}.xml"
+
+
+def register_renderer(format_name: str, media_type: str = 'application/xml', filename: str = None, display_name: str = None, template: str = None):
+    """
+    Decorator to register a function as renderer for an export format.
+    The function is called as render(entry, request) with an already loaded
+    models.Metadata and has to return the export as string. The request may be None
+    if the export is rendered outside of a HTTP request, i.e. for packages.
+    Third-party exporters can use this decorator to make their format available to
+    packaging and bulk export without an internal HTTP round trip.
+    If the renderer is based on a template from this package, pass its name as template,
+    so that cached exports are invalidated whenever the template changes.
     """
-    Dynamically render an entry export by making a request to the export API endpoint.
-    Uses ASGI transport for efficient internal requests.
-    This works with any export route, including third-party ones.
-    
+    def decorator(func: Callable[[models.Metadata, Request | None], str]):
+        EXPORT_RENDERERS[format_name] = ExportRenderer(
+            format=format_name,
+            render=func,
+            media_type=media_type,
+            filename=filename if filename is not None else export_filename(format_name),
+            display_name=display_name,
+            template=template
+        )
+        return func
+    return decorator
+
+
+def render_template(name: str, entry: models.Metadata, request: Request | None = None, **context) -> str:
+    return templates.get_template(name).render(entry=entry, request=request, **context)
+
+
+def _render_export_via_route(app, entry_id: int, format_name: str) -> str:
+    # fallback for third-party export routes that did not register a renderer
+    export_url = f"/export/{entry_id}/{format_name}"
+
+    with httpx.Client(transport=httpx.ASGITransport(app=app), base_url="http://metacatalog") as client:
+        response = client.get(export_url)
+
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail=f"Export format '{format_name}' not found")
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to export format '{format_name}': {response.text}"
+            )
+
+        return response.text
+
+
+def render_export(entry: models.Metadata, format_name: str, request: Request | None = None, app=None) -> tuple[str, str]:
+    """
+    Render an already loaded entry into the given export format.
+    Registered renderers are called directly. Export routes that only exist as
+    FastAPI route, i.e. from third-party packages, are requested through the
+    ASGI app, if it is given.
+
     Returns:
         tuple: (content, filename) where content is the rendered export as string
                and filename is the suggested filename for the export
     """
-    # Make request to the export endpoint using ASGI transport
-    export_url = f"/export/{entry_id}/{format_name}"
-    
     try:
-        with httpx.Client(transport=httpx.ASGITransport(app=app)) as client:
-            response = client.get(export_url)
-            
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail=f"Export format '{format_name}' not found")
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to export format '{format_name}': {response.text}"
-                )
-            
-            # Get content from response
-            content = response.text
-            
-            # Determine filename based on format
-            if format_name == 'json':
-                filename = "entry.json"
-            elif format_name == 'schemaorg':
-                filename = "entry_schemaorg.json"
-            elif format_name.endswith('.json'):
-                filename = f"entry_{format_name}"
-            else:
-                filename = f"entry_{format_name}.xml"
-            
-            return content, filename
-            
+        if format_name in EXPORT_RENDERERS:
+            renderer = EXPORT_RENDERERS[format_name]
+            return render_cached(entry, renderer, request), renderer.filename
+
+        if app is None and request is not None:
+            app = request.app
+        if app is None:
+            raise HTTPException(status_code=404, detail=f"Export format '{format_name}' not found")
+
+        return _render_export_via_route(app, entry.id, format_name), export_filename(format_name)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to render export format '{format_name}': {str(e)}")
 
 
+def render_cached(entry: models.Metadata, renderer: ExportRenderer, request: Request | None = None) -> str:
+    """Render the entry with the given renderer, using the export cache"""
+    key = core.export_cache.key(entry.id, renderer.format, entry.lastUpdate, renderer.template_hash)
+    content = core.export_cache.get(key)
+    if content is None:
+        content = renderer.render(entry, request)
+        core.export_cache.set(key, content)
+    return content
+
+
+def get_entry_or_404(entry_id: int) -> models.Metadata:
+    entries = core.entries(ids=entry_id)
+
+    if len(entries) == 0:
+        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
+
+    return entries[0]
+
+
+def export_response(entry_id: int, format_name: str, request: Request) -> Response:
+    """
+    Return the rendered export of the entry in the given format.
+    Only the lastUpdate of the entry is queried to build the cache key, the entry is
+    loaded and rendered only if the export is not cached. Changes of the groups of an
+    entry bump its lastUpdate as well, as some formats list the groups, and so do updates
+    of the embedded persons, licenses, variables and keywords.
+    The cache key is sent as ETag, requests with a matching If-None-Match header are
+    answered with 304 Not Modified.
+    """
+    renderer = EXPORT_RENDERERS[format_name]
+
+    exists, last_update = core.entry_last_update(entry_id)
+    if not exists:
+        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
+
+    key = core.export_cache.key(entry_id, format_name, last_update, renderer.template_hash)
+    etag = f'"{key}"'
+    headers = {'ETag': etag}
+
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    content = core.export_cache.get(key)
+    if content is None:
+        content = renderer.render(get_entry_or_404(entry_id), request)
+        core.export_cache.set(key, content)
+
+    return Response(content=content, media_type=renderer.media_type, headers=headers)
+
+
+@register_renderer('json', media_type='application/json')
+def render_json(entry: models.Metadata, request: Request | None = None) -> str:
+    return entry.model_dump_json()
+
+
+@register_renderer('xml', template='entry.xml')
+def render_xml(entry: models.Metadata, request: Request | None = None) -> str:
+    groups = core.groups(entry_id=entry.id)
+    return render_template("entry.xml", entry, request, groups=groups, path=server.app_prefix)
+
+
+@register_renderer('dublincore', template='dublincore.xml')
+def render_dublincore(entry: models.Metadata, request: Request | None = None) -> str:
+    return render_template("dublincore.xml", entry, request)
+
+
+@register_renderer('schemaorg', media_type='application/ld+json', template='schemaorg.json')
+def render_schemaorg(entry: models.Metadata, request: Request | None = None) -> str:
+    return render_template("schemaorg.json", entry, request)
+
+
+@register_renderer('rdf', template='rdf.xml')
+def render_rdf(entry: models.Metadata, request: Request | None = None) -> str:
+    return render_template("rdf.xml", entry, request)
+
+
+@register_renderer('datacite', template='datacite.xml')
+def render_datacite(entry: models.Metadata, request: Request | None = None) -> str:
+    return render_template("datacite.xml", entry, request)
+
+
+@register_renderer('zku', template='zku.xml')
+def render_zku(entry: models.Metadata, request: Request | None = None) -> str:
+    return render_template("zku.xml", entry, request)
+
+
+@register_renderer('iso19115', template='iso19115.xml')
+def render_iso19115(entry: models.Metadata, request: Request | None = None) -> str:
+    return render_template("iso19115.xml", entry, request)
+
+
 @export_router.get('/export/{entry_id}/json')
-def export_json(entry_id: int):
+def export_json(entry_id: int, request: Request):
     """
     MetaCatalog JSON
     Export entry as JSON format
     """
-    entries = core.entries(ids=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return entries[0]
+    return export_response(entry_id, 'json', request)
 
 
 @export_router.get('/export/{entry_id}/xml')
@@ -80,18 +263,7 @@ def export_xml(entry_id: int, request: Request):
     MetaCatalog XML
     Export entry as XML format using Jinja template
     """
-    entries = core.entries(ids=entry_id)
-    groups = core.groups(entry_id=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return templates.TemplateResponse(
-        request=request, 
-        name="entry.xml", 
-        context={"entry": entries[0], "groups": groups, "path": server.app_prefix}, 
-        media_type='application/xml'
-    )
+    return export_response(entry_id, 'xml', request)
 
 
 @export_router.get('/export/{entry_id}/dublincore')
@@ -100,17 +272,7 @@ def export_dublincore(entry_id: int, request: Request):
     Dublin Core
     Export entry as Dublin Core XML format using Jinja template
     """
-    entries = core.entries(ids=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return templates.TemplateResponse(
-        request=request, 
-        name="dublincore.xml", 
-        context={"entry": entries[0]}, 
-        media_type='application/xml'
-    )
+    return export_response(entry_id, 'dublincore', request)
 
 
 @export_router.get('/export/{entry_id}/schemaorg')
@@ -119,17 +281,7 @@ def export_schemaorg(entry_id: int, request: Request):
     Schema.org Dataset
     Export entry as Schema.org Dataset JSON-LD format using Jinja template
     """
-    entries = core.entries(ids=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return templates.TemplateResponse(
-        request=request, 
-        name="schemaorg.json", 
-        context={"entry": entries[0]}, 
-        media_type='application/ld+json'
-    )
+    return export_response(entry_id, 'schemaorg', request)
 
 
 @export_router.get('/export/{entry_id}/rdf')
@@ -138,17 +290,7 @@ def export_rdf(entry_id: int, request: Request):
     RDF/XML
     Export entry as RDF/XML format using hybrid vocabulary approach
     """
-    entries = core.entries(ids=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return templates.TemplateResponse(
-        request=request, 
-        name="rdf.xml", 
-        context={"entry": entries[0]}, 
-        media_type='application/xml'
-    )
+    return export_response(entry_id, 'rdf', request)
 
 
 @export_router.get('/export/{entry_id}/datacite')
@@ -157,17 +299,7 @@ def export_datacite(entry_id: int, request: Request):
     DataCite
     Export entry as DataCite XML format for research repositories like Zenodo
     """
-    entries = core.entries(ids=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return templates.TemplateResponse(
-        request=request, 
-        name="datacite.xml", 
-        context={"entry": entries[0]}, 
-        media_type='application/xml'
-    )
+    return export_response(entry_id, 'datacite', request)
 
 
 @export_router.get('/export/{entry_id}/zku')
@@ -176,17 +308,7 @@ def export_zku(entry_id: int, request: Request):
     ZKU/XML
     Export entry as ZKU/XML format for research repositories like Zenodo
     """
-    entries = core.entries(ids=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return templates.TemplateResponse(
-        request=request, 
-        name="zku.xml", 
-        context={"entry": entries[0]}, 
-        media_type='application/xml'
-    )
+    return export_response(entry_id, 'zku', request)
 
 
 @export_router.get('/export/{entry_id}/iso19115')
@@ -195,14 +317,153 @@ def export_iso19115(entry_id: int, request: Request):
     ISO 19115
     Export entry as ISO 19115/ISO 19139 XML format for geographic metadata
     """
-    entries = core.entries(ids=entry_id)
-    
-    if len(entries) == 0:
-        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
-    
-    return templates.TemplateResponse(
-        request=request, 
-        name="iso19115.xml", 
-        context={"entry": entries[0]}, 
-        media_type='application/xml'
-    )
\ No newline at end of file
+    return export_response(entry_id, 'iso19115', request)
+
+
+def _track_export(format_name: str, total: int) -> ExportProgress:
+    progress = ExportProgress(id=uuid4().hex, format=format_name, total=total, started=datetime.now())
+    EXPORT_PROGRESS[progress.id] = progress
+    while len(EXPORT_PROGRESS) > MAX_TRACKED_EXPORTS:
+        EXPORT_PROGRESS.popitem(last=False)
+    return progress
+
+
+def _stream_bulk_export(renderer: ExportRenderer, entries: Iterator[models.Metadata], progress: ExportProgress, style: str, request: Request | None = None) -> Generator[str, None, None]:
+    is_json = renderer.media_type.endswith('json')
+    try:
+        if not is_json:
+            yield f'<?xml version="1.0" encoding="UTF-8"?>\n<collection format="{renderer.format}" count="{progress.total}">\n'
+        elif style == 'array':
+            yield '['
+
+        for entry in entries:
+            content = render_cached(entry, renderer, request)
+
+            if not is_json:
+                yield XML_DECLARATION.sub('', content, count=1).rstrip() + '\n'
+            elif style == 'array':
+                yield (',' if progress.done > 0 else '') + content
+            else:
+                # NDJSON needs every document on a single line
+                yield (json.dumps(json.loads(content)) if '\n' in content else content) + '\n'
+            progress.done += 1
+
+        if not is_json:
+            yield '</collection>\n'
+        elif style == 'array':
+            yield ']'
+        progress.status = 'finished'
+    except GeneratorExit:
+        progress.status = 'cancelled'
+        raise
+    except Exception as e:
+        progress.status = 'failed'
+        progress.error = str(e)
+        raise
+    finally:
+        progress.finished = datetime.now()
+
+
+def _bulk_media_type(renderer: ExportRenderer, style: str) -> tuple[str, str]:
+    """media type and file extension of a bulk export"""
+    if not renderer.media_type.endswith('json'):
+        return 'application/xml', 'xml'
+    elif style == 'array':
+        return 'application/json', 'json'
+    return 'application/x-ndjson', 'ndjson'
+
+
+@export_router.get('/export/{format_name}')
+def export_bulk(
+    format_name: str,
+    request: Request,
+    ids: list[int] = Query(None),
+    search: str = None,
+    group: int = None,
+    full_text: bool = True,
+    style: Literal['ndjson', 'array'] = 'ndjson',
+    background: bool = False,
+    all_versions: bool = False
+):
+    """
+    Stream many entries in one export format. Without filter the whole catalog is exported,
+    otherwise the entries can be selected by ids, a search and the id of a group.
+    Like /entries, only the latest versions are exported, unless all_versions=true.
+    JSON based formats are streamed as NDJSON or as JSON array (style=array), XML formats
+    are streamed as one <collection> document. The X-Export-Id header can be used to
+    observe the progress at /export-progress/{export_id}.
+    With background=true, the export is written to a file by a job worker and can be
+    downloaded from /jobs/{job_id}/result once it is finished.
+    """
+    if format_name not in EXPORT_RENDERERS:
+        raise HTTPException(status_code=404, detail=f"Export format '{format_name}' not found or does not support bulk export")
+    renderer = EXPORT_RENDERERS[format_name]
+
+    # sanitize the search
+    if search is not None and search.strip() == '':
+        search = None
+
+    if background:
+        job = core.enqueue_job('export.bulk', {
+            'format_name': format_name,
+            'ids': ids,
+            'search': search,
+            'group': group,
+            'full_text': full_text,
+            'style': style,
+            'all_versions': all_versions
+        })
+        return {
+            "job_id": job.id,
+            "links": {
+                "Status": f"{server.uri_prefix}jobs/{job.id}",
+                "Download": f"{server.uri_prefix}jobs/{job.id}/result"
+            }
+        }
+
+    total, entries = core.bulk_entries(ids=ids, search=search, group_id=group, full_text=full_text, all_versions=all_versions)
+    progress = _track_export(format_name, total)
+    media_type, _ = _bulk_media_type(renderer, style)
+
+    return StreamingResponse(
+        _stream_bulk_export(renderer, entries, progress, style, request),
+        media_type=media_type,
+        headers={'X-Export-Id': progress.id, 'X-Total-Count': str(total)}
+    )
+
+
+@register_job('export.bulk')
+def run_bulk_export(payload: dict, context: JobContext) -> dict:
+    """Job handler writing a bulk export into the job result directory"""
+    renderer = EXPORT_RENDERERS[payload['format_name']]
+    style = payload.get('style', 'ndjson')
+    media_type, extension = _bulk_media_type(renderer, style)
+
+    total, entries = core.bulk_entries(
+        ids=payload.get('ids'),
+        search=payload.get('search'),
+        group_id=payload.get('group'),
+        full_text=payload.get('full_text', True),
+        all_versions=payload.get('all_versions', False)
+    )
+    progress = ExportProgress(id=context.uuid, format=renderer.format, total=total, started=datetime.now())
+
+    filename = f"export_{renderer.format}.{extension}"
+    path = context.result_directory / filename
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in _stream_bulk_export(renderer, entries, progress, style):
+            f.write(chunk)
+            if progress.done % 100 == 0 and total > 0:
+                context.progress(progress.done / total, f"Exported {progress.done} of {total} entries")
+
+    return {"file": str(path), "filename": filename, "media_type": media_type, "count": progress.done}
+
+
+@export_router.get('/export-progress/{export_id}')
+def get_export_progress(export_id: str) -> ExportProgress:
+    """
+    Get the progress of a running or recently finished bulk export of this server process
+    """
+    if export_id not in EXPORT_PROGRESS:
+        raise HTTPException(status_code=404, detail=f"Export <ID={export_id}> not found")
+    return EXPORT_PROGRESS[export_id]
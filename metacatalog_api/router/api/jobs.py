@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+from metacatalog_api import core
+from metacatalog_api.jobs import Job, job_settings
+
+
+jobs_router = APIRouter()
+
+
+async def get_job_or_404(job_id: str) -> Job:
+    job = await run_in_threadpool(core.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job <ID={job_id}> not found")
+    return job
+
+
+@jobs_router.get('/jobs/{job_id}')
+@jobs_router.get('/jobs/{job_id}.json')
+async def get_job_status(job_id: str) -> Job:
+    return await get_job_or_404(job_id)
+
+
+@jobs_router.get('/jobs/{job_id}/result')
+async def get_job_result(job_id: str):
+    job = await get_job_or_404(job_id)
+
+    if job.status == 'failed':
+        raise HTTPException(status_code=422, detail=f"Job <ID={job_id}> failed: {job.error}")
+    if job.status != 'finished':
+        raise HTTPException(status_code=409, detail=f"Job <ID={job_id}> is {job.status} ({job.progress:.0%})")
+
+    result = job.result or {}
+    if 'file' not in result:
+        return result
+
+    # only files written into the job result directory are served
+    path = Path(result['file']).resolve()
+    jobs_dir = job_settings.result_directory.resolve()
+    if not path.is_relative_to(jobs_dir) or not path.is_file():
+        raise HTTPException(status_code=410, detail=f"The result of job <ID={job_id}> is not available anymore")
+
+    return FileResponse(
+        path,
+        media_type=result.get('media_type', 'application/octet-stream'),
+        filename=result.get('filename', path.name)
+    )
@@ -0,0 +1,303 @@
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+import base64
+import json
+import re
+
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from metacatalog_api import core
+from metacatalog_api import models
+from metacatalog_api.server import server
+from metacatalog_api.router.api.export import EXPORT_RENDERERS, XML_DECLARATION, render_cached
+
+
+oai_router = APIRouter()
+
+templates = Jinja2Templates(directory=Path(__file__).parent / 'templates')
+
+
+class OAIMetadataFormat(BaseModel):
+    renderer: str
+    schema_url: str
+    namespace: str
+
+
+# OAI-PMH metadataPrefix to export renderer mapping
+METADATA_FORMATS: dict[str, OAIMetadataFormat] = {
+    'oai_dc': OAIMetadataFormat(
+        renderer='dublincore',
+        schema_url='http://www.openarchives.org/OAI/2.0/oai_dc.xsd',
+        namespace='http://www.openarchives.org/OAI/2.0/oai_dc/'
+    ),
+    'datacite': OAIMetadataFormat(
+        renderer='datacite',
+        schema_url='http://schema.datacite.org/meta/kernel-4/metadata.xsd',
+        namespace='http://datacite.org/schema/kernel-4'
+    ),
+    'iso19139': OAIMetadataFormat(
+        renderer='iso19115',
+        schema_url='http://www.isotc211.org/2005/gmd/gmd.xsd',
+        namespace='http://www.isotc211.org/2005/gmd'
+    ),
+}
+
+# allowed arguments of each verb: (required, optional)
+VERBS: dict[str, tuple[set[str], set[str]]] = {
+    'Identify': (set(), set()),
+    'ListMetadataFormats': (set(), {'identifier'}),
+    'ListIdentifiers': ({'metadataPrefix'}, {'from', 'until', 'set'}),
+    'ListRecords': ({'metadataPrefix'}, {'from', 'until', 'set'}),
+    'GetRecord': ({'identifier', 'metadataPrefix'}, set()),
+    'ListSets': (set(), set()),
+}
+
+DAY_GRANULARITY = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+SECONDS_GRANULARITY = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+
+
+class OAIError(Exception):
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def format_datestamp(value: datetime | None) -> str:
+    # lastUpdate is stored without timezone and is interpreted as UTC
+    if value is None:
+        return ''
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_datestamp(value: str, until: bool = False) -> tuple[datetime, str]:
+    """
+    Parse an OAI-PMH datestamp. Returns the datetime and its granularity.
+    As until is inclusive in OAI-PMH, but exclusive in the database query, it is
+    shifted to the next day or second, depending on the granularity.
+    """
+    if DAY_GRANULARITY.match(value):
+        parsed, granularity, step = datetime.strptime(value, '%Y-%m-%d'), 'day', timedelta(days=1)
+    elif SECONDS_GRANULARITY.match(value):
+        parsed, granularity, step = datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ'), 'seconds', timedelta(seconds=1)
+    else:
+        raise OAIError('badArgument', f"Invalid datestamp '{value}'. Use YYYY-MM-DD or YYYY-MM-DDThh:mm:ssZ")
+
+    return (parsed + step if until else parsed), granularity
+
+
+def encode_resumption_token(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_resumption_token(token: str) -> dict:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8'))
+        if state['m'] not in METADATA_FORMATS:
+            raise ValueError(state['m'])
+        return state
+    except Exception:
+        raise OAIError('badResumptionToken', 'The resumptionToken is invalid or expired')
+
+
+def oai_identifier(request: Request, entry_id: int) -> str:
+    return f"oai:{request.url.hostname}:{entry_id}"
+
+
+def parse_identifier(identifier: str) -> int:
+    try:
+        return int(identifier.rsplit(':', 1)[-1])
+    except ValueError:
+        raise OAIError('idDoesNotExist', f"The identifier '{identifier}' is unknown in this repository")
+
+
+def render_metadata(entry: models.Metadata, prefix: str) -> str:
+    content = render_cached(entry, EXPORT_RENDERERS[METADATA_FORMATS[prefix].renderer])
+    content = XML_DECLARATION.sub('', content, count=1).strip()
+
+    # the dublincore export uses a plain <metadata> root, which is replaced by the oai_dc container
+    if prefix == 'oai_dc':
+        content = re.sub(r'^<metadata\b', f'<oai_dc:dc xmlns:oai_dc="{METADATA_FORMATS[prefix].namespace}"', content, count=1)
+        content = re.sub(r'</metadata>$', '</oai_dc:dc>', content)
+    return content
+
+
+def validate_arguments(arguments: dict[str, str]) -> str:
+    verb = arguments.get('verb')
+    if verb not in VERBS:
+        raise OAIError('badVerb', f"Illegal OAI verb '{verb}'" if verb else "Missing OAI verb")
+
+    given = set(arguments) - {'verb'}
+    required, optional = VERBS[verb]
+
+    # the resumptionToken is an exclusive argument
+    if 'resumptionToken' in given and verb in ('ListIdentifiers', 'ListRecords'):
+        if given != {'resumptionToken'}:
+            raise OAIError('badArgument', 'resumptionToken is an exclusive argument')
+        return verb
+
+    if not required.issubset(given):
+        raise OAIError('badArgument', f"Missing required argument(s): {', '.join(sorted(required - given))}")
+    if not given.issubset(required | optional):
+        raise OAIError('badArgument', f"Illegal argument(s): {', '.join(sorted(given - required - optional))}")
+
+    return verb
+
+
+def list_entries(request: Request, arguments: dict[str, str], with_metadata: bool) -> dict:
+    # restore the harvest state from the resumption token or start a new list
+    if 'resumptionToken' in arguments:
+        state = decode_resumption_token(arguments['resumptionToken'])
+    else:
+        if 'set' in arguments:
+            raise OAIError('noSetHierarchy', 'This repository does not support sets')
+        state = {'m': arguments['metadataPrefix'], 'f': None, 'u': None, 'a': None, 'c': 0, 'n': None}
+        granularities = set()
+        if 'from' in arguments:
+            from_, granularity = parse_datestamp(arguments['from'])
+            state['f'] = from_.isoformat()
+            granularities.add(granularity)
+        if 'until' in arguments:
+            until, granularity = parse_datestamp(arguments['until'], until=True)
+            state['u'] = until.isoformat()
+            granularities.add(granularity)
+        if len(granularities) > 1:
+            raise OAIError('badArgument', 'from and until must have the same granularity')
+        if state['f'] is not None and state['u'] is not None and state['f'] >= state['u']:
+            raise OAIError('badArgument', 'from must be before until')
+
+    prefix = state['m']
+    if prefix not in METADATA_FORMATS:
+        raise OAIError('cannotDisseminateFormat', f"The metadata format '{prefix}' is not supported")
+
+    from_ = datetime.fromisoformat(state['f']) if state['f'] else None
+    until = datetime.fromisoformat(state['u']) if state['u'] else None
+    after = (datetime.fromisoformat(state['a'][0]), state['a'][1]) if state['a'] else None
+
+    # fetch one more than the page size to know if there is a next page
+    page_size = server.oai_page_size
+    datestamps, count = core.entry_datestamps(from_=from_, until=until, after=after, limit=page_size + 1, with_count=state['n'] is None)
+    if count is not None:
+        state['n'] = count
+
+    if len(datestamps) == 0:
+        if state['c'] == 0:
+            raise OAIError('noRecordsMatch', 'The combination of the given arguments results in an empty list')
+        return {'records': [], 'resumption_token': {'token': None, 'cursor': state['c'], 'complete_list_size': state['n']}}
+
+    has_more = len(datestamps) > page_size
+    datestamps = datestamps[:page_size]
+
+    if with_metadata:
+        _, stream = core.bulk_entries(ids=[entry_id for entry_id, _ in datestamps])
+        entries = {entry.id: entry for entry in stream}
+
+    records = []
+    for entry_id, last_update in datestamps:
+        record = {'identifier': oai_identifier(request, entry_id), 'datestamp': format_datestamp(last_update)}
+        if with_metadata:
+            record['metadata'] = render_metadata(entries[entry_id], prefix)
+        records.append(record)
+
+    # a resumption token is only part of incomplete lists, or of the last page of a list
+    resumption_token = None
+    if has_more:
+        last_id, last_update = datestamps[-1]
+        next_state = {**state, 'a': [last_update.isoformat(), last_id], 'c': state['c'] + len(datestamps)}
+        resumption_token = {'token': encode_resumption_token(next_state), 'cursor': state['c'], 'complete_list_size': state['n']}
+    elif state['c'] > 0:
+        resumption_token = {'token': None, 'cursor': state['c'], 'complete_list_size': state['n']}
+
+    return {'records': records, 'resumption_token': resumption_token}
+
+
+def get_record(request: Request, arguments: dict[str, str]) -> dict:
+    prefix = arguments['metadataPrefix']
+    entry_id = parse_identifier(arguments['identifier'])
+
+    entries = core.entries(ids=entry_id)
+    if len(entries) == 0:
+        raise OAIError('idDoesNotExist', f"The identifier '{arguments['identifier']}' is unknown in this repository")
+    if prefix not in METADATA_FORMATS:
+        raise OAIError('cannotDisseminateFormat', f"The metadata format '{prefix}' is not supported")
+
+    entry = entries[0]
+    record = {
+        'identifier': oai_identifier(request, entry.id),
+        'datestamp': format_datestamp(entry.lastUpdate),
+        'metadata': render_metadata(entry, prefix)
+    }
+    return {'records': [record], 'resumption_token': None}
+
+
+def handle_oai_request(request: Request, items: list[tuple[str, str]]) -> Response:
+    context = {
+        'response_date': format_datestamp(datetime.now(timezone.utc)),
+        'base_url': str(request.url.replace(query='')),
+        'arguments': {},
+        'errors': [],
+        'verb': None,
+        'records': [],
+        'resumption_token': None,
+        'metadata_formats': METADATA_FORMATS,
+    }
+
+    arguments = dict(items)
+    try:
+        if len(arguments) != len(items):
+            raise OAIError('badArgument', 'Arguments must not be repeated')
+        verb = validate_arguments(arguments)
+        context['verb'] = verb
+        # only valid requests echo their arguments
+        context['arguments'] = arguments
+
+        if verb == 'Identify':
+            datestamps, _ = core.entry_datestamps(limit=1)
+            context['identify'] = {
+                'repository_name': server.oai_repository_name,
+                'admin_email': server.oai_admin_email,
+                'earliest_datestamp': format_datestamp(datestamps[0][1]) if len(datestamps) > 0 else '1970-01-01T00:00:00Z'
+            }
+        elif verb == 'ListMetadataFormats':
+            if 'identifier' in arguments:
+                exists, _ = core.entry_last_update(parse_identifier(arguments['identifier']))
+                if not exists:
+                    raise OAIError('idDoesNotExist', f"The identifier '{arguments['identifier']}' is unknown in this repository")
+        elif verb == 'ListSets':
+            raise OAIError('noSetHierarchy', 'This repository does not support sets')
+        elif verb == 'GetRecord':
+            context.update(get_record(request, arguments))
+        else:
+            context.update(list_entries(request, arguments, with_metadata=verb == 'ListRecords'))
+    except OAIError as e:
+        context['errors'] = [{'code': e.code, 'message': e.message}]
+
+    content = templates.get_template('oai.xml').render(**context)
+    return Response(content=content, media_type='text/xml')
+
+
+@oai_router.get('/oai')
+def oai_get(request: Request):
+    """
+    OAI-PMH 2.0 provider endpoint. Supports the verbs Identify, ListMetadataFormats,
+    ListIdentifiers, ListRecords and GetRecord with the metadata formats oai_dc,
+    datacite and iso19139. Lists are paged by resumption tokens and can be harvested
+    incrementally using from and until on the lastUpdate of the entries.
+    """
+    return handle_oai_request(request, request.query_params.multi_items())
+
+
+@oai_router.post('/oai')
+async def oai_post(request: Request):
+    """
+    OAI-PMH 2.0 provider endpoint for form encoded POST requests
+    """
+    form = await request.form()
+    items = [(key, value) for key, value in form.multi_items() if isinstance(value, str)]
+    return await run_in_threadpool(handle_oai_request, request, items)
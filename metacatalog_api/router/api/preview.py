@@ -1,10 +1,17 @@
 from pathlib import Path
 import mimetypes
 import csv
-from typing import Dict, Any, Optional
+import json
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib.metadata import entry_points
+from typing import Dict, Any, Optional, Generator, Callable, Literal
 
 from fastapi import APIRouter, HTTPException, Depends
 from sqlmodel import text
+from starlette.concurrency import run_in_threadpool
 
 from metacatalog_api import core
 from metacatalog_api import models
@@ -13,6 +20,86 @@ import re
 from pydantic import BaseModel
 from typing import Any
 import polars as pl
+from dateparser import parse as dateparse
+
+# optional netCDF backends - only the header and coordinate variables are read
+try:
+    import netCDF4
+    NETCDF4_LOADED = True
+except ImportError:
+    NETCDF4_LOADED = False
+try:
+    import h5netcdf
+    H5NETCDF_LOADED = True
+except ImportError:
+    H5NETCDF_LOADED = False
+try:
+    from scipy.io import netcdf_file
+    SCIPY_LOADED = True
+except ImportError:
+    SCIPY_LOADED = False
+try:
+    import cftime
+    CFTIME_LOADED = True
+except ImportError:
+    CFTIME_LOADED = False
+
+# optional backends for the geospatial and columnar analyzers
+try:
+    import pyarrow.parquet as pq
+    import pyarrow as pa
+    PYARROW_LOADED = True
+except ImportError:
+    PYARROW_LOADED = False
+try:
+    import pyogrio
+    PYOGRIO_LOADED = True
+except ImportError:
+    PYOGRIO_LOADED = False
+try:
+    from pyproj import Transformer
+    PYPROJ_LOADED = True
+except ImportError:
+    PYPROJ_LOADED = False
+try:
+    import rasterio
+    from rasterio.warp import transform_bounds
+    RASTERIO_LOADED = True
+except ImportError:
+    RASTERIO_LOADED = False
+try:
+    import tifffile
+    TIFFFILE_LOADED = True
+except ImportError:
+    TIFFFILE_LOADED = False
+
+HDF5_SIGNATURE = b'\x89HDF\r\n\x1a\n'
+NETCDF_CLASSIC_SIGNATURE = b'CDF'
+PARQUET_SIGNATURE = b'PAR1'
+SQLITE_SIGNATURE = b'SQLite format 3\x00'
+GEOPACKAGE_APPLICATION_ID = b'GPKG'
+TIFF_SIGNATURES = (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+')
+
+# number of bytes read from the start of a file to sniff its content
+SNIFF_BYTES = 2048
+
+# GeoJSON files without a bbox member are only parsed up to this size
+GEOJSON_MAX_BYTES = 64 * 1024 * 1024
+
+# maximum number of bytes read from a single coordinate variable
+NETCDF_COORDINATE_BUDGET = 16 * 1024 * 1024
+
+CF_TIME_UNITS = {
+    'microseconds': 1e-6, 'milliseconds': 1e-3,
+    'seconds': 1, 'second': 1, 'secs': 1, 'sec': 1, 's': 1,
+    'minutes': 60, 'minute': 60, 'mins': 60, 'min': 60,
+    'hours': 3600, 'hour': 3600, 'hrs': 3600, 'hr': 3600, 'h': 3600,
+    'days': 86400, 'day': 86400, 'd': 86400,
+    'weeks': 604800, 'week': 604800,
+}
+LATITUDE_UNITS = ('degrees_north', 'degree_north', 'degree_n', 'degrees_n', 'degreen', 'degreesn')
+LONGITUDE_UNITS = ('degrees_east', 'degree_east', 'degree_e', 'degrees_e', 'degreee', 'degreese')
+METERS_PER_DEGREE = 111320
 
 
 # Preview response models
@@ -65,7 +152,179 @@ async def get_file_from_hash(file_hash: str) -> Path:
     return file_info.file
 
 
+# Analyzer registry
+class FileAnalyzer(BaseModel):
+    """A registered file analyzer and the rules used to select it for a file"""
+    name: str
+    func: Callable[[Path], Dict[str, Any]]
+    description: str | None = None
+    extensions: list[str] = []
+    mimetypes: list[str] = []
+    magic: list[bytes] = []
+    sniff: Callable[[bytes], bool] | None = None
+    cost: Literal['cheap', 'expensive'] = 'cheap'
+    priority: int = 0
+
+
+ANALYZERS: Dict[str, FileAnalyzer] = {}
+
+# expensive analyzers are queued here instead of blocking the event loop
+EXPENSIVE_ANALYZER_WORKERS = 2
+_expensive_analyzer_queue = ThreadPoolExecutor(max_workers=EXPENSIVE_ANALYZER_WORKERS, thread_name_prefix='metacatalog-analyzer')
+_entry_points_loaded = False
+
+
+def register_analyzer(
+    name: str,
+    extensions: list[str] = [],
+    mimetypes: list[str] = [],
+    magic: list[bytes] = [],
+    sniff: Callable[[bytes], bool] | None = None,
+    cost: Literal['cheap', 'expensive'] = 'cheap',
+    priority: int = 0
+):
+    """
+    Decorator to register a function as file analyzer.
+
+    The analyzer is selected for a file if one of the magic byte signatures matches
+    the start of the file, if the sniff function accepts the first bytes, or - as a
+    last resort - by the extension of the original filename. Cheap analyzers are run
+    inline, expensive ones are queued to a small worker pool.
+    Third-party packages can register analyzers by using this decorator in a module
+    exposed via the 'metacatalog_api.analyzers' entry point group.
+    """
+    def decorator(func: Callable[[Path], Dict[str, Any]]):
+        ANALYZERS[name] = FileAnalyzer(
+            name=name,
+            func=func,
+            description=(func.__doc__ or '').strip().split('\n')[0] or None,
+            extensions=[e.lower() for e in extensions],
+            mimetypes=mimetypes,
+            magic=magic,
+            sniff=sniff,
+            cost=cost,
+            priority=priority
+        )
+        return func
+    return decorator
+
+
+def get_analyzers() -> Dict[str, FileAnalyzer]:
+    """Return all analyzers, loading the ones exposed by installed packages on first use"""
+    global _entry_points_loaded
+    if not _entry_points_loaded:
+        _entry_points_loaded = True
+        for ep in entry_points(group='metacatalog_api.analyzers'):
+            try:
+                obj = ep.load()
+            except Exception:
+                continue
+            # modules register themselves on import, plain functions are registered by entry point name
+            if callable(obj) and ep.name not in ANALYZERS:
+                register_analyzer(ep.name)(obj)
+    return ANALYZERS
+
+
+def detect_analyzer(file_path: Path, filename: str | None = None) -> FileAnalyzer:
+    """
+    Select the analyzer for a file. Content is checked first, using the magic bytes
+    and sniff functions of all analyzers. The extension of the original filename is
+    used if the content is not conclusive, but before the sniff functions of analyzers
+    with a negative priority, as these accept almost any content.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    analyzers = sorted(get_analyzers().values(), key=lambda a: a.priority, reverse=True)
+
+    for analyzer in analyzers:
+        if any(head.startswith(signature) for signature in analyzer.magic):
+            return analyzer
+
+    analyzer = _sniff(head, [a for a in analyzers if a.priority >= 0])
+    if analyzer is not None:
+        return analyzer
+
+    extension = Path(filename or file_path.name).suffix.lower()
+    if extension:
+        for analyzer in analyzers:
+            if extension in analyzer.extensions:
+                return analyzer
+
+    analyzer = _sniff(head, [a for a in analyzers if a.priority < 0])
+    if analyzer is not None:
+        return analyzer
+
+    return ANALYZERS['generic']
+
+
+def _sniff(head: bytes, analyzers: list[FileAnalyzer]) -> FileAnalyzer | None:
+    for analyzer in analyzers:
+        if analyzer.sniff is not None:
+            try:
+                if analyzer.sniff(head):
+                    return analyzer
+            except Exception:
+                continue
+    return None
+
+
+async def run_analyzer(analyzer: FileAnalyzer, file_path: Path) -> Dict[str, Any]:
+    """
+    Run a cheap analyzer in the threadpool, expensive ones wait in the analyzer queue.
+    Both read the file, thus they never run on the event loop.
+    """
+    if analyzer.cost == 'expensive':
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_expensive_analyzer_queue, analyzer.func, file_path)
+    return await run_in_threadpool(analyzer.func, file_path)
+
+
+def _decode_head(head: bytes) -> str | None:
+    if b'\x00' in head:
+        return None
+    try:
+        # the head may end within a multi-byte character
+        return head.decode('utf-8', errors='strict' if len(head) < SNIFF_BYTES else 'ignore')
+    except UnicodeDecodeError:
+        return None
+
+
+def sniff_geojson(head: bytes) -> bool:
+    text = _decode_head(head)
+    if text is None or not text.lstrip().startswith('{'):
+        return False
+    return '"type"' in text and ('"FeatureCollection"' in text or '"Feature"' in text)
+
+
+def sniff_geopackage(head: bytes) -> bool:
+    # GeoPackages are SQLite files with the application id 'GPKG' at offset 68
+    return head.startswith(SQLITE_SIGNATURE) and head[68:72] == GEOPACKAGE_APPLICATION_ID
+
+
+def sniff_csv(head: bytes) -> bool:
+    text = _decode_head(head)
+    if text is None:
+        return False
+    lines = text.splitlines()
+    if len(head) >= SNIFF_BYTES:
+        # the last line of a truncated head is incomplete
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()]
+    if len(lines) < 2:
+        return False
+    try:
+        dialect = csv.Sniffer().sniff('\n'.join(lines), delimiters=',;\t|')
+    except csv.Error:
+        return False
+    return all(line.count(dialect.delimiter) > 0 for line in lines)
+
+
+def sniff_text(head: bytes) -> bool:
+    return len(head) > 0 and _decode_head(head) is not None
+
+
 # Base analysis functions
+@register_analyzer('csv', extensions=['.csv', '.tsv'], mimetypes=['text/csv'], sniff=sniff_csv, priority=10)
 def analyze_csv_file(file_path: Path, max_rows: int = 1000) -> Dict[str, Any]:
     """Analyze a CSV file using Polars and return detailed metadata"""
     try:
@@ -222,20 +481,417 @@ def analyze_csv_file(file_path: Path, max_rows: int = 1000) -> Dict[str, Any]:
         return {"error": f"Failed to analyze CSV: {str(e)}"}
 
 
-def analyze_netcdf_file(file_path: Path) -> Dict[str, Any]:
-    """Analyze a netCDF file and return metadata"""
+def _to_python(value: Any) -> Any:
+    """Convert numpy scalars, arrays and bytes found in netCDF attributes into JSON friendly values"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_to_python(v) for v in value]
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _dimension_size(dimension: Any) -> int | None:
+    if dimension is None or isinstance(dimension, int):
+        return dimension
+    return len(dimension)
+
+
+@contextmanager
+def open_netcdf_header(file_path: Path) -> Generator[Dict[str, Any], None, None]:
+    """
+    Open a netCDF file and yield its header as a plain dictionary.
+
+    Only the file header is parsed. Each variable is described by its dimensions,
+    shape, dtype and attributes, while its data is left on disk and can be indexed
+    lazily through the 'handle' key. Backends are tried in the order netCDF4,
+    h5netcdf and scipy, depending on which of them is installed and which of them
+    is able to read the format detected from the file signature.
+    """
+    with open(file_path, 'rb') as f:
+        signature = f.read(8)
+    is_hdf5 = signature.startswith(HDF5_SIGNATURE)
+    is_classic = signature.startswith(NETCDF_CLASSIC_SIGNATURE)
+    if not is_hdf5 and not is_classic:
+        raise ValueError("The file is neither a netCDF classic nor a netCDF4/HDF5 file")
+    file_format = "netCDF4/HDF5" if is_hdf5 else "netCDF classic"
+
+    if NETCDF4_LOADED:
+        ds = netCDF4.Dataset(str(file_path), 'r')
+        try:
+            # scaling is applied explicitly to the few values that are read
+            ds.set_auto_maskandscale(False)
+            yield {
+                "backend": "netCDF4",
+                "format": file_format,
+                "dimensions": {name: len(dim) for name, dim in ds.dimensions.items()},
+                "attributes": {key: ds.getncattr(key) for key in ds.ncattrs()},
+                "variables": {
+                    name: {
+                        "dimensions": tuple(var.dimensions),
+                        "shape": tuple(var.shape),
+                        "dtype": var.dtype,
+                        "attributes": {key: var.getncattr(key) for key in var.ncattrs()},
+                        "handle": var
+                    } for name, var in ds.variables.items()
+                }
+            }
+        finally:
+            ds.close()
+    elif H5NETCDF_LOADED and is_hdf5:
+        ds = h5netcdf.File(str(file_path), 'r', phony_dims='sort')
+        try:
+            yield {
+                "backend": "h5netcdf",
+                "format": file_format,
+                "dimensions": {name: _dimension_size(dim) for name, dim in ds.dimensions.items()},
+                "attributes": dict(ds.attrs),
+                "variables": {
+                    name: {
+                        "dimensions": tuple(var.dimensions),
+                        "shape": tuple(var.shape),
+                        "dtype": var.dtype,
+                        "attributes": dict(var.attrs),
+                        "handle": var
+                    } for name, var in ds.variables.items()
+                }
+            }
+        finally:
+            ds.close()
+    elif SCIPY_LOADED and is_classic:
+        # mmap keeps the data variables on disk, only indexed values are paged in
+        ds = netcdf_file(str(file_path), 'r', mmap=True, maskandscale=False)
+        try:
+            variables = {
+                name: {
+                    "dimensions": tuple(var.dimensions),
+                    "shape": tuple(var.shape),
+                    "dtype": var.data.dtype,
+                    "attributes": dict(var._attributes),
+                    "handle": var
+                } for name, var in ds.variables.items()
+            }
+            # the unlimited dimension has no length in the header, take it from the variables
+            dimensions = {}
+            for name, size in ds.dimensions.items():
+                if size is None:
+                    size = next((v["shape"][v["dimensions"].index(name)] for v in variables.values() if name in v["dimensions"]), 0)
+                dimensions[name] = size
+            yield {
+                "backend": "scipy",
+                "format": file_format,
+                "dimensions": dimensions,
+                "attributes": dict(ds._attributes),
+                "variables": variables
+            }
+        finally:
+            ds.close()
+    else:
+        raise RuntimeError(f"Reading {file_format} files requires one of the packages netCDF4, h5netcdf or scipy. Please install using `pip install netCDF4`")
+
+
+def _coordinate_axis(name: str, variable: Dict[str, Any]) -> str | None:
+    """Identify the CF axis of a coordinate variable: T (time), Y/X (latitude/longitude), y/x (projected) or Z"""
+    attrs = variable["attributes"]
+    standard_name = str(_to_python(attrs.get('standard_name', ''))).lower()
+    units = str(_to_python(attrs.get('units', ''))).lower()
+    axis = str(_to_python(attrs.get('axis', ''))).upper()
+    lower_name = name.lower()
+
+    if axis == 'T' or standard_name == 'time' or ' since ' in units:
+        return 'T'
+    if standard_name == 'latitude' or units in LATITUDE_UNITS or lower_name in ('lat', 'latitude'):
+        return 'Y'
+    if standard_name == 'longitude' or units in LONGITUDE_UNITS or lower_name in ('lon', 'long', 'longitude'):
+        return 'X'
+    if standard_name == 'projection_y_coordinate' or axis == 'Y':
+        return 'y'
+    if standard_name == 'projection_x_coordinate' or axis == 'X':
+        return 'x'
+    if axis == 'Z' or 'positive' in attrs:
+        return 'Z'
+    return None
+
+
+def _flat_values(value: Any) -> list[float]:
+    if hasattr(value, 'reshape'):
+        return [float(v) for v in value.reshape(-1).tolist()]
+    return [float(value)]
+
+
+def summarize_coordinate(variable: Dict[str, Any], max_bytes: int = NETCDF_COORDINATE_BUDGET) -> Dict[str, Any] | None:
+    """
+    Summarize a coordinate (or coordinate bounds) variable without exceeding max_bytes.
+
+    Coordinates that fit into the budget are read completely. Larger ones are
+    assumed to be monotonic, as required by the CF conventions, and only their
+    first, second and last position is read from disk.
+    """
+    shape = variable["shape"]
+    if len(shape) == 0 or 0 in shape:
+        return None
+    handle = variable["handle"]
+    attrs = variable["attributes"]
+    scale = float(_to_python(attrs.get('scale_factor', 1.0)))
+    offset = float(_to_python(attrs.get('add_offset', 0.0)))
+
+    size = 1
+    for s in shape:
+        size *= s
+    itemsize = getattr(variable["dtype"], 'itemsize', 8)
+
+    if size * itemsize <= max_bytes:
+        values = handle[...]
+        flat = values.reshape(-1)
+        first, last = float(flat[0]), float(flat[-1])
+        second = float(flat[1]) if shape[0] > 1 and len(shape) == 1 else None
+        minimum, maximum = float(values.min()), float(values.max())
+        complete = True
+    else:
+        first_values = _flat_values(handle[0])
+        last_values = _flat_values(handle[-1])
+        first, last = first_values[0], last_values[-1]
+        second = _flat_values(handle[1])[0] if shape[0] > 1 and len(shape) == 1 else None
+        minimum, maximum = min(first_values + last_values), max(first_values + last_values)
+        complete = False
+
+    def scaled(v):
+        return v * scale + offset if v is not None else None
+
+    minimum, maximum = sorted([scaled(minimum), scaled(maximum)])
+    return {
+        "size": shape[0],
+        "first": scaled(first),
+        "second": scaled(second),
+        "last": scaled(last),
+        "min": minimum,
+        "max": maximum,
+        "complete": complete
+    }
+
+
+def decode_cf_time(value: float, units: str, calendar: str = 'standard') -> datetime:
+    """Decode a numeric CF time value like '3 days since 1970-01-01' into a datetime"""
+    if CFTIME_LOADED:
+        try:
+            return cftime.num2date(value, units, calendar=calendar, only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+        except Exception:
+            # fall back to the standard calendar below
+            pass
+
+    match = re.match(r'\s*(\w+)\s+since\s+(.+)', units)
+    if match is None:
+        raise ValueError(f"'{units}' is not a valid CF time unit")
+    step, origin = match.groups()
+    seconds = CF_TIME_UNITS.get(step.lower())
+    if seconds is None:
+        raise ValueError(f"Unsupported CF time step '{step}'")
+
+    origin = origin.strip()
     try:
-        # This would require netCDF4 library
-        # For now, return basic info
-        return {
-            "file_type": "netcdf",
-            "error": "netCDF analysis not yet implemented",
-            "note": "Requires netCDF4 library for full analysis"
-        }
+        origin_date = datetime.fromisoformat(origin.replace(' UTC', '').replace('Z', ''))
+    except ValueError:
+        origin_date = dateparse(origin)
+        if origin_date is None:
+            raise ValueError(f"Cannot parse CF time origin '{origin}'")
+    return origin_date.replace(tzinfo=None) + timedelta(seconds=value * seconds)
+
+
+def _netcdf_temporal_scale(name: str, variable: Dict[str, Any], summary: Dict[str, Any]) -> Dict[str, Any]:
+    attrs = variable["attributes"]
+    units = str(_to_python(attrs.get('units', '')))
+    calendar = str(_to_python(attrs.get('calendar', 'standard')))
+
+    start = decode_cf_time(summary["min"], units, calendar)
+    end = decode_cf_time(summary["max"], units, calendar)
+    if summary["size"] > 1:
+        resolution = (end - start) / (summary["size"] - 1)
+    else:
+        resolution = timedelta(0)
+
+    return {
+        "observation_start": start,
+        "observation_end": end,
+        "resolution": resolution,
+        "support": 1.0,
+        "dimension_names": [name]
+    }
+
+
+def _longitude_range(minimum: float, maximum: float) -> tuple[float, float]:
+    # longitudes given as 0...360 are shifted into -180...180
+    if maximum <= 180:
+        return max(minimum, -180.0), maximum
+    if maximum - minimum >= 359:
+        return -180.0, 180.0
+    west = minimum - 360 if minimum > 180 else minimum
+    east = maximum - 360
+    if west > east:
+        # the extent crosses the antimeridian
+        return -180.0, 180.0
+    return west, east
+
+
+def _netcdf_spatial_scale(header: Dict[str, Any], axes: Dict[str, str], summaries: Dict[str, Dict[str, Any]]) -> Dict[str, Any] | None:
+    variables = header["variables"]
+    lat = next((name for name, axis in axes.items() if axis == 'Y'), None)
+    lon = next((name for name, axis in axes.items() if axis == 'X'), None)
+    x = next((name for name, axis in axes.items() if axis == 'x'), None)
+    y = next((name for name, axis in axes.items() if axis == 'y'), None)
+
+    def bounds_of(name):
+        # prefer the cell bounds over the cell centers for the extent
+        bounds_name = _to_python(variables[name]["attributes"].get('bounds'))
+        if bounds_name in summaries:
+            return summaries[bounds_name]
+        return summaries[name]
+
+    extent = None
+    resolution = None
+    dimension_names = []
+    if lat is not None and lon is not None:
+        lat_bounds, lon_bounds = bounds_of(lat), bounds_of(lon)
+        south, north = max(lat_bounds["min"], -90.0), min(lat_bounds["max"], 90.0)
+        west, east = _longitude_range(lon_bounds["min"], lon_bounds["max"])
+        extent = [west, south, east, north]
+        dimension_names = [lat, lon]
+        lat_summary = summaries[lat]
+        if lat_summary["size"] > 1:
+            # approximate cell size in meters at the equator
+            resolution = abs(lat_summary["max"] - lat_summary["min"]) / (lat_summary["size"] - 1) * METERS_PER_DEGREE
+    else:
+        attrs = header["attributes"]
+        keys = ('geospatial_lon_min', 'geospatial_lat_min', 'geospatial_lon_max', 'geospatial_lat_max')
+        if all(key in attrs for key in keys):
+            # fall back to the ACDD global attributes, e.g. for curvilinear grids
+            west, south, east, north = [float(_to_python(attrs[key])) for key in keys]
+            extent = [west, south, east, north]
+        if x is not None and y is not None:
+            dimension_names = [y, x]
+            y_summary = summaries[y]
+            units = str(_to_python(variables[y]["attributes"].get('units', ''))).lower()
+            if y_summary["size"] > 1 and units in ('m', 'meter', 'meters', 'metre', 'metres'):
+                resolution = abs(y_summary["max"] - y_summary["min"]) / (y_summary["size"] - 1)
+
+    if extent is None and resolution is None:
+        return None
+
+    scale = {
+        "resolution": int(round(resolution)) if resolution is not None else 0,
+        "support": 1.0,
+        "dimension_names": dimension_names
+    }
+    if extent is not None:
+        scale["extent"] = bbox_polygon(*extent)
+    return scale
+
+
+@register_analyzer('netcdf', extensions=['.nc', '.netcdf', '.cdf', '.nc4'], mimetypes=['application/netcdf'], magic=[NETCDF_CLASSIC_SIGNATURE, HDF5_SIGNATURE])
+def analyze_netcdf_file(file_path: Path, max_coordinate_bytes: int = NETCDF_COORDINATE_BUDGET) -> Dict[str, Any]:
+    """
+    Analyze the header of a netCDF file and return metadata.
+
+    Dimensions, variables and their CF attributes are taken from the header. Of the
+    data itself, only coordinate variables and their bounds are read, each within
+    max_coordinate_bytes, so multi-GB files can be analyzed in constant memory.
+    Data variables are never loaded.
+    """
+    try:
+        with open_netcdf_header(file_path) as header:
+            variables = header["variables"]
+
+            # CF coordinate variables are 1D and named like their dimension
+            axes = {}
+            for name, var in variables.items():
+                if var["dimensions"] == (name,):
+                    axes[name] = _coordinate_axis(name, var)
+            bounds = {
+                _to_python(variables[name]["attributes"].get('bounds')) for name in axes
+            }
+            bounds = {name for name in bounds if name in variables}
+
+            # summarize only the coordinates and bounds needed for the scales
+            summaries = {}
+            for name in [n for n, axis in axes.items() if axis is not None] + list(bounds):
+                summary = summarize_coordinate(variables[name], max_bytes=max_coordinate_bytes)
+                if summary is not None:
+                    summaries[name] = summary
+
+            # temporal scale from the first time axis that can be decoded
+            temporal_scale = None
+            for name, axis in axes.items():
+                if axis == 'T' and name in summaries:
+                    try:
+                        temporal_scale = _netcdf_temporal_scale(name, variables[name], summaries[name])
+                        break
+                    except Exception:
+                        continue
+
+            try:
+                spatial_scale = _netcdf_spatial_scale(header, {n: a for n, a in axes.items() if n in summaries}, summaries)
+            except Exception:
+                spatial_scale = None
+
+            # build the variable information
+            data_variables = [name for name in variables if name not in axes and name not in bounds]
+            column_analysis = []
+            for i, (name, var) in enumerate(variables.items()):
+                kind = getattr(var["dtype"], 'kind', 'U')
+                is_time = axes.get(name) == 'T'
+                column_analysis.append({
+                    "name": name,
+                    "index": i,
+                    "datatype": "datetime" if is_time else ("numeric" if kind in 'iufc' else ("boolean" if kind == 'b' else "string")),
+                    "sample_values": None,
+                    "has_numeric": kind in 'iufc',
+                    "has_dates": is_time
+                })
+
+            # the shape of the largest data variable describes the dataset
+            shape = None
+            if len(data_variables) > 0:
+                largest = max(data_variables, key=lambda n: (len(variables[n]["shape"]), _product(variables[n]["shape"])))
+                shape = list(variables[largest]["shape"])
+
+            return {
+                "file_type": "netcdf",
+                "backend": header["backend"],
+                "format": header["format"],
+                "dimensions": header["dimensions"],
+                "global_attributes": {k: _to_python(v) for k, v in header["attributes"].items()},
+                "variables": {
+                    name: {
+                        "dimensions": list(var["dimensions"]),
+                        "shape": list(var["shape"]),
+                        "dtype": str(var["dtype"]),
+                        "attributes": {k: _to_python(v) for k, v in var["attributes"].items()}
+                    } for name, var in variables.items()
+                },
+                "coordinates": {
+                    name: {"axis": axes.get(name), **summary} for name, summary in summaries.items()
+                },
+                "data_variables": data_variables,
+                "column_analysis": column_analysis,
+                "shape": shape,
+                "total_columns": len(data_variables),
+                "temporal_scale": temporal_scale,
+                "spatial_scale": spatial_scale
+            }
     except Exception as e:
-        return {"error": f"Failed to analyze netCDF: {str(e)}"}
+        return {"file_type": "netcdf", "error": f"Failed to analyze netCDF: {str(e)}"}
+
 
+def _product(shape) -> int:
+    size = 1
+    for s in shape:
+        size *= s
+    return size
 
+
+@register_analyzer('text', extensions=['.txt', '.md', '.log'], mimetypes=['text/plain'], sniff=sniff_text, cost='expensive', priority=-10)
 def analyze_text_file(file_path: Path) -> Dict[str, Any]:
     """Analyze a text file and return metadata"""
     try:
@@ -261,6 +917,7 @@ def analyze_text_file(file_path: Path) -> Dict[str, Any]:
         return {"error": f"Failed to analyze text file: {str(e)}"}
 
 
+@register_analyzer('generic', priority=-100)
 def analyze_generic_file(file_path: Path) -> Dict[str, Any]:
     """Analyze a generic file and return basic metadata"""
     try:
@@ -276,8 +933,358 @@ def analyze_generic_file(file_path: Path) -> Dict[str, Any]:
         return {"error": f"Failed to analyze file: {str(e)}"}
 
 
+def bbox_polygon(west: float, south: float, east: float, north: float) -> Dict[str, Any]:
+    """Build a GeoJSON polygon from a bounding box"""
+    return {
+        "type": "Polygon",
+        "coordinates": [[[west, south], [west, north], [east, north], [east, south], [west, south]]]
+    }
+
+
+def bounds_to_wgs84(bounds: list[float], crs: str | None) -> list[float] | None:
+    """Transform (west, south, east, north) bounds given in crs to EPSG:4326 if possible"""
+    if bounds is None or any(b is None for b in bounds):
+        return None
+    if crs is None or str(crs).upper() in ('EPSG:4326', 'OGC:CRS84', 'WGS84'):
+        return [float(b) for b in bounds]
+    if not PYPROJ_LOADED:
+        return None
+    transformer = Transformer.from_crs(crs, 'EPSG:4326', always_xy=True)
+    return list(transformer.transform_bounds(*bounds))
+
+
+def _spatial_scale_from_bounds(bounds: list[float] | None, resolution: float | None = None, dimension_names: list[str] = []) -> Dict[str, Any] | None:
+    if bounds is None and resolution is None:
+        return None
+    scale = {
+        "resolution": int(round(resolution)) if resolution is not None else 0,
+        "support": 1.0,
+        "dimension_names": dimension_names
+    }
+    if bounds is not None:
+        scale["extent"] = bbox_polygon(*bounds)
+    return scale
+
+
+def _column_info(name: str, index: int, datatype: str) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "index": index,
+        "datatype": datatype,
+        "sample_values": None,
+        "has_numeric": datatype == "numeric",
+        "has_dates": datatype == "datetime"
+    }
+
+
+def _polars_datatype(dtype) -> str:
+    if dtype.is_numeric():
+        return "numeric"
+    if dtype.is_temporal():
+        return "datetime"
+    if dtype == pl.Boolean:
+        return "boolean"
+    return "string"
+
+
+@register_analyzer('parquet', extensions=['.parquet', '.pq', '.geoparquet'], mimetypes=['application/vnd.apache.parquet'], magic=[PARQUET_SIGNATURE])
+def analyze_parquet_file(file_path: Path) -> Dict[str, Any]:
+    """Analyze a Parquet file using only the metadata stored in its footer"""
+    try:
+        if PYARROW_LOADED:
+            parquet = pq.ParquetFile(file_path)
+            metadata = parquet.metadata
+            schema = parquet.schema_arrow
+            total_rows = metadata.num_rows
+
+            column_analysis = []
+            temporal_columns = []
+            for i, field in enumerate(schema):
+                if pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
+                    datatype = "datetime"
+                    temporal_columns.append(i)
+                elif pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or pa.types.is_decimal(field.type):
+                    datatype = "numeric"
+                elif pa.types.is_boolean(field.type):
+                    datatype = "boolean"
+                else:
+                    datatype = "string"
+                column_analysis.append(_column_info(field.name, i, datatype))
+
+            # the temporal extent is taken from the row group statistics in the footer
+            temporal_scale = None
+            for col_idx in temporal_columns:
+                name = schema.names[col_idx]
+                leaf = metadata.schema.names.index(name) if name in metadata.schema.names else None
+                if leaf is None:
+                    continue
+                minimums, maximums = [], []
+                for rg in range(metadata.num_row_groups):
+                    stats = metadata.row_group(rg).column(leaf).statistics
+                    if stats is None or not stats.has_min_max:
+                        minimums = []
+                        break
+                    minimums.append(stats.min)
+                    maximums.append(stats.max)
+                if len(minimums) > 0:
+                    start, end = min(minimums), max(maximums)
+                    if not isinstance(start, datetime):
+                        start = datetime.combine(start, datetime.min.time())
+                        end = datetime.combine(end, datetime.min.time())
+                    temporal_scale = {
+                        "observation_start": start,
+                        "observation_end": end,
+                        "resolution": (end - start) / (total_rows - 1) if total_rows > 1 else timedelta(0),
+                        "support": 1.0,
+                        "dimension_names": [name]
+                    }
+                    break
+
+            key_value = {k.decode('utf-8', errors='replace'): v.decode('utf-8', errors='replace') for k, v in (metadata.metadata or {}).items()}
+            details = {
+                "num_row_groups": metadata.num_row_groups,
+                "created_by": metadata.created_by,
+                "format_version": metadata.format_version,
+            }
+        else:
+            # polars only reads the footer for the schema and the row count
+            schema = pl.read_parquet_schema(file_path)
+            total_rows = pl.scan_parquet(file_path).select(pl.len()).collect().item()
+            column_analysis = [_column_info(name, i, _polars_datatype(dtype)) for i, (name, dtype) in enumerate(schema.items())]
+            temporal_scale = None
+            key_value = pl.read_parquet_metadata(file_path) if hasattr(pl, 'read_parquet_metadata') else {}
+            details = {}
+
+        # GeoParquet stores the bounding box of its geometry columns in the footer
+        spatial_scale = None
+        if 'geo' in key_value:
+            try:
+                geo = json.loads(key_value['geo'])
+                column = geo.get('primary_column')
+                info = geo.get('columns', {}).get(column, {})
+                crs = info.get('crs')
+                if isinstance(crs, dict):
+                    crs_id = crs.get('id', {})
+                    crs = f"{crs_id.get('authority')}:{crs_id.get('code')}" if crs_id else None
+                spatial_scale = _spatial_scale_from_bounds(bounds_to_wgs84(info.get('bbox'), crs), dimension_names=[column])
+            except Exception:
+                spatial_scale = None
+
+        return {
+            "file_type": "parquet",
+            "headers": [c["name"] for c in column_analysis],
+            "column_analysis": column_analysis,
+            "total_rows": total_rows,
+            "total_columns": len(column_analysis),
+            "shape": [total_rows, len(column_analysis)],
+            "temporal_scale": temporal_scale,
+            "spatial_scale": spatial_scale,
+            "key_value_metadata": {k: v for k, v in key_value.items() if k != 'ARROW:schema'},
+            **details
+        }
+    except Exception as e:
+        return {"file_type": "parquet", "error": f"Failed to analyze Parquet: {str(e)}"}
+
+
+def _layer_info_pyogrio(file_path: Path, layer: str | int | None = None) -> Dict[str, Any]:
+    info = pyogrio.read_info(file_path, layer=layer)
+    fields = list(info.get('fields', []))
+    dtypes = list(info.get('dtypes', []))
+    column_analysis = [
+        _column_info(name, i, "numeric" if str(dtype).startswith(('int', 'float', 'uint')) else ("datetime" if 'datetime' in str(dtype) else "string"))
+        for i, (name, dtype) in enumerate(zip(fields, dtypes))
+    ]
+    bounds = info.get('total_bounds')
+    return {
+        "column_analysis": column_analysis,
+        "total_rows": info.get('features'),
+        "crs": info.get('crs'),
+        "geometry_type": info.get('geometry_type'),
+        "native_bounds": [float(b) for b in bounds] if bounds is not None else None
+    }
+
+
+def _geojson_bounds(coordinates: Any, bounds: list[float] | None = None) -> list[float] | None:
+    if isinstance(coordinates, (list, tuple)) and len(coordinates) >= 2 and all(isinstance(c, (int, float)) for c in coordinates[:2]):
+        x, y = coordinates[0], coordinates[1]
+        if bounds is None:
+            return [x, y, x, y]
+        return [min(bounds[0], x), min(bounds[1], y), max(bounds[2], x), max(bounds[3], y)]
+    if isinstance(coordinates, (list, tuple)):
+        for c in coordinates:
+            bounds = _geojson_bounds(c, bounds)
+    return bounds
+
+
+@register_analyzer('geojson', extensions=['.geojson'], mimetypes=['application/geo+json'], sniff=sniff_geojson, cost='expensive', priority=20)
+def analyze_geojson_file(file_path: Path) -> Dict[str, Any]:
+    """Analyze a GeoJSON file and return its layer metadata and bounds"""
+    try:
+        if PYOGRIO_LOADED:
+            layer = _layer_info_pyogrio(file_path)
+            bbox = layer["native_bounds"]
+        else:
+            if file_path.stat().st_size > GEOJSON_MAX_BYTES:
+                return {"file_type": "geojson", "error": "GeoJSON file is too large to be parsed without pyogrio. Please install using `pip install pyogrio`"}
+            with open(file_path, 'r', encoding='utf-8') as f:
+                collection = json.load(f)
+            features = collection.get('features', [collection]) if collection.get('type') == 'FeatureCollection' or 'features' in collection else [collection]
+            properties = {}
+            for feature in features:
+                for key, value in (feature.get('properties') or {}).items():
+                    if key not in properties and value is not None:
+                        properties[key] = value
+            bbox = collection.get('bbox')
+            if bbox is None:
+                for feature in features:
+                    bbox = _geojson_bounds((feature.get('geometry') or {}).get('coordinates', []), bbox)
+            layer = {
+                "column_analysis": [
+                    _column_info(name, i, "numeric" if isinstance(v, (int, float)) and not isinstance(v, bool) else ("boolean" if isinstance(v, bool) else "string"))
+                    for i, (name, v) in enumerate(properties.items())
+                ],
+                "total_rows": len(features),
+                "crs": "EPSG:4326",
+                "geometry_type": (features[0].get('geometry') or {}).get('type') if len(features) > 0 else None,
+                "native_bounds": bbox[:2] + bbox[-2:] if bbox is not None and len(bbox) == 6 else bbox
+            }
+            bbox = layer["native_bounds"]
+
+        # RFC 7946 GeoJSON is always WGS84
+        return {
+            "file_type": "geojson",
+            "column_analysis": layer["column_analysis"],
+            "total_rows": layer["total_rows"],
+            "total_columns": len(layer["column_analysis"]),
+            "geometry_type": layer["geometry_type"],
+            "crs": layer["crs"],
+            "native_bounds": bbox,
+            "spatial_scale": _spatial_scale_from_bounds(bounds_to_wgs84(bbox, layer["crs"]), dimension_names=["geometry"]),
+            "encoding": "utf-8"
+        }
+    except Exception as e:
+        return {"file_type": "geojson", "error": f"Failed to analyze GeoJSON: {str(e)}"}
+
+
+@register_analyzer('geopackage', extensions=['.gpkg'], mimetypes=['application/geopackage+sqlite3'], sniff=sniff_geopackage, priority=20)
+def analyze_geopackage_file(file_path: Path) -> Dict[str, Any]:
+    """Analyze a GeoPackage using the bounds stored in its layer metadata"""
+    try:
+        # the gpkg_contents table holds the extent of each layer, no features are read
+        with sqlite3.connect(f"file:{file_path}?mode=ro", uri=True) as conn:
+            contents = conn.execute(
+                "SELECT c.table_name, c.data_type, c.min_x, c.min_y, c.max_x, c.max_y, s.organization, s.organization_coordsys_id "
+                "FROM gpkg_contents c LEFT JOIN gpkg_spatial_ref_sys s ON s.srs_id=c.srs_id"
+            ).fetchall()
+            layers = []
+            for table, data_type, min_x, min_y, max_x, max_y, org, org_id in contents:
+                columns = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+                layers.append({
+                    "name": table,
+                    "data_type": data_type,
+                    "crs": f"{org.upper()}:{org_id}" if org is not None and org_id is not None and org_id > 0 else None,
+                    "native_bounds": [min_x, min_y, max_x, max_y] if min_x is not None else None,
+                    "columns": [(c[1], str(c[2]).upper()) for c in columns]
+                })
+        conn.close()
+
+        if len(layers) == 0:
+            return {"file_type": "geopackage", "error": "GeoPackage does not contain any layers"}
+
+        layer = next((lay for lay in layers if lay["data_type"] == 'features'), layers[0])
+        total_rows = None
+        if PYOGRIO_LOADED and layer["data_type"] == 'features':
+            info = _layer_info_pyogrio(file_path, layer=layer["name"])
+            total_rows = info["total_rows"]
+            if layer["native_bounds"] is None:
+                layer["native_bounds"] = info["native_bounds"]
+
+        column_analysis = [
+            _column_info(name, i, "numeric" if sql_type.startswith(('INT', 'REAL', 'DOUBLE', 'FLOAT', 'NUMERIC', 'MEDIUMINT', 'SMALLINT', 'TINYINT')) else ("datetime" if sql_type in ('DATE', 'DATETIME') else "string"))
+            for i, (name, sql_type) in enumerate(layer["columns"])
+        ]
+
+        return {
+            "file_type": "geopackage",
+            "layers": [{k: v for k, v in lay.items() if k != 'columns'} for lay in layers],
+            "layer": layer["name"],
+            "column_analysis": column_analysis,
+            "total_rows": total_rows,
+            "total_columns": len(column_analysis),
+            "crs": layer["crs"],
+            "native_bounds": layer["native_bounds"],
+            "spatial_scale": _spatial_scale_from_bounds(bounds_to_wgs84(layer["native_bounds"], layer["crs"]), dimension_names=[layer["name"]])
+        }
+    except Exception as e:
+        return {"file_type": "geopackage", "error": f"Failed to analyze GeoPackage: {str(e)}"}
+
+
+@register_analyzer('geotiff', extensions=['.tif', '.tiff', '.gtiff'], mimetypes=['image/tiff'], magic=list(TIFF_SIGNATURES))
+def analyze_geotiff_file(file_path: Path) -> Dict[str, Any]:
+    """Analyze a GeoTIFF file by reading its header only"""
+    try:
+        if RASTERIO_LOADED:
+            with rasterio.open(file_path) as src:
+                width, height, count = src.width, src.height, src.count
+                dtypes = list(src.dtypes)
+                crs = src.crs.to_string() if src.crs is not None else None
+                native_bounds = list(src.bounds)
+                res_x, res_y = src.res
+                is_geographic = src.crs.is_geographic if src.crs is not None else False
+                if crs is not None:
+                    bounds = list(transform_bounds(src.crs, 'EPSG:4326', *native_bounds))
+                else:
+                    bounds = None
+                nodata = src.nodata
+        elif TIFFFILE_LOADED:
+            with tifffile.TiffFile(file_path) as tif:
+                page = tif.pages[0]
+                width, height = page.imagewidth, page.imagelength
+                count = page.samplesperpixel
+                dtypes = [str(page.dtype)] * count
+                geo = page.geotiff_tags or {}
+                nodata = None
+            crs, native_bounds, bounds = None, None, None
+            res_x = res_y = None
+            is_geographic = False
+            if 'ModelPixelScale' in geo and 'ModelTiepoint' in geo:
+                res_x, res_y = geo['ModelPixelScale'][0], geo['ModelPixelScale'][1]
+                i, j, _, x, y, _ = geo['ModelTiepoint'][:6]
+                west, north = x - i * res_x, y + j * res_y
+                native_bounds = [west, north - height * res_y, west + width * res_x, north]
+                code = geo.get('ProjectedCSTypeGeoKey') or geo.get('GeographicTypeGeoKey')
+                if code is not None and int(code) not in (0, 32767):
+                    crs = f"EPSG:{int(code)}"
+                    is_geographic = 'ProjectedCSTypeGeoKey' not in geo
+                    bounds = bounds_to_wgs84(native_bounds, crs)
+        else:
+            return {"file_type": "geotiff", "error": "GeoTIFF analysis requires rasterio or tifffile. Please install using `pip install rasterio`"}
+
+        if res_y is not None:
+            resolution = abs(res_y) * METERS_PER_DEGREE if is_geographic else abs(res_y)
+        else:
+            resolution = None
+
+        column_analysis = [
+            _column_info(f"band_{b + 1}", b, "numeric" if not str(dtype).startswith('bool') else "boolean")
+            for b, dtype in enumerate(dtypes)
+        ]
+        return {
+            "file_type": "geotiff",
+            "column_analysis": column_analysis,
+            "total_columns": count,
+            "shape": [count, height, width],
+            "crs": crs,
+            "native_bounds": native_bounds,
+            "nodata": nodata,
+            "spatial_scale": _spatial_scale_from_bounds(bounds, resolution=resolution, dimension_names=["y", "x"])
+        }
+    except Exception as e:
+        return {"file_type": "geotiff", "error": f"Failed to analyze GeoTIFF: {str(e)}"}
+
+
 # Factory function to create preview response from analysis
-def create_preview_response(analysis: Dict[str, Any], file_hash: str, file_path: Path) -> FilePreviewResponse:
+def create_preview_response(analysis: Dict[str, Any], file_hash: str, file_path: Path, mimetype: str | None = None) -> FilePreviewResponse:
     """Create a FilePreviewResponse object from analysis results"""
     
     # Get file info
@@ -285,7 +1292,9 @@ def create_preview_response(analysis: Dict[str, Any], file_hash: str, file_path:
     file_size = file_info.size if file_info else 0
     
     # Detect mimetype
-    detected_mime, _ = mimetypes.guess_type(str(file_path))
+    detected_mime = mimetype
+    if detected_mime is None:
+        detected_mime, _ = mimetypes.guess_type(file_info.filename if file_info else str(file_path))
     if detected_mime is None:
         detected_mime = "application/octet-stream"
     
@@ -331,7 +1340,7 @@ def create_preview_response(analysis: Dict[str, Any], file_hash: str, file_path:
         variables=variables,
         rows=analysis.get("total_rows") or analysis.get("total_lines"),
         columns=analysis.get("total_columns"),
-        shape=None,  # For future multi-dimensional data
+        shape=analysis.get("shape"),
         spatial_scale=analysis.get("spatial_scale"),
         temporal_scale=analysis.get("temporal_scale"),
         inferred_metadata=inferred_metadata,
@@ -341,6 +1350,40 @@ def create_preview_response(analysis: Dict[str, Any], file_hash: str, file_path:
     return response
 
 
+async def preview_file(analyzer: FileAnalyzer, file_path: Path) -> FilePreviewResponse:
+    """Run the given analyzer on a cached file and build the preview response"""
+    analysis = await run_analyzer(analyzer, file_path)
+    file_hash = file_path.name  # The filename is the hash
+    
+    if "error" in analysis:
+        raise HTTPException(status_code=400, detail=analysis["error"])
+    
+    analysis["analyzer"] = analyzer.name
+    try:
+        return create_preview_response(analysis, file_hash, file_path, mimetype=analyzer.mimetypes[0] if analyzer.mimetypes else None)
+    except KeyError:
+        # the file was evicted from the cache while it was analyzed
+        raise HTTPException(status_code=404, detail=f"File with hash {file_hash} not found")
+
+
+@preview_router.get('/analyzers')
+async def get_preview_analyzers():
+    """
+    List all registered file analyzers.
+    """
+    return {
+        "analyzers": [
+            {
+                "name": a.name,
+                "description": a.description,
+                "extensions": a.extensions,
+                "mimetypes": a.mimetypes,
+                "cost": a.cost
+            } for a in get_analyzers().values()
+        ]
+    }
+
+
 # CSV Preview Endpoint
 @preview_router.get('/csv/{file_hash}')
 async def get_csv_preview(file_path: Path = Depends(get_file_from_hash)) -> FilePreviewResponse:
@@ -351,15 +1394,9 @@ async def get_csv_preview(file_path: Path = Depends(get_file_from_hash)) -> File
     Useful for files that are CSV but have different extensions.
     """
     try:
-        analysis = analyze_csv_file(file_path)
-        file_hash = file_path.name  # The filename is the hash
-        
-        if "error" in analysis:
-            raise HTTPException(status_code=400, detail=analysis["error"])
-        
-        response = create_preview_response(analysis, file_hash, file_path)
-        return response
-        
+        return await preview_file(get_analyzers()['csv'], file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze CSV file: {str(e)}")
 
@@ -373,15 +1410,9 @@ async def get_netcdf_preview(file_path: Path = Depends(get_file_from_hash)) -> F
     This endpoint treats any file as NetCDF, regardless of its actual mimetype.
     """
     try:
-        analysis = analyze_netcdf_file(file_path)
-        file_hash = file_path.name  # The filename is the hash
-        
-        if "error" in analysis:
-            raise HTTPException(status_code=400, detail=analysis["error"])
-        
-        response = create_preview_response(analysis, file_hash, file_path)
-        return response
-        
+        return await preview_file(get_analyzers()['netcdf'], file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze NetCDF file: {str(e)}")
 
@@ -395,15 +1426,9 @@ async def get_text_preview(file_path: Path = Depends(get_file_from_hash)) -> Fil
     This endpoint treats any file as text, regardless of its actual mimetype.
     """
     try:
-        analysis = analyze_text_file(file_path)
-        file_hash = file_path.name  # The filename is the hash
-        
-        if "error" in analysis:
-            raise HTTPException(status_code=400, detail=analysis["error"])
-        
-        response = create_preview_response(analysis, file_hash, file_path)
-        return response
-        
+        return await preview_file(get_analyzers()['text'], file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze text file: {str(e)}")
 
@@ -417,15 +1442,9 @@ async def get_generic_preview(file_path: Path = Depends(get_file_from_hash)) ->
     This endpoint provides basic file analysis for any file type.
     """
     try:
-        analysis = analyze_generic_file(file_path)
-        file_hash = file_path.name  # The filename is the hash
-        
-        if "error" in analysis:
-            raise HTTPException(status_code=400, detail=analysis["error"])
-        
-        response = create_preview_response(analysis, file_hash, file_path)
-        return response
-        
+        return await preview_file(get_analyzers()['generic'], file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze file: {str(e)}")
 
@@ -436,27 +1455,38 @@ async def get_auto_preview(file_path: Path = Depends(get_file_from_hash)) -> Fil
     """
     Automatically detect file type and return detailed preview information.
     
-    This endpoint tries to guess the file type based on extension and content.
+    The analyzer is selected by sniffing the file content (magic bytes) first and
+    by the extension of the uploaded filename second.
     """
     try:
-        file_extension = file_path.suffix.lower()
-        file_hash = file_path.name
-        
-        # Auto-detect based on extension
-        if file_extension == '.csv':
-            analysis = analyze_csv_file(file_path)
-        elif file_extension in ['.nc', '.netcdf', '.cdf']:
-            analysis = analyze_netcdf_file(file_path)
-        elif file_extension in ['.txt', '.md', '.log']:
-            analysis = analyze_text_file(file_path)
-        else:
-            analysis = analyze_generic_file(file_path)
-        
-        if "error" in analysis:
-            raise HTTPException(status_code=400, detail=analysis["error"])
-        
-        response = create_preview_response(analysis, file_hash, file_path)
-        return response
+        file_info = core.cache.get_file(file_path.name)
+    except KeyError:
+        # the file was evicted from the cache after it was resolved
+        raise HTTPException(status_code=404, detail=f"File with hash {file_path.name} not found")
+
+    try:
+        analyzer = await run_in_threadpool(detect_analyzer, file_path, filename=file_info.filename)
         
+        return await preview_file(analyzer, file_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to analyze file: {str(e)}")
+
+
+# Any other registered analyzer, i.e. parquet, geojson, geopackage, geotiff or third-party ones
+@preview_router.get('/{analyzer_name}/{file_hash}')
+async def get_analyzer_preview(analyzer_name: str, file_path: Path = Depends(get_file_from_hash)) -> FilePreviewResponse:
+    """
+    Analyze a file with the named analyzer and return detailed preview information.
+    """
+    analyzers = get_analyzers()
+    if analyzer_name not in analyzers:
+        raise HTTPException(status_code=404, detail=f"No analyzer named '{analyzer_name}'. Available: [{', '.join(analyzers.keys())}]")
+    
+    try:
+        return await preview_file(analyzers[analyzer_name], file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze file: {str(e)}")
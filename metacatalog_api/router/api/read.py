@@ -1,22 +1,25 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from fastapi.exceptions import HTTPException
 from pydantic_geojson import FeatureCollectionModel
 
 from metacatalog_api import core
 from metacatalog_api import models
+from metacatalog_api.router.api.export import EXPORT_RENDERERS
+from metacatalog_api.http_cache import entry_etag, lookup_etag, json_response
+
 read_router = APIRouter()
 
 
 @read_router.get('/entries')
 @read_router.get('/entries.json')
-def get_entries(offset: int = 0, limit: int = 100, search: str = None, full_text: bool = True, title: str = None, description: str = None, variable: str = None, geolocation: str = None):
+def get_entries(offset: int = 0, limit: int = 100, search: str = None, full_text: bool = True, title: str = None, description: str = None, variable: str = None, geolocation: str = None, all_versions: bool = False):
 
     # sanitize the search
     if search is not None and search.strip() == '':
         search = None
 
     # call the function
-    entries = core.entries(offset, limit, search=search, full_text=full_text, title=title, variable=variable, geolocation=geolocation) 
+    entries = core.entries(offset, limit, search=search, full_text=full_text, title=title, variable=variable, geolocation=geolocation, all_versions=all_versions) 
 
     return entries
 
@@ -27,8 +30,8 @@ def get_entries_geojson(search: str = None, offset: int = None, limit: int = Non
     
     return geometries
 
-@read_router.get('/entries/{id}')
-@read_router.get('/entries/{id}.json')
+@read_router.get('/entries/{id}', dependencies=[entry_etag()])
+@read_router.get('/entries/{id}.json', dependencies=[entry_etag()])
 def get_entry(id: int):
     # call the function
     entries = core.entries(ids=id)
@@ -38,16 +41,26 @@ def get_entry(id: int):
     return entries[0]
 
 
-@read_router.get('/licenses')
-@read_router.get('/licenses.json')
-def get_licenses(license_id: int | None = None):
+@read_router.get('/entries/{id}/versions')
+@read_router.get('/entries/{id}/versions.json')
+def get_entry_versions(id: int) -> list[models.EntryVersion]:
+    versions = core.entry_versions(id)
+
+    if versions is None:
+        raise HTTPException(status_code=404, detail=f"Entry of <ID={id}> not found")
+    return versions
+
+
+@read_router.get('/licenses', dependencies=[lookup_etag('licenses', *core.LICENSE_TABLES)])
+@read_router.get('/licenses.json', dependencies=[lookup_etag('licenses', *core.LICENSE_TABLES)])
+def get_licenses(response: Response, license_id: int | None = None):
     # call the function
     try:
-        licenses = core.licenses(id=license_id)
+        licenses = core.licenses(id=license_id, as_json=True)
     except Exception as e:
          raise HTTPException(status_code=404, detail=str(e))
 
-    return licenses
+    return json_response(licenses, response)
 
 
 @read_router.get('/authors')
@@ -83,38 +96,38 @@ def get_author_by_name(id: int = None, name: str = None, search: str = None):
     return author
 
 
-@read_router.get('/variables')
-@read_router.get('/variables.json')
-def get_variables(only_available: bool = False, offset: int = None, limit: int = None):
+@read_router.get('/variables', dependencies=[lookup_etag('variables', *core.VARIABLE_TABLES, unless='only_available')])
+@read_router.get('/variables.json', dependencies=[lookup_etag('variables', *core.VARIABLE_TABLES, unless='only_available')])
+def get_variables(response: Response, only_available: bool = False, offset: int = None, limit: int = None):
     try:
-        variables = core.variables(only_available=only_available, offset=offset, limit=limit)
+        variables = core.variables(only_available=only_available, offset=offset, limit=limit, as_json=True)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e)) from e
 
-    return variables
+    return json_response(variables, response)
 
-@read_router.get('/variables/{id}')
-@read_router.get('/variables/{id}.json')
-def get_variable(id: int):
+@read_router.get('/variables/{id}', dependencies=[lookup_etag('variables', *core.VARIABLE_TABLES)])
+@read_router.get('/variables/{id}.json', dependencies=[lookup_etag('variables', *core.VARIABLE_TABLES)])
+def get_variable(id: int, response: Response):
     try:
-        variable = core.variables(id=id)
+        variable = core.variables(id=id, as_json=True)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return variable
+    return json_response(variable, response)
 
 
-@read_router.get('/datasource-types')
-@read_router.get('/datasource-types.json')
-def get_datasource_types():
+@read_router.get('/datasource-types', dependencies=[lookup_etag('datasource_types', *core.DATATYPE_TABLES)])
+@read_router.get('/datasource-types.json', dependencies=[lookup_etag('datasource_types', *core.DATATYPE_TABLES)])
+def get_datasource_types(response: Response):
     try:
-        types = core.datatypes()
-        return types
+        types = core.datatypes(as_json=True)
+        return json_response(types, response)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e)) from e
 
 
-@read_router.get('/keywords')
-@read_router.get('/keywords.json')
+@read_router.get('/keywords', dependencies=[lookup_etag('keywords', *core.KEYWORD_TABLES)])
+@read_router.get('/keywords.json', dependencies=[lookup_etag('keywords', *core.KEYWORD_TABLES)])
 def get_keywords(search: str = None, thesaurus_id: int = None, offset: int = None, limit: int = None):
     try:
         keywords = core.keywords(search=search, thesaurus_id=thesaurus_id, offset=offset, limit=limit)
@@ -123,8 +136,8 @@ def get_keywords(search: str = None, thesaurus_id: int = None, offset: int = Non
         raise HTTPException(status_code=404, detail=str(e)) from e
 
 
-@read_router.get('/keywords/{id}')
-@read_router.get('/keywords/{id}.json')
+@read_router.get('/keywords/{id}', dependencies=[lookup_etag('keywords', *core.KEYWORD_TABLES)])
+@read_router.get('/keywords/{id}.json', dependencies=[lookup_etag('keywords', *core.KEYWORD_TABLES)])
 def get_keyword(id: int):
     try:
         keyword = core.keywords(id=id)
@@ -133,14 +146,14 @@ def get_keyword(id: int):
         raise HTTPException(status_code=404, detail=str(e)) from e
 
 
-@read_router.get('/group-types')
-@read_router.get('/group-types.json')
-def get_group_types():
+@read_router.get('/group-types', dependencies=[lookup_etag('group_types', *core.GROUP_TYPE_TABLES)])
+@read_router.get('/group-types.json', dependencies=[lookup_etag('group_types', *core.GROUP_TYPE_TABLES)])
+def get_group_types(response: Response):
     try:
-        group_types = core.group_types()
+        group_types = core.group_types(as_json=True)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e)) from e
-    return group_types
+    return json_response(group_types, response)
 
 
 @read_router.get('/groups')
@@ -207,6 +220,17 @@ def get_export_formats_list(app) -> list[dict]:
                     'methods': list(route.methods) if hasattr(route, 'methods') else ['GET']
                 })
     
+    # renderers registered without an export route can still be used for packaging
+    known_formats = {route['format'] for route in export_routes}
+    for format_name, renderer in EXPORT_RENDERERS.items():
+        if format_name not in known_formats:
+            export_routes.append({
+                'format': format_name,
+                'display_name': renderer.display_name or format_name.upper(),
+                'path': None,
+                'methods': []
+            })
+    
     return export_routes
 
 
@@ -216,4 +240,16 @@ def get_export_formats(request: Request):
     Get all available export formats by scanning FastAPI routes
     """
     export_routes = get_export_formats_list(request.app)
-    return {"export_formats": export_routes}
\ No newline at end of file
+    return {"export_formats": export_routes}
+
+@read_router.get('/cache/metrics')
+def get_cache_metrics():
+    """
+    Hit ratio, size and evictions of the server side caches and the number of coalesced reads
+    """
+    return {
+        "responses": core.response_cache.stats(),
+        "exports": core.export_cache.stats(),
+        "lookups": core.lookup_cache.stats(),
+        "single_flight": core.single_flight.stats()
+    }
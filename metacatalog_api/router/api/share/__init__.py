@@ -1 +1,3 @@
-from .core import share_router, create_share_package
\ No newline at end of file
+from .core import share_router, create_share_package, write_package_data, iter_file_chunks
+from .zipstream import ZipStream, TarZstStream, PACKAGE_FORMATS, open_package, write_to_file
+from .transfer import get_http_client, close_http_client, create_http_client, upload_file, TransferSettings, transfer_settings, http_metrics
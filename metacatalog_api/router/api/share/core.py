@@ -1,12 +1,15 @@
-import io
+from typing import AsyncIterator, Iterator
+from pathlib import Path
 import json
-import zipfile
 
 from fastapi import APIRouter, Request
-
+from starlette.concurrency import run_in_threadpool
 
 from metacatalog_api import core
+from metacatalog_api import models
 from metacatalog_api.router.api.export import render_export
+from metacatalog_api.router.api.share.zipstream import ZipStream, TarZstStream, open_package, CHUNK_SIZE
+from metacatalog_api.router.api.share.transfer import http_metrics
 
 
 share_router = APIRouter()
@@ -59,72 +62,97 @@ def get_share_providers(request: Request):
     return {"share_providers": valid_providers}
 
 
-def create_share_package(request: Request, entry_id: int, formats: list[str], include_data: bool = True) -> tuple[io.BytesIO, str]:
+@share_router.get('/share-providers/metrics')
+def get_share_provider_metrics():
+    """
+    Connection reuse and upstream latency of the outbound calls to share providers, per host
+    """
+    return {"hosts": http_metrics.stats()}
+
+
+def write_package_data(archive: ZipStream | TarZstStream, entry_id: int, entry: models.Metadata | None) -> Iterator[bytes]:
+    """
+    Add the data of an entry to the data/ folder of a package. File based datasources
+    and internal tables are streamed chunk by chunk, for all other datasources a
+    data/manifest.json is written.
+    """
+    # Use core function to get data file info
+    data_info = core.get_entry_data_file(entry_id)
+    
+    if data_info['error']:
+        # Create error manifest
+        manifest = {
+            "type": "error",
+            "error": data_info['error'],
+            "description": "Data file could not be included in package"
+        }
+        yield from archive.writestr("data/manifest.json", json.dumps(manifest, indent=2))
+    elif data_info['is_stream']:
+        # Internal table - stream data to ZIP
+        yield from archive.write_iter(f"data/{data_info['filename']}", data_info['stream_generator']())
+    elif data_info['file_path']:
+        # File-based datasource - add file to ZIP
+        yield from archive.write_file(data_info['file_path'], f"data/{data_info['filename']}")
+    elif entry is not None and entry.datasource:
+        # External or unsupported - create manifest
+        datasource = entry.datasource
+        if datasource.type.name == "external":
+            manifest = {
+                "type": "external",
+                "url": datasource.path,
+                "description": "External datasource - data not included in package"
+            }
+        else:
+            manifest = {
+                "type": datasource.type.name if datasource.type else "unknown",
+                "path": datasource.path,
+                "status": "unsupported",
+                "description": f"Datasource type '{datasource.type.name if datasource.type else 'unknown'}' is not supported for packaging"
+            }
+        yield from archive.writestr("data/manifest.json", json.dumps(manifest, indent=2))
+
+
+def create_share_package(request: Request | None, entry_id: int, formats: list[str], include_data: bool = True, package_format: str = 'zip') -> tuple[Iterator[bytes], str]:
     """
     Create a shareable package with metadata and optionally data files.
+    The package is not built upfront, but returned as an iterator over the bytes
+    of the archive, which can be streamed to the response or into a file.
+    package_format is one of zipstream.PACKAGE_FORMATS, 'zip' or 'tar.zst'.
     
     Returns:
-        tuple: (zip_buffer, filename) where zip_buffer is a BytesIO object
+        tuple: (chunks, filename) where chunks is an iterator of bytes
     """
-    app = request.app
-    
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # Add metadata files in requested formats using dynamic export system
+    # open the archive upfront, so that unavailable formats fail before streaming
+    archive = open_package(package_format)
+    # load the entry once and hand it to all export renderers
+    entries = core.entries(ids=entry_id)
+    entry = entries[0] if len(entries) > 0 else None
+
+    def generate() -> Iterator[bytes]:
+        # Add metadata files in requested formats using the export renderer registry
         for format_name in formats:
+            if entry is None:
+                break
             try:
-                content, filename = render_export(app, entry_id, format_name, request)
-                zip_file.writestr(f"metadata/{filename}", content)
-            except Exception as e:
+                content, filename = render_export(entry, format_name, request)
+            except Exception:
                 # Skip formats that fail, but continue with others
                 continue
+            yield from archive.writestr(f"metadata/{filename}", content)
         
         # Add data files if requested
         if include_data:
-            # Use core function to get data file info
-            data_info = core.get_entry_data_file(entry_id)
-            
-            if data_info['error']:
-                # Create error manifest
-                manifest = {
-                    "type": "error",
-                    "error": data_info['error'],
-                    "description": "Data file could not be included in package"
-                }
-                zip_file.writestr("data/manifest.json", json.dumps(manifest, indent=2))
-            elif data_info['is_stream']:
-                # Internal table - stream data to ZIP
-                csv_content = ""
-                for chunk in data_info['stream_generator']():
-                    csv_content += chunk
-                zip_file.writestr(f"data/{data_info['filename']}", csv_content)
-            elif data_info['file_path']:
-                # File-based datasource - add file to ZIP
-                zip_file.write(str(data_info['file_path']), f"data/{data_info['filename']}")
-            else:
-                # External or unsupported - create manifest
-                entries = core.entries(ids=entry_id)
-                if entries and entries[0].datasource:
-                    datasource = entries[0].datasource
-                    if datasource.type.name == "external":
-                        manifest = {
-                            "type": "external",
-                            "url": datasource.path,
-                            "description": "External datasource - data not included in package"
-                        }
-                    else:
-                        manifest = {
-                            "type": datasource.type.name if datasource.type else "unknown",
-                            "path": datasource.path,
-                            "status": "unsupported",
-                            "description": f"Datasource type '{datasource.type.name if datasource.type else 'unknown'}' is not supported for packaging"
-                        }
-                    zip_file.writestr("data/manifest.json", json.dumps(manifest, indent=2))
+            yield from write_package_data(archive, entry_id, entry)
+        
+        yield from archive.close()
     
-    zip_buffer.seek(0)
-    filename = f"entry_{entry_id}_package.zip"
+    filename = f"entry_{entry_id}_package{archive.extension}"
     
-    return zip_buffer, filename
+    return generate(), filename
+
 
+async def iter_file_chunks(file_path: str | Path, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read a file chunk by chunk without blocking the event loop, i.e. to upload it with httpx"""
+    with open(file_path, 'rb') as f:
+        while chunk := await run_in_threadpool(f.read, chunk_size):
+            yield chunk
@@ -1,11 +1,13 @@
-import io
 import json
 
 from fastapi import Request, HTTPException
 from fastapi.responses import StreamingResponse
 
 from metacatalog_api import core
-from metacatalog_api.router.api.share import share_router, create_share_package
+from metacatalog_api.jobs import register_job, JobContext
+from metacatalog_api.rate_limit import rate_limit
+from metacatalog_api.server import server
+from metacatalog_api.router.api.share import share_router, create_share_package, write_to_file, PACKAGE_FORMATS
 from metacatalog_api.router.api.read import get_export_formats_list
 
 
@@ -53,13 +55,31 @@ def get_download_form(entry_id: int, request: Request):
                 "type": "checkbox",
                 "label": "Include Data Files",
                 "default": True
+            },
+            {
+                "name": "package_format",
+                "type": "select",
+                "label": "Package Format",
+                "required": True,
+                "multiple": False,
+                "options": [
+                    {"value": name, "label": f"{stream.extension} archive"}
+                    for name, stream in PACKAGE_FORMATS.items()
+                ],
+                "default": "zip"
+            },
+            {
+                "name": "background",
+                "type": "checkbox",
+                "label": "Prepare in background and download later",
+                "default": False
             }
         ],
         "metadata_preview": False
     }
 
 
-@share_router.post('/share/download/submit')
+@share_router.post('/share/download/submit', dependencies=[rate_limit('share', per='ip')])
 async def submit_download(entry_id: int, request: Request):
     """
     Submit download request and return package
@@ -69,6 +89,8 @@ async def submit_download(entry_id: int, request: Request):
         body = await request.json()
         metadata_formats = body.get('metadata_formats', ['json', 'datacite'])
         include_data = body.get('include_data', True)
+        package_format = body.get('package_format', 'zip')
+        background = bool(body.get('background', False))
     except (json.JSONDecodeError, ValueError, TypeError, KeyError) as e:
         raise HTTPException(status_code=400, detail="Invalid request body. Expected JSON with 'metadata_formats' and 'include_data' fields.") from e
     
@@ -83,18 +105,60 @@ async def submit_download(entry_id: int, request: Request):
             detail=f"Invalid metadata_formats. Must be a list containing one or more of: {format_names}"
         )
     
-    # Create package
-    zip_buffer, filename = create_share_package(request, entry_id, metadata_formats, include_data)
+    if package_format not in PACKAGE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid package_format. Must be one of: {', '.join(PACKAGE_FORMATS)}"
+        )
     
-    # Return ZIP file as streaming response
-    # Note: zip_buffer is already a BytesIO object, we need to read its contents
-    zip_data = zip_buffer.read()
-    zip_buffer.close()
+    # large packages can be built by a job worker and downloaded once they are ready
+    if background:
+        job = core.enqueue_job('share.download', {
+            'entry_id': entry_id,
+            'metadata_formats': metadata_formats,
+            'include_data': include_data,
+            'package_format': package_format
+        })
+        return {
+            "success": True,
+            "message": "The package is being prepared. Download it once the job has finished.",
+            "job_id": job.id,
+            "links": {
+                "Status": f"{server.uri_prefix}jobs/{job.id}",
+                "Download": f"{server.uri_prefix}jobs/{job.id}/result"
+            }
+        }
+    
+    # Create package - the archive is built while it is streamed to the client
+    package, filename = create_share_package(request, entry_id, metadata_formats, include_data, package_format=package_format)
     
     return StreamingResponse(
-        io.BytesIO(zip_data),
-        media_type="application/zip",
+        package,
+        media_type=PACKAGE_FORMATS[package_format].media_type,
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"'
         }
     )
+
+
+@register_job('share.download')
+def build_download_package(payload: dict, context: JobContext) -> dict:
+    """Build a download package into the job result directory"""
+    package_format = payload.get('package_format', 'zip')
+    context.progress(0.1, "Building package")
+    package, filename = create_share_package(
+        None,
+        payload['entry_id'],
+        payload.get('metadata_formats', ['json', 'datacite']),
+        payload.get('include_data', True),
+        package_format=package_format
+    )
+    path = context.result_directory / filename
+    size = write_to_file(package, path)
+
+    return {
+        "file": str(path),
+        "filename": filename,
+        "media_type": PACKAGE_FORMATS[package_format].media_type,
+        "size": size
+    }
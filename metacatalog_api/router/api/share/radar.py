@@ -2,30 +2,29 @@ import json
 import logging
 import os
 import tempfile
-import zipfile
-from pathlib import Path
+from typing import Callable, Iterator
 
 import httpx
 from fastapi import Request, HTTPException
-from fastapi.templating import Jinja2Templates
-from jinja2 import TemplateError
+from starlette.concurrency import run_in_threadpool
 
 from metacatalog_api import core, models
-from metacatalog_api.router.api.share import share_router
+from metacatalog_api.router.api.export import render_export
+from metacatalog_api.router.api.share import share_router, write_package_data, ZipStream, write_to_file
+from metacatalog_api.router.api.share.transfer import get_http_client, close_http_client, upload_file
+from metacatalog_api.jobs import register_job, JobContext
+from metacatalog_api.rate_limit import rate_limit
 from metacatalog_api.server import server
 
 logger = logging.getLogger(__name__)
 
 
-# Templates are in router/api/templates/, we're in router/api/share/
-templates = Jinja2Templates(directory=Path(__file__).parent.parent / 'templates')
-
-
 async def refresh_radar_token(
     client_id: str,
     client_secret: str,
     refresh_token: str,
-    base_url: str
+    base_url: str,
+    client: httpx.AsyncClient | None = None
 ) -> dict:
     """
     Refresh expired access token.
@@ -39,24 +38,24 @@ async def refresh_radar_token(
         "refreshToken": refresh_token
     }
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                token_url,
-                json=payload,
-                timeout=30.0
+        client = client or get_http_client()
+        response = await client.post(
+            token_url,
+            json=payload,
+            timeout=30.0
+        )
+        if response.status_code not in [200, 201]:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                pass
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to refresh RADAR token: {error_detail}"
             )
-            if response.status_code not in [200, 201]:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    pass
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to refresh RADAR token: {error_detail}"
-                )
-            return response.json()
+        return response.json()
     except HTTPException:
         raise
     except httpx.HTTPError as e:
@@ -72,7 +71,8 @@ async def get_token_via_password(
     client_id: str,
     client_secret: str,
     redirect_url: str,
-    base_url: str
+    base_url: str,
+    client: httpx.AsyncClient | None = None
 ) -> dict:
     """
     Get RADAR access token via username/password (RADAR API: POST /tokens).
@@ -88,25 +88,25 @@ async def get_token_via_password(
         "userPassword": user_password
     }
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                token_url,
-                json=payload,
-                timeout=30.0
+        client = client or get_http_client()
+        response = await client.post(
+            token_url,
+            json=payload,
+            timeout=30.0
+        )
+        if response.status_code not in [200, 201]:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_json.get('status', error_detail))
+            except (json.JSONDecodeError, ValueError):
+                pass
+            logger.error(f"RADAR password token failed: {response.status_code} - {error_detail}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"RADAR login failed: {error_detail}"
             )
-            if response.status_code not in [200, 201]:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_json.get('status', error_detail))
-                except (json.JSONDecodeError, ValueError):
-                    pass
-                logger.error(f"RADAR password token failed: {response.status_code} - {error_detail}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"RADAR login failed: {error_detail}"
-                )
-            return response.json()
+        return response.json()
     except HTTPException:
         raise
     except httpx.HTTPError as e:
@@ -117,22 +117,15 @@ async def get_token_via_password(
         ) from e
 
 
-def render_zku_xml(entry: models.Metadata, request: Request) -> str:
+def render_zku_xml(entry: models.Metadata, request: Request | None = None) -> str:
     """
-    Render ZKU XML metadata from entry using existing template.
-    Uses the zku.xml template from router/api/templates/
+    Render ZKU XML metadata from entry using the registered zku export renderer.
     """
-    try:
-        zku_content = templates.get_template("zku.xml").render(entry=entry, request=request)
-        return zku_content
-    except TemplateError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to render ZKU XML template: {e!s}"
-        ) from e
+    zku_content, _ = render_export(entry, 'zku', request)
+    return zku_content
 
 
-async def get_radar_contracts(access_token: str, base_url: str) -> list[dict]:
+async def get_radar_contracts(access_token: str, base_url: str, client: httpx.AsyncClient | None = None) -> list[dict]:
     """
     Get available contracts for the authenticated user.
     GET /contracts?sort=title&offset=0&rows=100
@@ -149,37 +142,37 @@ async def get_radar_contracts(access_token: str, base_url: str) -> list[dict]:
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                contracts_url,
-                headers=headers,
-                params=params,
-                timeout=30.0
-            )
+        client = client or get_http_client()
+        response = await client.get(
+            contracts_url,
+            headers=headers,
+            params=params,
+            timeout=30.0
+        )
             
-            if response.status_code != 200:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    pass
+        if response.status_code != 200:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                pass
                 
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to fetch RADAR contracts: {error_detail}"
-                )
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to fetch RADAR contracts: {error_detail}"
+            )
             
-            result = response.json()
-            # RADAR API may return contracts in different formats
-            if isinstance(result, list):
-                return result
-            elif isinstance(result, dict) and 'results' in result:
-                return result['results']
-            elif isinstance(result, dict) and 'contracts' in result:
-                return result['contracts']
-            else:
-                return []
+        result = response.json()
+        # RADAR API may return contracts in different formats
+        if isinstance(result, list):
+            return result
+        elif isinstance(result, dict) and 'results' in result:
+            return result['results']
+        elif isinstance(result, dict) and 'contracts' in result:
+            return result['contracts']
+        else:
+            return []
             
     except HTTPException:
         raise
@@ -190,7 +183,7 @@ async def get_radar_contracts(access_token: str, base_url: str) -> list[dict]:
         ) from e
 
 
-async def get_radar_workspaces(access_token: str, contract_id: str, base_url: str) -> list[dict]:
+async def get_radar_workspaces(access_token: str, contract_id: str, base_url: str, client: httpx.AsyncClient | None = None) -> list[dict]:
     """
     Get available workspaces for a contract.
     GET /contracts/{contractId}/workspaces
@@ -201,42 +194,42 @@ async def get_radar_workspaces(access_token: str, contract_id: str, base_url: st
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                workspaces_url,
-                headers=headers,
-                timeout=30.0
-            )
+        client = client or get_http_client()
+        response = await client.get(
+            workspaces_url,
+            headers=headers,
+            timeout=30.0
+        )
             
-            if response.status_code == 404:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Contract with ID '{contract_id}' not found or you don't have access to it"
-                )
+        if response.status_code == 404:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Contract with ID '{contract_id}' not found or you don't have access to it"
+            )
             
-            if response.status_code != 200:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    pass
+        if response.status_code != 200:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                pass
                 
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to fetch RADAR workspaces: {error_detail}"
-                )
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to fetch RADAR workspaces: {error_detail}"
+            )
             
-            result = response.json()
-            # RADAR API may return workspaces in different formats
-            if isinstance(result, list):
-                return result
-            elif isinstance(result, dict) and 'results' in result:
-                return result['results']
-            elif isinstance(result, dict) and 'workspaces' in result:
-                return result['workspaces']
-            else:
-                return []
+        result = response.json()
+        # RADAR API may return workspaces in different formats
+        if isinstance(result, list):
+            return result
+        elif isinstance(result, dict) and 'results' in result:
+            return result['results']
+        elif isinstance(result, dict) and 'workspaces' in result:
+            return result['workspaces']
+        else:
+            return []
             
     except HTTPException:
         raise
@@ -247,7 +240,7 @@ async def get_radar_workspaces(access_token: str, contract_id: str, base_url: st
         ) from e
 
 
-async def create_radar_dataset(access_token: str, workspace_id: str, base_url: str) -> dict:
+async def create_radar_dataset(access_token: str, workspace_id: str, base_url: str, client: httpx.AsyncClient | None = None) -> dict:
     """
     Create a new dataset in RADAR workspace.
     POST /workspaces/{workspaceId}/datasets
@@ -267,40 +260,40 @@ async def create_radar_dataset(access_token: str, workspace_id: str, base_url: s
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                datasets_url,
-                json=payload,
-                headers=headers,
-                timeout=30.0
-            )
+        client = client or get_http_client()
+        response = await client.post(
+            datasets_url,
+            json=payload,
+            headers=headers,
+            timeout=30.0
+        )
             
-            if response.status_code == 403:
-                raise HTTPException(
-                    status_code=403,
-                    detail=f"Permission denied. You may not have access to workspace '{workspace_id}' or the contract."
-                )
+        if response.status_code == 403:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Permission denied. You may not have access to workspace '{workspace_id}' or the contract."
+            )
             
-            if response.status_code == 404:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Workspace with ID '{workspace_id}' not found"
-                )
+        if response.status_code == 404:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Workspace with ID '{workspace_id}' not found"
+            )
             
-            if response.status_code not in [200, 201]:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    pass
+        if response.status_code not in [200, 201]:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                pass
                 
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to create RADAR dataset: {error_detail}"
-                )
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to create RADAR dataset: {error_detail}"
+            )
             
-            return response.json()
+        return response.json()
             
     except HTTPException:
         raise
@@ -311,7 +304,7 @@ async def create_radar_dataset(access_token: str, workspace_id: str, base_url: s
         ) from e
 
 
-async def import_radar_metadata(access_token: str, dataset_id: str, zku_xml: str, base_url: str) -> None:
+async def import_radar_metadata(access_token: str, dataset_id: str, zku_xml: str, base_url: str, client: httpx.AsyncClient | None = None) -> None:
     """
     Import ZKU XML metadata into RADAR dataset.
     POST /datasets/{id}/metadata
@@ -325,45 +318,45 @@ async def import_radar_metadata(access_token: str, dataset_id: str, zku_xml: str
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                metadata_url,
-                content=zku_xml.encode('utf-8'),
-                headers=headers,
-                timeout=60.0
-            )
+        client = client or get_http_client()
+        response = await client.post(
+            metadata_url,
+            content=zku_xml.encode('utf-8'),
+            headers=headers,
+            timeout=60.0
+        )
             
-            if response.status_code == 404:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Dataset with ID '{dataset_id}' not found"
-                )
+        if response.status_code == 404:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset with ID '{dataset_id}' not found"
+            )
             
-            if response.status_code == 422:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    pass
+        if response.status_code == 422:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                pass
                 
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"RADAR metadata validation failed: {error_detail}. Please check the ZKU XML format."
-                )
+            raise HTTPException(
+                status_code=422,
+                detail=f"RADAR metadata validation failed: {error_detail}. Please check the ZKU XML format."
+            )
             
-            if response.status_code not in [200, 201]:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    pass
+        if response.status_code not in [200, 201]:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                pass
                 
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to import RADAR metadata: {error_detail}"
-                )
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to import RADAR metadata: {error_detail}"
+            )
             
     except HTTPException:
         raise
@@ -374,42 +367,38 @@ async def import_radar_metadata(access_token: str, dataset_id: str, zku_xml: str
         ) from e
 
 
-async def upload_to_radar(access_token: str, upload_url: str, file_path: str, filename: str) -> None:
+async def upload_to_radar(access_token: str, upload_url: str, file_path: str, filename: str, progress: Callable[[int, int], None] | None = None, client: httpx.AsyncClient | None = None) -> None:
     """
     Upload file to RADAR using the uploadURL from dataset creation.
     PUT {uploadURL}/{filename}
     
     This is step 3 in upload flow (data after metadata).
+    The file is streamed from disk and transient failures are retried.
     File is cleaned up by caller after upload.
     """
     upload_full_url = f"{upload_url}/{filename}"
-    headers = {
-        "Authorization": f"Bearer {access_token}"
-    }
-    
     try:
-        async with httpx.AsyncClient() as client:
-            # Stream file from disk
-            with open(file_path, 'rb') as f:
-                response = await client.put(
-                    upload_full_url,
-                    content=f.read(),
-                    headers=headers,
-                    timeout=300.0  # Longer timeout for large files
-                )
+        response = await upload_file(
+            "PUT",
+            upload_full_url,
+            file_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            progress=progress,
+            client=client
+        )
+        
+        if response.status_code not in [200, 201]:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                pass
             
-            if response.status_code not in [200, 201]:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    pass
-                
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to upload file to RADAR: {error_detail}"
-                )
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to upload file to RADAR: {error_detail}"
+            )
             
     except HTTPException:
         raise
@@ -425,13 +414,13 @@ async def upload_to_radar(access_token: str, upload_url: str, file_path: str, fi
         )
 
 
-def create_radar_package(request: Request, entry_id: int) -> tuple[str, str]:
+def create_radar_package(request: Request | None, entry_id: int) -> tuple[str, str]:
     """
     Create a RADAR-specific package with:
     - ZKU XML metadata (from zku.xml template)
     - Data files (if available)
     
-    Similar to create_zenodo_package but uses temporary file instead of memory.
+    Like create_zenodo_package, the ZIP archive is streamed into a temporary file.
     Returns (temp_file_path, filename) where temp_file_path is the path to the temporary ZIP file.
     Caller is responsible for cleanup (delete temp file after upload).
     """
@@ -442,58 +431,30 @@ def create_radar_package(request: Request, entry_id: int) -> tuple[str, str]:
     
     entry = entries[0]
     
+    def generate() -> Iterator[bytes]:
+        archive = ZipStream()
+
+        # 1. Add ZKU XML metadata
+        try:
+            zku_xml = render_zku_xml(entry, request)
+        except Exception:
+            # If ZKU XML fails, continue
+            # We'll still upload metadata separately via API
+            zku_xml = None
+        if zku_xml is not None:
+            yield from archive.writestr("metadata/zku.xml", zku_xml)
+        
+        # 2. Add data files to data/ folder
+        yield from write_package_data(archive, entry_id, entry)
+
+        yield from archive.close()
+
     # Create temporary ZIP file on disk
     temp_fd, temp_path = tempfile.mkstemp(suffix='.zip', prefix='radar_upload_')
     os.close(temp_fd)  # Close file descriptor, we'll use the path
     
     try:
-        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # 1. Add ZKU XML metadata
-            try:
-                zku_xml = render_zku_xml(entry, request)
-                zip_file.writestr("metadata/zku.xml", zku_xml)
-            except Exception as e:
-                # If ZKU XML fails, continue but log
-                # We'll still upload metadata separately via API
-                pass
-            
-            # 2. Add data files to data/ folder
-            data_info = core.get_entry_data_file(entry_id)
-            
-            if data_info['error']:
-                # Create error manifest
-                manifest = {
-                    "type": "error",
-                    "error": data_info['error'],
-                    "description": "Data file could not be included in package"
-                }
-                zip_file.writestr("data/manifest.json", json.dumps(manifest, indent=2))
-            elif data_info['is_stream']:
-                # Internal table - stream data to ZIP
-                csv_content = ""
-                for chunk in data_info['stream_generator']():
-                    csv_content += chunk
-                zip_file.writestr(f"data/{data_info['filename']}", csv_content)
-            elif data_info['file_path']:
-                # File-based datasource - add file to ZIP
-                zip_file.write(str(data_info['file_path']), f"data/{data_info['filename']}")
-            else:
-                # External or unsupported - create manifest
-                if entry.datasource:
-                    if entry.datasource.type.name == "external":
-                        manifest = {
-                            "type": "external",
-                            "url": entry.datasource.path,
-                            "description": "External datasource - data not included in package"
-                        }
-                    else:
-                        manifest = {
-                            "type": entry.datasource.type.name if entry.datasource.type else "unknown",
-                            "path": entry.datasource.path,
-                            "status": "unsupported",
-                            "description": f"Datasource type '{entry.datasource.type.name if entry.datasource.type else 'unknown'}' is not supported for packaging"
-                        }
-                    zip_file.writestr("data/manifest.json", json.dumps(manifest, indent=2))
+        write_to_file(generate(), temp_path)
         
         filename = f"entry_{entry_id}_package.zip"
         return temp_path, filename
@@ -575,7 +536,7 @@ def get_radar_form(entry_id: int, request: Request):
     }
 
 
-@share_router.post('/share/radar/submit')
+@share_router.post('/share/radar/submit', dependencies=[rate_limit('share', per='ip')])
 async def submit_radar(entry_id: int, request: Request):
     """
     Submit RADAR upload. Body must contain radar_username, radar_password, contract_id and workspace_id.
@@ -621,21 +582,65 @@ async def submit_radar(entry_id: int, request: Request):
     if not access_token:
         raise HTTPException(status_code=401, detail="RADAR login failed. Check username and password.")
 
-    temp_file_path = None
+    # Validate entry exists
+    entries = core.entries(ids=entry_id)
+    if len(entries) == 0:
+        raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
+
+    # the upload runs in a job worker, the access token is removed from the job once it is done
+    job = core.enqueue_job('share.radar', {
+        'entry_id': entry_id,
+        'access_token': access_token,
+        'workspace_id': workspace_id,
+        'base_url': base_url
+    })
+
+    return {
+        "success": True,
+        "message": "The upload to RADAR has been queued. Check the status link for the dataset links.",
+        "job_id": job.id,
+        "links": {
+            "Status": f"{server.uri_prefix}jobs/{job.id}"
+        }
+    }
+
+
+@register_job('share.radar', secrets=['access_token'], max_attempts=1)
+async def run_radar_upload(payload: dict, context: JobContext) -> dict:
+    """Job handler uploading an entry to RADAR"""
+    entries = core.entries(ids=payload['entry_id'])
+    if len(entries) == 0:
+        raise HTTPException(status_code=404, detail=f"Entry of <ID={payload['entry_id']}> not found")
 
     try:
-        # Step 1: Validate entry exists
-        entries = core.entries(ids=entry_id)
-        if len(entries) == 0:
-            raise HTTPException(status_code=404, detail=f"Entry of <ID={entry_id}> not found")
+        return await upload_entry_to_radar(
+            entries[0],
+            access_token=payload['access_token'],
+            workspace_id=payload['workspace_id'],
+            base_url=payload['base_url'],
+            context=context
+        )
+    finally:
+        # the job runs in its own event loop, which ends with the job
+        await close_http_client()
 
-        entry = entries[0]
 
+async def upload_entry_to_radar(entry: models.Metadata, access_token: str, workspace_id: str, base_url: str, context: JobContext | None = None, client: httpx.AsyncClient | None = None) -> dict:
+    """
+    Create a RADAR dataset for the entry, import the ZKU metadata and upload the package.
+    Returns the response for the client including the links of the dataset.
+    """
+    entry_id = entry.id
+    progress = context.progress if context is not None else (lambda *args: None)
+    temp_file_path = None
+
+    try:
         # Step 2: Create dataset in workspace (minimal metadata)
         dataset = await create_radar_dataset(
             access_token=access_token,
             workspace_id=workspace_id,
-            base_url=base_url
+            base_url=base_url,
+            client=client
         )
 
         dataset_id = dataset.get('id')
@@ -654,25 +659,31 @@ async def submit_radar(entry_id: int, request: Request):
             )
 
         # Step 3: Render ZKU XML from entry
-        zku_xml = render_zku_xml(entry, request)
+        progress(0.2, "Importing metadata")
+        zku_xml = render_zku_xml(entry)
 
         # Step 4: Import ZKU XML metadata (POST /datasets/{id}/metadata)
         await import_radar_metadata(
             access_token=access_token,
             dataset_id=dataset_id,
             zku_xml=zku_xml,
-            base_url=base_url
+            base_url=base_url,
+            client=client
         )
 
         # Step 5: Create ZIP package in temporary file (on disk, not memory)
-        temp_file_path, zip_filename = create_radar_package(request, entry_id)
+        progress(0.4, "Building package")
+        temp_file_path, zip_filename = await run_in_threadpool(create_radar_package, None, entry_id)
 
         # Step 6: Upload ZIP file to dataset (PUT {uploadURL}/package.zip) - stream from disk
+        progress(0.6, "Uploading package")
         await upload_to_radar(
             access_token=access_token,
             upload_url=upload_url,
             file_path=temp_file_path,
-            filename=zip_filename
+            filename=zip_filename,
+            progress=lambda sent, total: progress(0.6 + 0.4 * sent / total, f"Uploaded {sent // 1024 ** 2} of {total // 1024 ** 2} MB"),
+            client=client
         )
 
         # Step 7: Clean up temporary ZIP file (delete after successful upload)
@@ -0,0 +1,251 @@
+"""
+Outbound transfers to external repositories like Zenodo and RADAR.
+
+Files are streamed from disk chunk by chunk, thus the memory usage of an upload
+does not depend on the size of the package. Uploads are retried with exponential
+backoff on transient failures and report their progress.
+Connections are pooled in one httpx.AsyncClient per event loop, which speaks
+HTTP/2 if the optional h2 package is installed. The client of the server event
+loop is opened and closed by the server lifespan, job workers run their own loops
+and close their client when the job is done. All clients record per-host metrics
+on connection reuse and upstream latency, see http_metrics.
+"""
+from typing import AsyncIterator, Callable
+from pathlib import Path
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+
+import httpx
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+try:
+    import h2  # noqa: F401
+    H2_LOADED = True
+except ImportError:
+    H2_LOADED = False
+
+from metacatalog_api.router.api.share.zipstream import CHUNK_SIZE
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class TransferSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_TRANSFER_")
+
+    chunk_size: int = CHUNK_SIZE
+    retries: int = 3
+    backoff: float = 1.0
+    max_backoff: float = 60.0
+    upload_timeout: float = 300.0
+    progress_interval: float = 1.0
+    http2: bool = True
+
+    # connection pool and timeouts of the shared client
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    timeout: float = 30.0
+    # per-host timeouts in seconds, i.e. METACATALOG_TRANSFER_HOST_TIMEOUTS='{"zenodo.org": 120}'
+    # they take precedence over the timeouts passed to single requests
+    host_timeouts: dict[str, float] = {}
+
+
+transfer_settings = TransferSettings()
+
+# responses worth another attempt - the upstream is overloaded or a proxy failed
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+class HttpClientMetrics:
+    """
+    Thread-safe per-host counters of the shared clients. A request that did not
+    open a new TCP connection reused a pooled one.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: dict[str, dict[str, float]] = {}
+
+    def record(self, host: str, latency: float, new_connection: bool, error: bool = False) -> None:
+        with self._lock:
+            stats = self._hosts.setdefault(host, {'requests': 0, 'new_connections': 0, 'errors': 0, 'total_latency': 0.0, 'max_latency': 0.0})
+            stats['requests'] += 1
+            stats['new_connections'] += int(new_connection)
+            stats['errors'] += int(error)
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                host: {
+                    'requests': int(s['requests']),
+                    'new_connections': int(s['new_connections']),
+                    'reused_connections': int(s['requests'] - s['new_connections']),
+                    'reuse_ratio': round(1 - s['new_connections'] / s['requests'], 3),
+                    'errors': int(s['errors']),
+                    'mean_latency': round(s['total_latency'] / s['requests'], 4),
+                    'max_latency': round(s['max_latency'], 4)
+                }
+                for host, s in self._hosts.items()
+            }
+
+
+http_metrics = HttpClientMetrics()
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transport applying the per-host timeouts and recording http_metrics"""
+    def __init__(self, transport: httpx.AsyncBaseTransport, metrics: HttpClientMetrics, host_timeouts: dict[str, float] = {}):
+        self.transport = transport
+        self.metrics = metrics
+        self.host_timeouts = host_timeouts
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host in self.host_timeouts:
+            request.extensions['timeout'] = httpx.Timeout(self.host_timeouts[host], connect=transfer_settings.connect_timeout).as_dict()
+
+        # httpcore reports the connection setup through the trace extension
+        new_connection = False
+        outer_trace = request.extensions.get('trace')
+
+        async def trace(event_name: str, info: dict):
+            nonlocal new_connection
+            if event_name == 'connection.connect_tcp.complete':
+                new_connection = True
+            if outer_trace is not None:
+                await outer_trace(event_name, info)
+        request.extensions['trace'] = trace
+
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            self.metrics.record(host, time.perf_counter() - start, new_connection, error=True)
+            raise
+        # latency until the response headers arrived
+        self.metrics.record(host, time.perf_counter() - start, new_connection, error=response.status_code >= 500)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create a pooled, instrumented client using the TransferSettings"""
+    http2 = transfer_settings.http2 and H2_LOADED
+    limits = httpx.Limits(
+        max_connections=transfer_settings.max_connections,
+        max_keepalive_connections=transfer_settings.max_keepalive_connections,
+        keepalive_expiry=transfer_settings.keepalive_expiry
+    )
+    transport = InstrumentedTransport(
+        httpx.AsyncHTTPTransport(http2=http2, limits=limits),
+        http_metrics,
+        host_timeouts=transfer_settings.host_timeouts
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(transfer_settings.timeout, connect=transfer_settings.connect_timeout)
+    )
+
+
+# clients are bound to the event loop they were used in, job workers run their own loops
+_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled client of the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = create_http_client()
+        _clients[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the pooled client of the running event loop"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def iter_file_with_progress(file_path: str | Path, progress: Callable[[int, int], None] | None = None, chunk_size: int = None) -> AsyncIterator[bytes]:
+    """
+    Read a file chunk by chunk without blocking the event loop. progress is called as
+    progress(bytes_sent, total_bytes), at most every TransferSettings.progress_interval seconds.
+    """
+    chunk_size = chunk_size or transfer_settings.chunk_size
+    total = os.path.getsize(file_path)
+    sent = 0
+    last_report = 0.0
+
+    with open(file_path, 'rb') as f:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+            sent += len(chunk)
+            if progress is not None and (sent == total or time.monotonic() - last_report >= transfer_settings.progress_interval):
+                progress(sent, total)
+                last_report = time.monotonic()
+
+
+def _retry_delay(attempt: int, response: httpx.Response | None = None) -> float:
+    # respect the Retry-After of the upstream, if given in seconds
+    if response is not None:
+        retry_after = response.headers.get('retry-after', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), transfer_settings.max_backoff)
+    return min(transfer_settings.backoff * 2 ** attempt, transfer_settings.max_backoff)
+
+
+async def upload_file(
+    method: str,
+    url: str,
+    file_path: str | Path,
+    headers: dict = None,
+    progress: Callable[[int, int], None] | None = None,
+    client: httpx.AsyncClient | None = None,
+    timeout: float = None
+) -> httpx.Response:
+    """
+    Stream a file from disk as the request body. The upload is retried on connection
+    errors, timeouts and the status codes in RETRY_STATUS_CODES, every attempt re-reads
+    the file from the start. The last response is returned, if all attempts fail the
+    last error is raised.
+    """
+    client = client or get_http_client()
+    headers = {**(headers or {}), "Content-Length": str(os.path.getsize(file_path))}
+    timeout = timeout or transfer_settings.upload_timeout
+
+    for attempt in range(transfer_settings.retries + 1):
+        is_last = attempt == transfer_settings.retries
+        try:
+            response = await client.request(
+                method,
+                url,
+                content=iter_file_with_progress(file_path, progress),
+                headers=headers,
+                timeout=timeout
+            )
+        except httpx.TransportError as e:
+            if is_last:
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"Upload to {url} failed ({e.__class__.__name__}), retrying in {delay:.0f}s")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or is_last:
+                return response
+            delay = _retry_delay(attempt, response)
+            logger.warning(f"Upload to {url} returned {response.status_code}, retrying in {delay:.0f}s")
+
+        await asyncio.sleep(delay)
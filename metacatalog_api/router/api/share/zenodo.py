@@ -1,18 +1,19 @@
-import io
 import json
-import zipfile
-from pathlib import Path
+import os
+import tempfile
+from typing import Iterator
 
 import httpx
 from fastapi import Request, HTTPException
-from fastapi.templating import Jinja2Templates
-from jinja2 import TemplateError
+from starlette.concurrency import run_in_threadpool
 
 from metacatalog_api import core, models
-from metacatalog_api.router.api.share import share_router
-
-
-templates = Jinja2Templates(directory=Path(__file__).parent / 'templates')
+from metacatalog_api.jobs import register_job, JobContext
+from metacatalog_api.rate_limit import rate_limit
+from metacatalog_api.server import server
+from metacatalog_api.router.api.export import render_export
+from metacatalog_api.router.api.share import share_router, write_package_data, ZipStream, write_to_file
+from metacatalog_api.router.api.share.transfer import get_http_client, close_http_client, upload_file
 
 
 def map_license_to_zenodo(license: models.License | None) -> str | None:
@@ -174,13 +175,15 @@ def convert_entry_to_zenodo_metadata(entry: models.Metadata) -> dict:
     return {"metadata": metadata}
 
 
-def create_zenodo_package(request: Request, entry_id: int) -> tuple[io.BytesIO, str]:
+def create_zenodo_package(base_url: str, entry_id: int) -> tuple[str, str]:
     """
     Create a Zenodo-specific package with README.md, metacatalog.json, 
     metadata exports, and data files.
+    The ZIP archive is streamed into a temporary file, thus memory usage does not
+    depend on the size of the data.
     
     Returns:
-        tuple: (zip_buffer, filename) where zip_buffer is a BytesIO object
+        tuple: (temp_file_path, filename). Caller is responsible for cleanup.
     """
     # Get entry metadata
     entries = core.entries(ids=entry_id)
@@ -189,10 +192,9 @@ def create_zenodo_package(request: Request, entry_id: int) -> tuple[io.BytesIO,
     
     entry = entries[0]
     
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+    def generate() -> Iterator[bytes]:
+        archive = ZipStream()
+
         # 1. Generate and add README.md
         readme_content = f"# {entry.title}\n\n"
         
@@ -202,77 +204,45 @@ def create_zenodo_package(request: Request, entry_id: int) -> tuple[io.BytesIO,
         readme_content += "## About This Record\n\n"
         readme_content += "This record was automatically generated and uploaded by MetaCatalog API.\n\n"
         
-        # Generate backlink URL from request
-        base_url = f"{request.url.scheme}://{request.url.netloc}"
+        # Generate backlink URL
         entry_url = f"{base_url}/entries/{entry_id}"
         readme_content += f"[View this entry in MetaCatalog]({entry_url})\n"
         
-        zip_file.writestr("README.md", readme_content)
+        yield from archive.writestr("README.md", readme_content)
         
         # 2. Add metacatalog.json to root
         entry_dict = entry.model_dump(mode='json')
-        zip_file.writestr(
+        yield from archive.writestr(
             "metacatalog.json",
             json.dumps(entry_dict, indent=2, default=str)
         )
         
         # 3. Add metadata exports to metadata/ folder
-        # Add datacite.xml
-        try:
-            datacite_content = templates.get_template("datacite.xml").render(entry=entry)
-            zip_file.writestr("metadata/datacite.xml", datacite_content)
-        except TemplateError:
-            # Skip if template fails, but continue
-            pass
-        
-        # Add dublincore.xml
-        try:
-            dublincore_content = templates.get_template("dublincore.xml").render(entry=entry)
-            zip_file.writestr("metadata/dublincore.xml", dublincore_content)
-        except TemplateError:
-            # Skip if template fails, but continue
-            pass
+        for format_name in ('datacite', 'dublincore'):
+            try:
+                content, _ = render_export(entry, format_name)
+            except HTTPException:
+                # Skip if rendering fails, but continue
+                continue
+            yield from archive.writestr(f"metadata/{format_name}.xml", content)
         
         # 4. Add data files to data/ folder
-        data_info = core.get_entry_data_file(entry_id)
-        
-        if data_info['error']:
-            # Create error manifest
-            manifest = {
-                "type": "error",
-                "error": data_info['error'],
-                "description": "Data file could not be included in package"
-            }
-            zip_file.writestr("data/manifest.json", json.dumps(manifest, indent=2))
-        elif data_info['is_stream']:
+        yield from write_package_data(archive, entry_id, entry)
 
-            csv_content = "".join(data_info['stream_generator']())
-            zip_file.writestr(f"data/{data_info['filename']}", csv_content)
-        elif data_info['file_path']:
-            # File-based datasource - add file to ZIP
-            zip_file.write(str(data_info['file_path']), f"data/{data_info['filename']}")
-        else:
-            # External or unsupported - create manifest
-            if entry.datasource:
-                if entry.datasource.type.name == "external":
-                    manifest = {
-                        "type": "external",
-                        "url": entry.datasource.path,
-                        "description": "External datasource - data not included in package"
-                    }
-                else:
-                    manifest = {
-                        "type": entry.datasource.type.name if entry.datasource.type else "unknown",
-                        "path": entry.datasource.path,
-                        "status": "unsupported",
-                        "description": f"Datasource type '{entry.datasource.type.name if entry.datasource.type else 'unknown'}' is not supported for packaging"
-                    }
-                zip_file.writestr("data/manifest.json", json.dumps(manifest, indent=2))
-    
-    zip_buffer.seek(0)
+        yield from archive.close()
+    
+    # Create temporary ZIP file on disk
+    temp_fd, temp_path = tempfile.mkstemp(suffix='.zip', prefix='zenodo_upload_')
+    os.close(temp_fd)
+    try:
+        write_to_file(generate(), temp_path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    
     filename = f"entry_{entry_id}_package.zip"
     
-    return zip_buffer, filename
+    return temp_path, filename
 
 
 @share_router.get('/share/zenodo/form')
@@ -326,7 +296,7 @@ def get_zenodo_form(entry_id: int, request: Request):
     }
 
 
-@share_router.post('/share/zenodo/submit')
+@share_router.post('/share/zenodo/submit', dependencies=[rate_limit('share', per='ip')])
 async def submit_zenodo(entry_id: int, request: Request):
     """
     Submit Zenodo upload request
@@ -360,6 +330,52 @@ async def submit_zenodo(entry_id: int, request: Request):
             detail=f"Entry is missing required fields for Zenodo upload: {', '.join(missing_fields)}"
         )
     
+    # the upload runs in a job worker, the token is removed from the job once it is done
+    job = core.enqueue_job('share.zenodo', {
+        'entry_id': entry_id,
+        'zenodo_token': zenodo_token,
+        'use_sandbox': use_sandbox,
+        'base_url': f"{request.url.scheme}://{request.url.netloc}"
+    })
+
+    return {
+        "success": True,
+        "message": "The upload to Zenodo has been queued. Check the status link for the Zenodo deposition links.",
+        "job_id": job.id,
+        "links": {
+            "Status": f"{server.uri_prefix}jobs/{job.id}"
+        }
+    }
+
+
+@register_job('share.zenodo', secrets=['zenodo_token'], max_attempts=1)
+async def run_zenodo_upload(payload: dict, context: JobContext) -> dict:
+    """Job handler uploading an entry to Zenodo"""
+    entries = core.entries(ids=payload['entry_id'])
+    if len(entries) == 0:
+        raise HTTPException(status_code=404, detail=f"Entry of <ID={payload['entry_id']}> not found")
+
+    try:
+        return await upload_entry_to_zenodo(
+            entries[0],
+            payload['zenodo_token'],
+            use_sandbox=payload.get('use_sandbox', True),
+            base_url=payload['base_url'],
+            context=context
+        )
+    finally:
+        # the job runs in its own event loop, which ends with the job
+        await close_http_client()
+
+
+async def upload_entry_to_zenodo(entry: models.Metadata, zenodo_token: str, use_sandbox: bool, base_url: str, context: JobContext | None = None, client: httpx.AsyncClient | None = None) -> dict:
+    """
+    Package an entry and upload it as a new draft deposition to Zenodo.
+    Returns the response for the client including the links of the deposition.
+    """
+    entry_id = entry.id
+    progress = context.progress if context is not None else (lambda *args: None)
+
     # Determine Zenodo base URL
     if use_sandbox:
         zenodo_base_url = "https://sandbox.zenodo.org/api"
@@ -372,125 +388,125 @@ async def submit_zenodo(entry_id: int, request: Request):
         "Content-Type": "application/json"
     }
     
-    # Create Zenodo-specific package
-    zip_buffer, zip_filename = create_zenodo_package(request, entry_id)
-    zip_data = zip_buffer.read()
-    zip_buffer.close()
+    # Create Zenodo-specific package in a temporary file
+    progress(0.1, "Building package")
+    temp_file_path, zip_filename = await run_in_threadpool(create_zenodo_package, base_url, entry_id)
     
     try:
         # Step 1: Create empty deposition
-        async with httpx.AsyncClient() as client:
-            create_response = await client.post(
-                f"{zenodo_base_url}/deposit/depositions",
-                json={},
-                headers=headers,
-                timeout=30.0
-            )
-            
-            if create_response.status_code not in [200, 201]:
-                error_detail = create_response.text
-                try:
-                    error_json = create_response.json()
-                    error_detail = error_json.get('message', error_json.get('status', error_detail))
-                    # Log full error response for debugging
-                    if error_json:
-                        error_detail = f"{error_detail} (Full response: {error_json})"
-                except (json.JSONDecodeError, ValueError):
-                    # Response is not JSON, use text as-is
-                    pass
-                
-                # Provide helpful error messages for common issues
-                if create_response.status_code == 401:
-                    error_detail = "Invalid or expired Zenodo access token. Please check your token and try again."
-                elif create_response.status_code == 403:
-                    error_detail = f"Permission denied. Please ensure: (1) Your token is for the correct environment (sandbox vs production), (2) The token has 'deposit:write' scope, and (3) The token is valid. Error: {error_detail}"
-                
-                raise HTTPException(
-                    status_code=create_response.status_code,
-                    detail=f"Failed to create Zenodo deposition: {error_detail}"
-                )
-            
-            deposition = create_response.json()
-            bucket_url = deposition["links"]["bucket"]
-            deposition_id = deposition["id"]
+        client = client or get_http_client()
+        create_response = await client.post(
+            f"{zenodo_base_url}/deposit/depositions",
+            json={},
+            headers=headers,
+            timeout=30.0
+        )
+        
+        if create_response.status_code not in [200, 201]:
+            error_detail = create_response.text
+            try:
+                error_json = create_response.json()
+                error_detail = error_json.get('message', error_json.get('status', error_detail))
+                # Log full error response for debugging
+                if error_json:
+                    error_detail = f"{error_detail} (Full response: {error_json})"
+            except (json.JSONDecodeError, ValueError):
+                # Response is not JSON, use text as-is
+                pass
             
-            # Step 2: Upload file to bucket
-            upload_headers = {
-                "Authorization": f"Bearer {zenodo_token}"
-            }
+            # Provide helpful error messages for common issues
+            if create_response.status_code == 401:
+                error_detail = "Invalid or expired Zenodo access token. Please check your token and try again."
+            elif create_response.status_code == 403:
+                error_detail = f"Permission denied. Please ensure: (1) Your token is for the correct environment (sandbox vs production), (2) The token has 'deposit:write' scope, and (3) The token is valid. Error: {error_detail}"
             
-            upload_response = await client.put(
-                f"{bucket_url}/{zip_filename}",
-                content=zip_data,
-                headers=upload_headers,
-                timeout=60.0
+            raise HTTPException(
+                status_code=create_response.status_code,
+                detail=f"Failed to create Zenodo deposition: {error_detail}"
             )
-            
-            if upload_response.status_code not in [200, 201]:
-                error_detail = upload_response.text
-                try:
-                    error_json = upload_response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    # Response is not JSON, use text as-is
-                    pass
-                raise HTTPException(
-                    status_code=upload_response.status_code,
-                    detail=f"Failed to upload file to Zenodo: {error_detail}"
-                )
-            
-            # Step 3: Add metadata
-            zenodo_metadata = convert_entry_to_zenodo_metadata(entry)
-            
-            metadata_response = await client.put(
-                f"{zenodo_base_url}/deposit/depositions/{deposition_id}",
-                json=zenodo_metadata,
-                headers=headers,
-                timeout=30.0
+        
+        deposition = create_response.json()
+        bucket_url = deposition["links"]["bucket"]
+        deposition_id = deposition["id"]
+        
+        # Step 2: Upload file to bucket
+        progress(0.5, "Uploading package")
+        # stream the package from disk, transient failures are retried
+        upload_response = await upload_file(
+            "PUT",
+            f"{bucket_url}/{zip_filename}",
+            temp_file_path,
+            headers={"Authorization": f"Bearer {zenodo_token}"},
+            progress=lambda sent, total: progress(0.5 + 0.4 * sent / total, f"Uploaded {sent // 1024 ** 2} of {total // 1024 ** 2} MB"),
+            client=client
+        )
+        
+        if upload_response.status_code not in [200, 201]:
+            error_detail = upload_response.text
+            try:
+                error_json = upload_response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                # Response is not JSON, use text as-is
+                pass
+            raise HTTPException(
+                status_code=upload_response.status_code,
+                detail=f"Failed to upload file to Zenodo: {error_detail}"
             )
-            
-            if metadata_response.status_code not in [200, 201]:
-                error_detail = metadata_response.text
-                try:
-                    error_json = metadata_response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except (json.JSONDecodeError, ValueError):
-                    # Response is not JSON, use text as-is
-                    pass
-                raise HTTPException(
-                    status_code=metadata_response.status_code,
-                    detail=f"Failed to update Zenodo metadata: {error_detail}"
-                )
-            
-            # Get updated deposition
-            final_deposition = metadata_response.json()
-            
-            # Extract pre-reserved DOI (if available)
-            prereserved_doi = None
-            metadata = final_deposition.get("metadata", {})
-            if "prereserve_doi" in metadata:
-                prereserved_doi = metadata["prereserve_doi"].get("doi")
-            
-            # Step 4: Return response with structured fields
-            zenodo_links = final_deposition.get("links", {})
-            response = {
-                "success": True,
-                "message": "Entry successfully uploaded to Zenodo.",
-                "warning": "The entry is in draft mode. Use the publish link below to make it public and activate the DOI.",
-                "links": {
-                    "View": zenodo_links.get("html"),
-                    "Edit": zenodo_links.get("edit"),
-                    "Publish": zenodo_links.get("publish"),
-                }
+        
+        # Step 3: Add metadata
+        progress(0.9, "Updating metadata")
+        zenodo_metadata = convert_entry_to_zenodo_metadata(entry)
+        
+        metadata_response = await client.put(
+            f"{zenodo_base_url}/deposit/depositions/{deposition_id}",
+            json=zenodo_metadata,
+            headers=headers,
+            timeout=30.0
+        )
+        
+        if metadata_response.status_code not in [200, 201]:
+            error_detail = metadata_response.text
+            try:
+                error_json = metadata_response.json()
+                error_detail = error_json.get('message', error_detail)
+            except (json.JSONDecodeError, ValueError):
+                # Response is not JSON, use text as-is
+                pass
+            raise HTTPException(
+                status_code=metadata_response.status_code,
+                detail=f"Failed to update Zenodo metadata: {error_detail}"
+            )
+        
+        # Get updated deposition
+        final_deposition = metadata_response.json()
+        
+        # Extract pre-reserved DOI (if available)
+        prereserved_doi = None
+        metadata = final_deposition.get("metadata", {})
+        if "prereserve_doi" in metadata:
+            prereserved_doi = metadata["prereserve_doi"].get("doi")
+        
+        # Step 4: Return response with structured fields
+        zenodo_links = final_deposition.get("links", {})
+        response = {
+            "success": True,
+            "message": "Entry successfully uploaded to Zenodo.",
+            "warning": "The entry is in draft mode. Use the publish link below to make it public and activate the DOI.",
+            "links": {
+                "View": zenodo_links.get("html"),
+                "Edit": zenodo_links.get("edit"),
+                "Publish": zenodo_links.get("publish"),
             }
-            
-            # Add pre-reserved DOI if available
-            if prereserved_doi:
-                response["prereserved_doi"] = prereserved_doi
-                response["message"] = f"Entry successfully uploaded to Zenodo. Pre-reserved DOI: {prereserved_doi} (will be activated upon publishing)."
-            
-            return response
-            
+        }
+        
+        # Add pre-reserved DOI if available
+        if prereserved_doi:
+            response["prereserved_doi"] = prereserved_doi
+            response["message"] = f"Entry successfully uploaded to Zenodo. Pre-reserved DOI: {prereserved_doi} (will be activated upon publishing)."
+        
+        return response
+        
     except HTTPException:
         raise
     except httpx.HTTPError as e:
@@ -503,3 +519,7 @@ async def submit_zenodo(entry_id: int, request: Request):
             status_code=500,
             detail=f"Unexpected error during Zenodo upload: {e!s}"
         ) from e
+    finally:
+        # Clean up temporary ZIP file
+        if os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
@@ -0,0 +1,367 @@
+from typing import Iterable, Iterator
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from datetime import datetime
+import io
+import os
+import mimetypes
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+try:
+    import zstandard
+    ZSTANDARD_LOADED = True
+except ImportError:
+    ZSTANDARD_LOADED = False
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# size of the deflate window, used to prime each parallel block with the end of the previous one
+DEFLATE_WINDOW = 32 * 1024
+
+
+class CompressionPolicy(BaseSettings):
+    """
+    Decides per file how package members are compressed. Data formats that are
+    compressed already are stored as they are. For all other files a quick zlib
+    check on a sample decides, if compressing is worth the CPU time. Large
+    members are deflated in parallel blocks on multiple cores.
+    """
+    model_config = SettingsConfigDict(env_prefix="METACATALOG_PACKAGE_")
+
+    compression_level: int = 6
+    zstd_level: int = 3
+    store_mimetypes: list[str] = [
+        'application/zip', 'application/gzip', 'application/x-gzip', 'application/x-bzip2',
+        'application/x-xz', 'application/zstd', 'application/x-7z-compressed', 'application/x-rar-compressed',
+        'application/x-netcdf', 'application/x-hdf5', 'application/vnd.apache.parquet',
+        'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'video/mp4', 'audio/mpeg',
+    ]
+    store_extensions: list[str] = [
+        '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.nc', '.nc4', '.h5', '.hdf5', '.he5',
+        '.parquet', '.feather', '.arrow', '.zarr', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.jp2', '.mp4', '.mp3',
+    ]
+    entropy_sample_size: int = 64 * 1024
+    # store the member, if the sample compresses to more than this fraction of its size
+    entropy_min_ratio: float = 0.95
+    parallel_workers: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    parallel_threshold: int = 16 * 1024 * 1024
+    parallel_block_size: int = CHUNK_SIZE
+
+    def is_compressed_format(self, arcname: str) -> bool:
+        suffix = Path(arcname).suffix.lower()
+        if suffix in self.store_extensions:
+            return True
+        mime, encoding = mimetypes.guess_type(arcname)
+        return encoding is not None or mime in self.store_mimetypes
+
+    def looks_incompressible(self, sample: bytes) -> bool:
+        if len(sample) < 512:
+            return False
+        return len(zlib.compress(sample[:self.entropy_sample_size], 1)) >= self.entropy_min_ratio * min(len(sample), self.entropy_sample_size)
+
+    def should_store(self, arcname: str, sample: bytes) -> bool:
+        return self.is_compressed_format(arcname) or self.looks_incompressible(sample)
+
+
+package_policy = CompressionPolicy()
+
+_deflate_executor: ThreadPoolExecutor | None = None
+_deflate_executor_lock = threading.Lock()
+
+
+def _get_deflate_executor(workers: int) -> ThreadPoolExecutor:
+    global _deflate_executor
+    with _deflate_executor_lock:
+        if _deflate_executor is None:
+            _deflate_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='deflate')
+    return _deflate_executor
+
+
+def _deflate_block(data: bytes, level: int, zdict: bytes | None, last: bool) -> bytes:
+    # raw deflate, as zipfile expects it. zlib releases the GIL, so blocks run in parallel
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelDeflater:
+    """
+    Drop-in replacement for the zlib compressor used by zipfile, which deflates
+    fixed-size blocks on a thread pool. Every block but the last ends with a
+    Z_SYNC_FLUSH and is primed with the last 32 KiB of the previous block, so the
+    concatenated output is a single valid deflate stream with nearly the same ratio.
+    """
+    def __init__(self, level: int, executor: ThreadPoolExecutor, block_size: int = CHUNK_SIZE, max_pending: int = 8):
+        self.level = level
+        self.block_size = block_size
+        self.max_pending = max_pending
+        self._executor = executor
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._zdict: bytes | None = None
+
+    def _submit(self, block: bytes, last: bool) -> None:
+        self._pending.append(self._executor.submit(_deflate_block, block, self.level, self._zdict, last))
+        self._zdict = block[-DEFLATE_WINDOW:]
+
+    def compress(self, data) -> bytes:
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block, last=False)
+
+        # hand out finished blocks in order and wait, if too many blocks are in flight
+        out = []
+        while self._pending and (self._pending[0].done() or len(self._pending) > self.max_pending):
+            out.append(self._pending.popleft().result())
+        return b''.join(out)
+
+    def flush(self) -> bytes:
+        self._submit(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        out = b''.join(future.result() for future in self._pending)
+        self._pending.clear()
+        return out
+
+
+class _ChunkSink:
+    """
+    Write-only, non-seekable file object collecting the bytes written by zipfile.
+    As it has no tell() and seek(), zipfile writes data descriptors after each
+    member instead of seeking back to patch the local headers.
+    """
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _peek(chunks: Iterable[str | bytes], size: int, encoding: str) -> tuple[bytes, Iterator[bytes]]:
+    """Read at least size bytes from an iterable and return them with an iterator over all chunks"""
+    iterator = iter(chunks)
+    head = []
+    head_size = 0
+    for chunk in iterator:
+        chunk = chunk.encode(encoding) if isinstance(chunk, str) else chunk
+        head.append(chunk)
+        head_size += len(chunk)
+        if head_size >= size:
+            break
+
+    def rest() -> Iterator[bytes]:
+        yield from head
+        for chunk in iterator:
+            yield chunk.encode(encoding) if isinstance(chunk, str) else chunk
+
+    return b''.join(head), rest()
+
+
+class ZipStream:
+    """
+    Build a ZIP archive incrementally. All write methods are generators, that yield
+    the bytes of the archive as soon as at least chunk_size bytes are available. Thus,
+    the archive can be sent to a response or written to a file while it is built and
+    only about chunk_size bytes are held in memory, independent of the archive size.
+    The CompressionPolicy decides for each member, if it is stored or deflated.
+
+    Usage::
+
+        archive = ZipStream()
+        yield from archive.writestr('README.md', readme)
+        yield from archive.write_file(path, 'data/data.nc')
+        yield from archive.close()
+    """
+    extension = '.zip'
+    media_type = 'application/zip'
+
+    def __init__(self, policy: CompressionPolicy | None = None, chunk_size: int = CHUNK_SIZE):
+        self.policy = policy if policy is not None else package_policy
+        self.chunk_size = chunk_size
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=self.policy.compression_level)
+
+    def _zipinfo(self, arcname: str, store: bool, path: Path | None = None) -> zipfile.ZipInfo:
+        if path is not None:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        else:
+            zinfo = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+            zinfo.external_attr = 0o644 << 16
+        zinfo.compress_type = zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED
+        zinfo._compresslevel = None if store else self.policy.compression_level
+        return zinfo
+
+    def _open(self, zinfo: zipfile.ZipInfo, parallel: bool, force_zip64: bool = False):
+        dest = self._zip.open(zinfo, mode='w', force_zip64=force_zip64)
+        # swap the single-threaded compressor of zipfile for the parallel one
+        if parallel and zinfo.compress_type == zipfile.ZIP_DEFLATED and self.policy.parallel_workers > 1 and hasattr(dest, '_compressor'):
+            dest._compressor = ParallelDeflater(
+                level=self.policy.compression_level,
+                executor=_get_deflate_executor(self.policy.parallel_workers),
+                block_size=self.policy.parallel_block_size,
+                max_pending=2 * self.policy.parallel_workers
+            )
+        return dest
+
+    def _drain(self, force: bool = False) -> Iterator[bytes]:
+        if self._sink.size >= self.chunk_size or (force and self._sink.size > 0):
+            yield self._sink.drain()
+
+    def writestr(self, arcname: str, data: str | bytes) -> Iterator[bytes]:
+        """Add a member from a string or bytes"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        store = self.policy.should_store(arcname, data[:self.policy.entropy_sample_size])
+        self._zip.writestr(self._zipinfo(arcname, store), data)
+        yield from self._drain(force=True)
+
+    def write_file(self, path: str | Path, arcname: str) -> Iterator[bytes]:
+        """Add a file from disk, reading it chunk by chunk"""
+        path = Path(path)
+        with open(path, 'rb') as src:
+            store = self.policy.is_compressed_format(arcname) or self.policy.looks_incompressible(src.read(self.policy.entropy_sample_size))
+            src.seek(0)
+
+            zinfo = self._zipinfo(arcname, store, path=path)
+            with self._open(zinfo, parallel=zinfo.file_size >= self.policy.parallel_threshold) as dest:
+                while chunk := src.read(self.chunk_size):
+                    dest.write(chunk)
+                    yield from self._drain()
+        yield from self._drain(force=True)
+
+    def write_iter(self, arcname: str, chunks: Iterable[str | bytes], encoding: str = 'utf-8') -> Iterator[bytes]:
+        """Add a member of unknown size from an iterable of strings or bytes"""
+        sample, chunks = _peek(chunks, self.policy.entropy_sample_size, encoding)
+        store = self.policy.should_store(arcname, sample)
+
+        # the size is not known upfront, thus ZIP64 is always enabled and large members are expected
+        with self._open(self._zipinfo(arcname, store), parallel=True, force_zip64=True) as dest:
+            for chunk in chunks:
+                dest.write(chunk)
+                yield from self._drain()
+        yield from self._drain(force=True)
+
+    def close(self) -> Iterator[bytes]:
+        """Write the central directory and yield the remaining bytes"""
+        self._zip.close()
+        yield from self._drain(force=True)
+
+
+class TarZstStream:
+    """
+    Build a zstd compressed tar archive incrementally, with the same interface as ZipStream.
+    The whole archive is compressed as one zstd stream using all cores. Needs the
+    optional zstandard package.
+    """
+    extension = '.tar.zst'
+    media_type = 'application/zstd'
+
+    def __init__(self, policy: CompressionPolicy | None = None, chunk_size: int = CHUNK_SIZE):
+        if not ZSTANDARD_LOADED:
+            raise RuntimeError("The tar.zst package format needs the zstandard package. Run `pip install zstandard`.")
+        self.policy = policy if policy is not None else package_policy
+        self.chunk_size = chunk_size
+        self._sink = _ChunkSink()
+        compressor = zstandard.ZstdCompressor(level=self.policy.zstd_level, threads=-1 if self.policy.parallel_workers > 1 else 0)
+        self._zstd = compressor.stream_writer(self._sink, closefd=False)
+        self._tar = tarfile.open(fileobj=self._zstd, mode='w|', format=tarfile.PAX_FORMAT)
+
+    def _drain(self, force: bool = False) -> Iterator[bytes]:
+        if self._sink.size >= self.chunk_size or (force and self._sink.size > 0):
+            yield self._sink.drain()
+
+    def _add(self, tarinfo: tarfile.TarInfo, src) -> Iterator[bytes]:
+        # same as TarFile.addfile, but yields the compressed bytes while the data is copied
+        header = tarinfo.tobuf(self._tar.format, self._tar.encoding, self._tar.errors)
+        self._tar.fileobj.write(header)
+        self._tar.offset += len(header)
+
+        while chunk := src.read(self.chunk_size):
+            self._tar.fileobj.write(chunk)
+            yield from self._drain()
+
+        blocks, remainder = divmod(tarinfo.size, tarfile.BLOCKSIZE)
+        if remainder > 0:
+            self._tar.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+            blocks += 1
+        self._tar.offset += blocks * tarfile.BLOCKSIZE
+        self._tar.members.append(tarinfo)
+        yield from self._drain()
+
+    def writestr(self, arcname: str, data: str | bytes) -> Iterator[bytes]:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        tarinfo = tarfile.TarInfo(arcname)
+        tarinfo.size = len(data)
+        tarinfo.mtime = int(time.time())
+        tarinfo.mode = 0o644
+        yield from self._add(tarinfo, io.BytesIO(data))
+
+    def write_file(self, path: str | Path, arcname: str) -> Iterator[bytes]:
+        tarinfo = self._tar.gettarinfo(str(path), arcname)
+        with open(path, 'rb') as src:
+            yield from self._add(tarinfo, src)
+
+    def write_iter(self, arcname: str, chunks: Iterable[str | bytes], encoding: str = 'utf-8') -> Iterator[bytes]:
+        # tar headers need the size upfront, thus the member is spooled to disk first
+        with tempfile.SpooledTemporaryFile(max_size=8 * self.chunk_size) as spool:
+            for chunk in chunks:
+                spool.write(chunk.encode(encoding) if isinstance(chunk, str) else chunk)
+            tarinfo = tarfile.TarInfo(arcname)
+            tarinfo.size = spool.tell()
+            tarinfo.mtime = int(time.time())
+            tarinfo.mode = 0o644
+            spool.seek(0)
+            yield from self._add(tarinfo, spool)
+
+    def close(self) -> Iterator[bytes]:
+        self._tar.close()
+        self._zstd.close()
+        yield from self._drain(force=True)
+
+
+# available package formats by name
+PACKAGE_FORMATS: dict[str, type[ZipStream] | type[TarZstStream]] = {'zip': ZipStream}
+if ZSTANDARD_LOADED:
+    PACKAGE_FORMATS['tar.zst'] = TarZstStream
+
+
+def open_package(package_format: str = 'zip', policy: CompressionPolicy | None = None) -> ZipStream | TarZstStream:
+    if package_format not in PACKAGE_FORMATS:
+        raise ValueError(f"Package format '{package_format}' is not available. Available formats: {', '.join(PACKAGE_FORMATS)}")
+    return PACKAGE_FORMATS[package_format](policy=policy)
+
+
+def write_to_file(chunks: Iterable[bytes], path: str | Path) -> int:
+    """Write a chunked archive to a file and return the number of bytes written"""
+    size = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    return size
@@ -1,14 +1,19 @@
 from contextlib import asynccontextmanager
+import asyncio
+import threading
 import logging
 
 from fastapi import FastAPI, Request
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
 from metacatalog_api import core
 from metacatalog_api import __version__
 from metacatalog_api.db import DB_VERSION
 from metacatalog_api import access_control
+from metacatalog_api import jobs
+from metacatalog_api.change_stream import change_broadcaster
 
 
 class Server(BaseSettings):
@@ -36,6 +41,23 @@ class Server(BaseSettings):
     radar_contract_id: str | None = None
     radar_workspace_id: str | None = None
 
+    # OAI-PMH provider
+    oai_repository_name: str = "MetaCatalog"
+    oai_admin_email: str = "admin@example.com"
+    oai_page_size: int = 100
+
+    # background job workers started with the server, set to 0 to run them via the CLI only
+    job_workers: int = 1
+    job_poll_interval: float = 2.0
+
+    # seconds valid and invalid API tokens are cached, revoked tokens stay valid up to token_cache_ttl
+    token_cache_ttl: float = 60
+    token_cache_negative_ttl: float = 10
+
+    # the change stream reads the change feed on notifications, but at least every change_poll_interval seconds
+    change_poll_interval: float = 5.0
+    change_keepalive: float = 15.0
+
     @property
     def uri_prefix(self):
         if self.root_path.startswith('/'):
@@ -98,6 +120,14 @@ async def lifespan(app: FastAPI):
                 else:
                     raise ValueError(f"Database version mismatch. Expected version {core.db.DB_VERSION}. Please run database migrations to update your schema.")
 
+    # configure the API token cache
+    access_control.token_cache.ttl = server.token_cache_ttl
+    access_control.token_cache.negative_ttl = server.token_cache_negative_ttl
+
+    # configure the live change stream, it starts listening with the first subscriber
+    change_broadcaster.poll_interval = server.change_poll_interval
+    change_broadcaster.keepalive = server.change_keepalive
+
     # Handle admin token setup
     with core.connect() as session:
         if access_control.is_development_mode(server):
@@ -108,10 +138,33 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.warning(f"Admin token setup failed: {e}")
 
+    # load the lookup tables and keep their change counters fresh, requests never wait for them
+    await run_in_threadpool(core.warm_lookup_cache)
+    lookup_cache_task = asyncio.create_task(core.lookup_cache.keep_fresh())
+
+    # start the background job workers
+    stop_workers = threading.Event()
+    workers = []
+    if server.job_workers > 0:
+        jobs.load_job_handlers()
+        workers = jobs.start_workers(server.job_workers, stop_workers, poll_interval=server.job_poll_interval)
+        logger.info(f"Started {len(workers)} job worker(s)")
+
+    # one pooled client for all outbound calls to share providers
+    # Import here to avoid circular imports
+    from metacatalog_api.router.api.share.transfer import get_http_client, close_http_client
+    app.state.http_client = get_http_client()
+
     # now we yield the application
     yield
 
     # here we can app tear down code - i.e. a log message
+    stop_workers.set()
+    for worker in workers:
+        worker.join(timeout=10)
+    await close_http_client()
+    await change_broadcaster.stop()
+    lookup_cache_task.cancel()
 
 # build the base app
 app = FastAPI(lifespan=lifespan) 
@@ -0,0 +1,343 @@
+-- set based import of the entries copied into import_entries
+-- every line is checked first, lines with errors are skipped by all following statements
+ANALYZE import_entries;
+
+-- VALIDATION
+-- values the INSERTs below cast are checked up front, a failing cast would abort the whole import
+-- timestamps and numbers are matched by patterns, only GeoJSON needs to be parsed, which traps
+-- the error in a subtransaction per value, thus it is only called for the geometry columns
+CREATE OR REPLACE FUNCTION pg_temp.import_is_geojson(geojson text) RETURNS boolean LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM ST_GeomFromGeoJSON(geojson);
+    RETURN true;
+EXCEPTION WHEN OTHERS THEN
+    RETURN false;
+END;
+$$;
+
+INSERT INTO import_errors (line_no, error)
+SELECT e.line_no, 'An entry with the title ''' || t.title || ''' already exists'
+FROM import_entries e JOIN {schema}.entries t ON t.title = e.doc->>'title'
+UNION ALL
+SELECT d.line_no, 'The title ''' || d.title || ''' is used on line ' || d.first_line || ' already'
+FROM (
+    SELECT line_no, doc->>'title' AS title, min(line_no) OVER (PARTITION BY doc->>'title') AS first_line FROM import_entries
+) d
+WHERE d.line_no > d.first_line
+UNION ALL
+SELECT e.line_no, 'The title is longer than 512 characters'
+FROM import_entries e WHERE length(e.doc->>'title') > 512
+UNION ALL
+SELECT e.line_no, 'Variable with id ' || (e.doc->>'variable') || ' not found'
+FROM import_entries e
+WHERE NOT EXISTS (SELECT 1 FROM {schema}.variables v WHERE v.id = (e.doc->>'variable')::integer)
+UNION ALL
+SELECT e.line_no, 'License with id ' || (e.doc->>'license') || ' not found'
+FROM import_entries e
+WHERE jsonb_typeof(e.doc->'license') = 'number'
+  AND NOT EXISTS (
+    SELECT 1 FROM {schema}.licenses l
+    WHERE l.id = CASE WHEN jsonb_typeof(e.doc->'license') = 'number' THEN (e.doc->>'license')::integer END
+  )
+UNION ALL
+SELECT e.line_no, 'Author with id ' || a.person::text || ' not found'
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(jsonb_build_array(e.doc->'author') || COALESCE(e.doc->'coAuthors', '[]'::jsonb)) AS a(person)
+WHERE jsonb_typeof(a.person) = 'number'
+  AND NOT EXISTS (
+    SELECT 1 FROM {schema}.persons x
+    WHERE x.id = CASE WHEN jsonb_typeof(a.person) = 'number' THEN a.person::text::integer END
+  )
+UNION ALL
+SELECT e.line_no, 'An author needs a last_name or an organisation_name'
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(jsonb_build_array(e.doc->'author') || COALESCE(e.doc->'coAuthors', '[]'::jsonb)) AS a(person)
+WHERE jsonb_typeof(a.person) = 'object'
+  AND a.person->>'last_name' IS NULL AND a.person->>'organisation_name' IS NULL
+UNION ALL
+SELECT e.line_no, 'Keyword with id ' || k.keyword_id || ' not found'
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements_text(e.doc->'keywords') AS k(keyword_id)
+WHERE NOT EXISTS (SELECT 1 FROM {schema}.keywords x WHERE x.id = k.keyword_id::integer)
+UNION ALL
+SELECT e.line_no, 'Datasource type with name or id ' || (e.doc->'datasource'->>'type') || ' was not found in the database'
+FROM import_entries e
+WHERE e.doc->'datasource' IS NOT NULL
+  AND NOT EXISTS (
+    SELECT 1 FROM {schema}.datasource_types t
+    WHERE t.name = e.doc->'datasource'->>'type' OR t.id::text = e.doc->'datasource'->>'type'
+  )
+UNION ALL
+SELECT e.line_no, 'Group with id ' || g.item::text || ' not found'
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(e.doc->'groups') AS g(item)
+WHERE jsonb_typeof(g.item) = 'number'
+  AND NOT EXISTS (
+    SELECT 1 FROM {schema}.entrygroups x
+    WHERE x.id = CASE WHEN jsonb_typeof(g.item) = 'number' THEN g.item::text::integer END
+  )
+UNION ALL
+SELECT e.line_no, 'The group type ' || (g.item->>'type') || ' is not valid'
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(e.doc->'groups') AS g(item)
+WHERE jsonb_typeof(g.item) = 'object'
+  AND NOT EXISTS (SELECT 1 FROM {schema}.entrygroup_types t WHERE lower(t.name) = lower(g.item->>'type'))
+UNION ALL
+SELECT e.line_no, 'The detail ''' || (d.detail->>'key') || ''' is given more than once'
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(e.doc->'details') AS d(detail)
+GROUP BY e.line_no, d.detail->>'key'
+HAVING count(*) > 1
+UNION ALL
+SELECT e.line_no, 'Thesaurus with id ' || (d.detail->>'thesaurus') || ' not found'
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(e.doc->'details') AS d(detail)
+WHERE d.detail->>'thesaurus' IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM {schema}.thesaurus t WHERE t.id::text = d.detail->>'thesaurus')
+UNION ALL
+SELECT e.line_no, 'The location is not a valid GeoJSON geometry'
+FROM import_entries e
+WHERE e.doc->>'location' IS NOT NULL AND NOT pg_temp.import_is_geojson(e.doc->>'location')
+UNION ALL
+SELECT e.line_no, 'The extent of the spatial scale is not a valid GeoJSON geometry'
+FROM import_entries e
+WHERE e.doc->'datasource'->'spatial_scale'->>'extent' IS NOT NULL
+  AND NOT pg_temp.import_is_geojson(e.doc->'datasource'->'spatial_scale'->>'extent')
+UNION ALL
+SELECT e.line_no, 'The value ''' || v.value || ''' of ' || v.field || ' is not a valid ' || v.target
+FROM import_entries e
+CROSS JOIN LATERAL (VALUES
+    ('embargo_end', e.doc->>'embargo_end', 'timestamp'),
+    ('publication', e.doc->>'publication', 'timestamp'),
+    ('lastUpdate', e.doc->>'lastUpdate', 'timestamp'),
+    ('temporal_scale.observation_start', e.doc->'datasource'->'temporal_scale'->>'observation_start', 'timestamp'),
+    ('temporal_scale.observation_end', e.doc->'datasource'->'temporal_scale'->>'observation_end', 'timestamp'),
+    ('temporal_scale.support', e.doc->'datasource'->'temporal_scale'->>'support', 'numeric'),
+    ('spatial_scale.resolution', e.doc->'datasource'->'spatial_scale'->>'resolution', 'integer'),
+    ('spatial_scale.support', e.doc->'datasource'->'spatial_scale'->>'support', 'numeric')
+) AS v(field, value, target)
+WHERE v.value IS NOT NULL AND NOT CASE v.target
+    -- ISO 8601 as written by the EntryCreate validation
+    WHEN 'timestamp' THEN v.value ~ '^[0-9][0-9][0-9][0-9]-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])([T ]([01][0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9](\.[0-9]+)?)?)?(Z|[+-][0-9][0-9](:?[0-9][0-9])?)?$'
+    WHEN 'numeric' THEN v.value ~ '^[+-]?([0-9]+(\.[0-9]*)?|\.[0-9]+)([eE][+-]?[0-9]+)?$'
+    ELSE CASE WHEN v.value ~ '^[+-]?[0-9]+$' THEN v.value::numeric BETWEEN -2147483648 AND 2147483647 ELSE false END
+END;
+
+UPDATE import_entries e SET error = x.error
+FROM (SELECT line_no, string_agg(error, '; ') AS error FROM import_errors GROUP BY line_no) x
+WHERE x.line_no = e.line_no;
+
+
+-- LICENSES
+-- licenses given inline are created once, existing short titles are reused
+INSERT INTO {schema}.licenses (short_title, title, summary, full_text, link, by_attribution, share_alike, commercial_use)
+SELECT DISTINCT ON (l.license->>'short_title')
+    l.license->>'short_title',
+    l.license->>'title',
+    l.license->>'summary',
+    l.license->>'full_text',
+    l.license->>'link',
+    COALESCE((l.license->>'by_attribution')::boolean, false),
+    COALESCE((l.license->>'share_alike')::boolean, false),
+    COALESCE((l.license->>'commercial_use')::boolean, false)
+FROM (SELECT line_no, doc->'license' AS license FROM import_entries WHERE error IS NULL) l
+WHERE jsonb_typeof(l.license) = 'object'
+  AND (l.license->>'full_text' IS NOT NULL OR l.license->>'link' IS NOT NULL)
+ORDER BY l.license->>'short_title', l.line_no
+ON CONFLICT DO NOTHING;
+
+UPDATE import_entries e SET license_id = CASE
+    WHEN jsonb_typeof(e.doc->'license') = 'number' THEN (e.doc->>'license')::integer
+    ELSE (SELECT l.id FROM {schema}.licenses l WHERE l.short_title = e.doc->'license'->>'short_title')
+END
+WHERE e.error IS NULL;
+
+UPDATE import_entries SET error = 'The license ''' || (doc->'license'->>'short_title') || ''' could not be created, it needs a full_text or link and a unique title'
+WHERE error IS NULL AND license_id IS NULL;
+
+
+-- GROUPS
+INSERT INTO {schema}.entrygroups (uuid, type_id, title, description, publication, "lastUpdate")
+SELECT DISTINCT ON (g.item->>'title')
+    md5(random()::text || clock_timestamp()::text)::uuid::text,
+    t.id,
+    g.item->>'title',
+    g.item->>'description',
+    now(),
+    now()
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(e.doc->'groups') AS g(item)
+JOIN {schema}.entrygroup_types t ON lower(t.name) = lower(g.item->>'type')
+WHERE e.error IS NULL
+  AND jsonb_typeof(g.item) = 'object'
+  AND NOT EXISTS (SELECT 1 FROM {schema}.entrygroups x WHERE x.title = g.item->>'title')
+ORDER BY g.item->>'title', e.line_no;
+
+
+-- PERSONS
+-- the author has position 0, co-authors follow in the order given
+-- person_key uses the same matches as create_or_get_author: ORCID, person name or organisation name
+CREATE TEMPORARY TABLE import_persons ON COMMIT DROP AS
+SELECT
+    e.line_no,
+    a.position - 1 AS position,
+    a.person,
+    CASE
+        WHEN jsonb_typeof(a.person) = 'number' THEN NULL
+        WHEN a.person->>'orcid' IS NOT NULL THEN jsonb_build_array('orcid', lower(a.person->>'orcid'))
+        WHEN COALESCE((a.person->>'is_organisation')::boolean, false) THEN jsonb_build_array('organisation', a.person->>'organisation_name', a.person->>'organisation_abbrev')
+        ELSE jsonb_build_array('person', a.person->>'first_name', a.person->>'last_name')
+    END AS person_key,
+    CASE WHEN jsonb_typeof(a.person) = 'number' THEN a.person::text::integer END AS person_id
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(jsonb_build_array(e.doc->'author') || COALESCE(e.doc->'coAuthors', '[]'::jsonb)) WITH ORDINALITY AS a(person, position)
+WHERE e.error IS NULL;
+
+CREATE TEMPORARY VIEW import_person_keys AS
+SELECT min(id) AS id, jsonb_build_array('orcid', lower(orcid)) AS person_key
+FROM {schema}.persons WHERE orcid IS NOT NULL GROUP BY 2
+UNION ALL
+SELECT min(id), jsonb_build_array('person', first_name, last_name)
+FROM {schema}.persons WHERE NOT COALESCE(is_organisation, false) GROUP BY 2
+UNION ALL
+SELECT min(id), jsonb_build_array('organisation', organisation_name, organisation_abbrev)
+FROM {schema}.persons WHERE is_organisation GROUP BY 2;
+
+UPDATE import_persons ip SET person_id = k.id
+FROM import_person_keys k
+WHERE ip.person_id IS NULL AND ip.person_key = k.person_key;
+
+INSERT INTO {schema}.persons (uuid, is_organisation, first_name, last_name, organisation_name, organisation_abbrev, affiliation, attribution, orcid)
+SELECT DISTINCT ON (person_key)
+    md5(random()::text || clock_timestamp()::text)::uuid::text,
+    COALESCE((person->>'is_organisation')::boolean, false),
+    person->>'first_name',
+    person->>'last_name',
+    person->>'organisation_name',
+    person->>'organisation_abbrev',
+    person->>'affiliation',
+    person->>'attribution',
+    person->>'orcid'
+FROM import_persons
+WHERE person_id IS NULL
+ORDER BY person_key, line_no, position;
+
+UPDATE import_persons ip SET person_id = k.id
+FROM import_person_keys k
+WHERE ip.person_id IS NULL AND ip.person_key = k.person_key;
+
+DROP VIEW import_person_keys;
+
+
+-- IDS
+-- the ids are drawn from the sequences up front, thus the rows of all tables can be linked without lookups
+UPDATE import_entries SET
+    entry_id = nextval(pg_get_serial_sequence('{schema}.entries', 'id')),
+    datasource_id = CASE WHEN doc->'datasource' IS NOT NULL THEN nextval(pg_get_serial_sequence('{schema}.datasources', 'id')) END,
+    temporal_scale_id = CASE WHEN doc->'datasource'->'temporal_scale' IS NOT NULL THEN nextval(pg_get_serial_sequence('{schema}.temporal_scales', 'id')) END,
+    spatial_scale_id = CASE WHEN doc->'datasource'->'spatial_scale' IS NOT NULL THEN nextval(pg_get_serial_sequence('{schema}.spatial_scales', 'id')) END
+WHERE error IS NULL;
+
+
+-- DATASOURCES
+INSERT INTO {schema}.temporal_scales (id, resolution, observation_start, observation_end, support, dimension_names)
+SELECT
+    e.temporal_scale_id,
+    s.scale->>'resolution',
+    (s.scale->>'observation_start')::timestamp,
+    (s.scale->>'observation_end')::timestamp,
+    (s.scale->>'support')::numeric,
+    ARRAY(SELECT jsonb_array_elements_text(s.scale->'dimension_names'))
+FROM import_entries e
+CROSS JOIN LATERAL (SELECT e.doc->'datasource'->'temporal_scale' AS scale) s
+WHERE e.temporal_scale_id IS NOT NULL;
+
+INSERT INTO {schema}.spatial_scales (id, resolution, extent, support, dimension_names)
+SELECT
+    e.spatial_scale_id,
+    (s.scale->>'resolution')::integer,
+    ST_SetSRID(ST_GeomFromGeoJSON(s.scale->>'extent'), 4326),
+    (s.scale->>'support')::numeric,
+    ARRAY(SELECT jsonb_array_elements_text(s.scale->'dimension_names'))
+FROM import_entries e
+CROSS JOIN LATERAL (SELECT e.doc->'datasource'->'spatial_scale' AS scale) s
+WHERE e.spatial_scale_id IS NOT NULL;
+
+INSERT INTO {schema}.datasources (id, type_id, encoding, path, variable_names, args, temporal_scale_id, spatial_scale_id, creation, "lastUpdate")
+SELECT
+    e.datasource_id,
+    t.id,
+    COALESCE(d.ds->>'encoding', 'utf-8'),
+    d.ds->>'path',
+    ARRAY(SELECT jsonb_array_elements_text(d.ds->'variable_names')),
+    COALESCE(d.ds->'args', jsonb_build_object()),
+    e.temporal_scale_id,
+    e.spatial_scale_id,
+    now(),
+    now()
+FROM import_entries e
+CROSS JOIN LATERAL (SELECT e.doc->'datasource' AS ds) d
+JOIN {schema}.datasource_types t ON t.name = d.ds->>'type' OR t.id::text = d.ds->>'type'
+WHERE e.datasource_id IS NOT NULL;
+
+
+-- ENTRIES
+INSERT INTO {schema}.entries (id, uuid, title, abstract, external_id, location, author_id, version, is_partial, comment, citation, license_id, variable_id, datasource_id, embargo, embargo_end, publication, "lastUpdate")
+SELECT
+    e.entry_id,
+    e.uuid,
+    e.doc->>'title',
+    e.doc->>'abstract',
+    e.doc->>'external_id',
+    ST_SetSRID(ST_GeomFromGeoJSON(e.doc->>'location'), 4326),
+    a.person_id,
+    COALESCE((e.doc->>'version')::integer, 1),
+    COALESCE((e.doc->>'is_partial')::boolean, false),
+    e.doc->>'comment',
+    e.doc->>'citation',
+    e.license_id,
+    (e.doc->>'variable')::integer,
+    e.datasource_id,
+    COALESCE((e.doc->>'embargo')::boolean, false),
+    (e.doc->>'embargo_end')::timestamp,
+    COALESCE((e.doc->>'publication')::timestamp, now()),
+    COALESCE((e.doc->>'lastUpdate')::timestamp, now())
+FROM import_entries e
+JOIN import_persons a ON a.line_no = e.line_no AND a.position = 0
+WHERE e.error IS NULL;
+
+INSERT INTO {schema}.details (entry_id, key, stem, title, raw_value, description, thesaurus_id)
+SELECT
+    e.entry_id,
+    d.detail->>'key',
+    d.detail->>'stem',
+    d.detail->>'title',
+    COALESCE(d.detail->'raw_value', jsonb_build_object()),
+    d.detail->>'description',
+    (d.detail->>'thesaurus')::integer
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(e.doc->'details') AS d(detail)
+WHERE e.error IS NULL;
+
+-- a co-author listed twice is linked once, at the first position
+INSERT INTO {schema}.nm_persons_entries (person_id, entry_id, relationship_type_id, "order")
+SELECT DISTINCT ON (e.entry_id, p.person_id) p.person_id, e.entry_id, 13, p.position
+FROM import_persons p
+JOIN import_entries e ON e.line_no = p.line_no
+WHERE p.position > 0 AND e.error IS NULL
+ORDER BY e.entry_id, p.person_id, p.position;
+
+INSERT INTO {schema}.nm_keywords_entries (keyword_id, entry_id)
+SELECT DISTINCT k.keyword_id::integer, e.entry_id
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements_text(e.doc->'keywords') AS k(keyword_id)
+WHERE e.error IS NULL;
+
+INSERT INTO {schema}.nm_entrygroups (entry_id, group_id)
+SELECT DISTINCT e.entry_id, CASE
+    WHEN jsonb_typeof(g.item) = 'number' THEN g.item::text::integer
+    ELSE (SELECT min(x.id) FROM {schema}.entrygroups x WHERE x.title = g.item->>'title')
+END
+FROM import_entries e
+CROSS JOIN LATERAL jsonb_array_elements(e.doc->'groups') AS g(item)
+WHERE e.error IS NULL;
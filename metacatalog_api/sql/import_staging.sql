@@ -0,0 +1,19 @@
+-- staging tables of the bulk importer, temporary tables are not WAL logged and are dropped with the transaction
+CREATE TEMPORARY TABLE import_entries
+(
+    line_no integer NOT NULL PRIMARY KEY,
+    uuid character varying(36) NOT NULL,
+    doc jsonb NOT NULL,
+    error text,
+    entry_id integer,
+    license_id integer,
+    datasource_id integer,
+    temporal_scale_id integer,
+    spatial_scale_id integer
+) ON COMMIT DROP;
+
+CREATE TEMPORARY TABLE import_errors
+(
+    line_no integer NOT NULL,
+    error text NOT NULL
+) ON COMMIT DROP;
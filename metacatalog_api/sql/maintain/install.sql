@@ -368,6 +368,8 @@ CREATE TABLE IF NOT EXISTS {schema}.entries
 
 ALTER SEQUENCE entries_id_seq OWNED BY entries.id;
 
+CREATE INDEX IF NOT EXISTS entries_lastupdate_id_idx ON {schema}.entries ("lastUpdate", id);
+
 -- DETAILS
 CREATE SEQUENCE IF NOT EXISTS public.details_id_seq
     INCREMENT 1
@@ -515,3 +517,229 @@ CREATE TABLE IF NOT EXISTS user_access_tokens (
         FOREIGN KEY (user_id) REFERENCES persons (id) 
         ON UPDATE CASCADE ON DELETE CASCADE
 );
+
+-- durable job queue for background work like share submissions and long exports
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    uuid CHARACTER VARYING (36) NOT NULL UNIQUE,
+    kind CHARACTER VARYING (128) NOT NULL,
+    status CHARACTER VARYING (16) NOT NULL DEFAULT 'queued',
+    payload JSONB NOT NULL DEFAULT jsonb_build_object(),
+    result JSONB,
+    error TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    progress_message TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+    locked_by CHARACTER VARYING (255),
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- workers only ever look for due, queued jobs
+CREATE INDEX IF NOT EXISTS jobs_queued_idx ON jobs (run_after, id) WHERE status = 'queued';
+
+-- token buckets of the rate limiter, shared by all workers if METACATALOG_RATE_LIMIT_STORE=sql
+-- the buckets refill on their own, thus the table does not need to survive a crash
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+    key CHARACTER VARYING (255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    granted BOOLEAN NOT NULL DEFAULT true,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- change log of the entries for incremental synchronisation, written by statement level triggers
+-- txid orders the changes by transaction, readers only consume transactions that are not running anymore
+CREATE TABLE IF NOT EXISTS entry_changes (
+    id BIGSERIAL PRIMARY KEY,
+    txid BIGINT NOT NULL DEFAULT txid_current(),
+    entry_id INTEGER NOT NULL,
+    operation CHARACTER VARYING (8) NOT NULL,
+    source CHARACTER VARYING (64) NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS entry_changes_feed_idx ON entry_changes (txid, id);
+
+-- TG_ARGV[0] is the entry id of a changed row, TG_ARGV[1] an optional join to find it
+CREATE OR REPLACE FUNCTION log_entry_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    operation TEXT := 'updated';
+    transition TEXT := 'new_rows';
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        transition := 'old_rows';
+    END IF;
+    IF TG_TABLE_NAME = 'entries' THEN
+        operation := CASE TG_OP WHEN 'INSERT' THEN 'created' WHEN 'DELETE' THEN 'deleted' ELSE 'updated' END;
+    END IF;
+
+    EXECUTE 'INSERT INTO entry_changes (entry_id, operation, source) SELECT DISTINCT ' || TG_ARGV[0]
+        || ', ' || quote_literal(operation) || ', ' || quote_literal(TG_TABLE_NAME)
+        || ' FROM ' || transition || ' t ' || COALESCE(TG_ARGV[1], '')
+        || ' WHERE ' || TG_ARGV[0] || ' IS NOT NULL';
+
+    -- wake up the change stream listeners, identical notifications of a transaction are sent once
+    PERFORM pg_notify('entry_changes', txid_current()::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS entries_changes_insert ON {schema}.entries;
+DROP TRIGGER IF EXISTS entries_changes_update ON {schema}.entries;
+DROP TRIGGER IF EXISTS entries_changes_delete ON {schema}.entries;
+CREATE TRIGGER entries_changes_insert AFTER INSERT ON {schema}.entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.id');
+CREATE TRIGGER entries_changes_update AFTER UPDATE ON {schema}.entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.id');
+CREATE TRIGGER entries_changes_delete AFTER DELETE ON {schema}.entries REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.id');
+
+DROP TRIGGER IF EXISTS details_changes_insert ON {schema}.details;
+DROP TRIGGER IF EXISTS details_changes_update ON {schema}.details;
+DROP TRIGGER IF EXISTS details_changes_delete ON {schema}.details;
+CREATE TRIGGER details_changes_insert AFTER INSERT ON {schema}.details REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER details_changes_update AFTER UPDATE ON {schema}.details REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER details_changes_delete AFTER DELETE ON {schema}.details REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+
+DROP TRIGGER IF EXISTS datasources_changes_insert ON {schema}.datasources;
+DROP TRIGGER IF EXISTS datasources_changes_update ON {schema}.datasources;
+DROP TRIGGER IF EXISTS datasources_changes_delete ON {schema}.datasources;
+CREATE TRIGGER datasources_changes_insert AFTER INSERT ON {schema}.datasources REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('e.id', 'JOIN {schema}.entries e ON e.datasource_id = t.id');
+CREATE TRIGGER datasources_changes_update AFTER UPDATE ON {schema}.datasources REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('e.id', 'JOIN {schema}.entries e ON e.datasource_id = t.id');
+CREATE TRIGGER datasources_changes_delete AFTER DELETE ON {schema}.datasources REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('e.id', 'JOIN {schema}.entries e ON e.datasource_id = t.id');
+
+DROP TRIGGER IF EXISTS nm_keywords_entries_changes_insert ON {schema}.nm_keywords_entries;
+DROP TRIGGER IF EXISTS nm_keywords_entries_changes_update ON {schema}.nm_keywords_entries;
+DROP TRIGGER IF EXISTS nm_keywords_entries_changes_delete ON {schema}.nm_keywords_entries;
+CREATE TRIGGER nm_keywords_entries_changes_insert AFTER INSERT ON {schema}.nm_keywords_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_keywords_entries_changes_update AFTER UPDATE ON {schema}.nm_keywords_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_keywords_entries_changes_delete AFTER DELETE ON {schema}.nm_keywords_entries REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+
+DROP TRIGGER IF EXISTS nm_persons_entries_changes_insert ON {schema}.nm_persons_entries;
+DROP TRIGGER IF EXISTS nm_persons_entries_changes_update ON {schema}.nm_persons_entries;
+DROP TRIGGER IF EXISTS nm_persons_entries_changes_delete ON {schema}.nm_persons_entries;
+CREATE TRIGGER nm_persons_entries_changes_insert AFTER INSERT ON {schema}.nm_persons_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_persons_entries_changes_update AFTER UPDATE ON {schema}.nm_persons_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_persons_entries_changes_delete AFTER DELETE ON {schema}.nm_persons_entries REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+
+DROP TRIGGER IF EXISTS nm_entrygroups_changes_insert ON {schema}.nm_entrygroups;
+DROP TRIGGER IF EXISTS nm_entrygroups_changes_update ON {schema}.nm_entrygroups;
+DROP TRIGGER IF EXISTS nm_entrygroups_changes_delete ON {schema}.nm_entrygroups;
+CREATE TRIGGER nm_entrygroups_changes_insert AFTER INSERT ON {schema}.nm_entrygroups REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_entrygroups_changes_update AFTER UPDATE ON {schema}.nm_entrygroups REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_entrygroups_changes_delete AFTER DELETE ON {schema}.nm_entrygroups REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+
+-- partial index of the latest versions, the default for listing and searching entries
+CREATE INDEX IF NOT EXISTS entries_latest_idx ON {schema}.entries (id) WHERE latest_version_id IS NULL;
+
+-- partial index of the older versions, to list the history of an entry
+CREATE INDEX IF NOT EXISTS entries_versions_idx ON {schema}.entries (latest_version_id, version) WHERE latest_version_id IS NOT NULL;
+
+-- responses of requests with an Idempotency-Key, a NULL status_code marks a request that is still running
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key CHARACTER VARYING (64) PRIMARY KEY,
+    request_hash CHARACTER VARYING (64) NOT NULL,
+    status_code INTEGER,
+    headers JSONB,
+    body BYTEA,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- index to purge the expired keys
+CREATE INDEX IF NOT EXISTS idempotency_keys_expires_idx ON idempotency_keys (expires_at);
+
+-- change counter of the lookup tables, the ETags of the lookup routes are derived from it
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name CHARACTER VARYING (64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO table_versions AS v (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = v.version + 1, changed_at = now();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS licenses_table_version ON {schema}.licenses;
+CREATE TRIGGER licenses_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.licenses FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS variables_table_version ON {schema}.variables;
+CREATE TRIGGER variables_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.variables FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS units_table_version ON {schema}.units;
+CREATE TRIGGER units_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.units FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS keywords_table_version ON {schema}.keywords;
+CREATE TRIGGER keywords_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.keywords FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS thesaurus_table_version ON {schema}.thesaurus;
+CREATE TRIGGER thesaurus_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.thesaurus FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS entrygroup_types_table_version ON {schema}.entrygroup_types;
+CREATE TRIGGER entrygroup_types_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.entrygroup_types FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS datasource_types_table_version ON {schema}.datasource_types;
+CREATE TRIGGER datasource_types_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.datasource_types FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+-- shared tier of the response cache, with METACATALOG_RESPONSE_CACHE_BACKEND=sql
+-- the cache can be lost on a crash, thus the table is not WAL logged
+CREATE UNLOGGED TABLE IF NOT EXISTS response_cache (
+    key CHARACTER VARYING (64) PRIMARY KEY,
+    tags TEXT[] NOT NULL,
+    status_code INTEGER NOT NULL,
+    headers JSONB NOT NULL,
+    body BYTEA NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- invalidation looks up the responses by any of their tags
+CREATE INDEX IF NOT EXISTS response_cache_tags_idx ON response_cache USING GIN (tags);
+CREATE INDEX IF NOT EXISTS response_cache_expires_idx ON response_cache (expires_at);
+
+-- persons, licenses, variables, units and keywords are embedded in the metadata of the entries
+-- updating or deleting them bumps the lastUpdate of the referencing entries, new rows do not change any entry
+DROP TRIGGER IF EXISTS persons_table_version ON {schema}.persons;
+
+-- TG_ARGV[0] selects the referencing entries e of the ids in changed
+CREATE OR REPLACE FUNCTION touch_referencing_entries() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changed TEXT := 'SELECT id FROM old_rows';
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        -- rows updated to the values they had already do not change any metadata
+        changed := 'SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id WHERE n IS DISTINCT FROM o';
+    END IF;
+
+    EXECUTE 'WITH changed AS (' || changed || ') UPDATE {schema}.entries e SET "lastUpdate" = now() WHERE ' || TG_ARGV[0];
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS persons_touch_entries_update ON {schema}.persons;
+DROP TRIGGER IF EXISTS persons_touch_entries_delete ON {schema}.persons;
+CREATE TRIGGER persons_touch_entries_update AFTER UPDATE ON {schema}.persons REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.author_id IN (SELECT id FROM changed) OR e.id IN (SELECT p.entry_id FROM {schema}.nm_persons_entries p WHERE p.person_id IN (SELECT id FROM changed))');
+CREATE TRIGGER persons_touch_entries_delete AFTER DELETE ON {schema}.persons REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.author_id IN (SELECT id FROM changed) OR e.id IN (SELECT p.entry_id FROM {schema}.nm_persons_entries p WHERE p.person_id IN (SELECT id FROM changed))');
+
+DROP TRIGGER IF EXISTS licenses_touch_entries_update ON {schema}.licenses;
+DROP TRIGGER IF EXISTS licenses_touch_entries_delete ON {schema}.licenses;
+CREATE TRIGGER licenses_touch_entries_update AFTER UPDATE ON {schema}.licenses REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.license_id IN (SELECT id FROM changed)');
+CREATE TRIGGER licenses_touch_entries_delete AFTER DELETE ON {schema}.licenses REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.license_id IN (SELECT id FROM changed)');
+
+DROP TRIGGER IF EXISTS variables_touch_entries_update ON {schema}.variables;
+DROP TRIGGER IF EXISTS variables_touch_entries_delete ON {schema}.variables;
+CREATE TRIGGER variables_touch_entries_update AFTER UPDATE ON {schema}.variables REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT id FROM changed)');
+CREATE TRIGGER variables_touch_entries_delete AFTER DELETE ON {schema}.variables REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT id FROM changed)');
+
+DROP TRIGGER IF EXISTS units_touch_entries_update ON {schema}.units;
+DROP TRIGGER IF EXISTS units_touch_entries_delete ON {schema}.units;
+CREATE TRIGGER units_touch_entries_update AFTER UPDATE ON {schema}.units REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.unit_id IN (SELECT id FROM changed))');
+CREATE TRIGGER units_touch_entries_delete AFTER DELETE ON {schema}.units REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.unit_id IN (SELECT id FROM changed))');
+
+DROP TRIGGER IF EXISTS keywords_touch_entries_update ON {schema}.keywords;
+DROP TRIGGER IF EXISTS keywords_touch_entries_delete ON {schema}.keywords;
+CREATE TRIGGER keywords_touch_entries_update AFTER UPDATE ON {schema}.keywords REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.id IN (SELECT k.entry_id FROM {schema}.nm_keywords_entries k WHERE k.keyword_id IN (SELECT id FROM changed)) OR e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.keyword_id IN (SELECT id FROM changed))');
+CREATE TRIGGER keywords_touch_entries_delete AFTER DELETE ON {schema}.keywords REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.id IN (SELECT k.entry_id FROM {schema}.nm_keywords_entries k WHERE k.keyword_id IN (SELECT id FROM changed)) OR e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.keyword_id IN (SELECT id FROM changed))');
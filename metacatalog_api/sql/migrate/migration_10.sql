@@ -0,0 +1,23 @@
+-- notify the change stream listeners on every change of the entries
+CREATE OR REPLACE FUNCTION log_entry_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    operation TEXT := 'updated';
+    transition TEXT := 'new_rows';
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        transition := 'old_rows';
+    END IF;
+    IF TG_TABLE_NAME = 'entries' THEN
+        operation := CASE TG_OP WHEN 'INSERT' THEN 'created' WHEN 'DELETE' THEN 'deleted' ELSE 'updated' END;
+    END IF;
+
+    EXECUTE 'INSERT INTO entry_changes (entry_id, operation, source) SELECT DISTINCT ' || TG_ARGV[0]
+        || ', ' || quote_literal(operation) || ', ' || quote_literal(TG_TABLE_NAME)
+        || ' FROM ' || transition || ' t ' || COALESCE(TG_ARGV[1], '')
+        || ' WHERE ' || TG_ARGV[0] || ' IS NOT NULL';
+
+    -- wake up the change stream listeners, identical notifications of a transaction are sent once
+    PERFORM pg_notify('entry_changes', txid_current()::text);
+    RETURN NULL;
+END;
+$$;
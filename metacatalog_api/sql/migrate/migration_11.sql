@@ -0,0 +1,8 @@
+-- the latest version of an entry has no latest_version_id, older versions reference the latest version
+UPDATE {schema}.entries SET latest_version_id = NULL WHERE latest_version_id = id;
+
+-- partial index of the latest versions, the default for listing and searching entries
+CREATE INDEX IF NOT EXISTS entries_latest_idx ON {schema}.entries (id) WHERE latest_version_id IS NULL;
+
+-- partial index of the older versions, to list the history of an entry
+CREATE INDEX IF NOT EXISTS entries_versions_idx ON {schema}.entries (latest_version_id, version) WHERE latest_version_id IS NOT NULL;
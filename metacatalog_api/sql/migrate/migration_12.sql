@@ -0,0 +1,13 @@
+-- responses of requests with an Idempotency-Key, a NULL status_code marks a request that is still running
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key CHARACTER VARYING (64) PRIMARY KEY,
+    request_hash CHARACTER VARYING (64) NOT NULL,
+    status_code INTEGER,
+    headers JSONB,
+    body BYTEA,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- index to purge the expired keys
+CREATE INDEX IF NOT EXISTS idempotency_keys_expires_idx ON idempotency_keys (expires_at);
@@ -0,0 +1,35 @@
+-- change counter of the lookup tables, the ETags of the lookup routes are derived from it
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name CHARACTER VARYING (64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO table_versions AS v (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = v.version + 1, changed_at = now();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS licenses_table_version ON {schema}.licenses;
+CREATE TRIGGER licenses_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.licenses FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS variables_table_version ON {schema}.variables;
+CREATE TRIGGER variables_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.variables FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS units_table_version ON {schema}.units;
+CREATE TRIGGER units_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.units FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS keywords_table_version ON {schema}.keywords;
+CREATE TRIGGER keywords_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.keywords FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS thesaurus_table_version ON {schema}.thesaurus;
+CREATE TRIGGER thesaurus_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.thesaurus FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS entrygroup_types_table_version ON {schema}.entrygroup_types;
+CREATE TRIGGER entrygroup_types_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.entrygroup_types FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+
+DROP TRIGGER IF EXISTS datasource_types_table_version ON {schema}.datasource_types;
+CREATE TRIGGER datasource_types_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.datasource_types FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
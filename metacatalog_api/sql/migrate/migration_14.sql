@@ -0,0 +1,14 @@
+-- shared tier of the response cache, with METACATALOG_RESPONSE_CACHE_BACKEND=sql
+-- the cache can be lost on a crash, thus the table is not WAL logged
+CREATE UNLOGGED TABLE IF NOT EXISTS response_cache (
+    key CHARACTER VARYING (64) PRIMARY KEY,
+    tags TEXT[] NOT NULL,
+    status_code INTEGER NOT NULL,
+    headers JSONB NOT NULL,
+    body BYTEA NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- invalidation looks up the responses by any of their tags
+CREATE INDEX IF NOT EXISTS response_cache_tags_idx ON response_cache USING GIN (tags);
+CREATE INDEX IF NOT EXISTS response_cache_expires_idx ON response_cache (expires_at);
@@ -0,0 +1,3 @@
+-- persons are embedded in the metadata of the entries, their changes do not bump the lastUpdate of the entries
+DROP TRIGGER IF EXISTS persons_table_version ON {schema}.persons;
+CREATE TRIGGER persons_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {schema}.persons FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
@@ -0,0 +1,43 @@
+-- persons, licenses, variables, units and keywords are embedded in the metadata of the entries
+-- updating or deleting them bumps the lastUpdate of the referencing entries, new rows do not change any entry
+DROP TRIGGER IF EXISTS persons_table_version ON {schema}.persons;
+
+-- TG_ARGV[0] selects the referencing entries e of the ids in changed
+CREATE OR REPLACE FUNCTION touch_referencing_entries() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changed TEXT := 'SELECT id FROM old_rows';
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        -- rows updated to the values they had already do not change any metadata
+        changed := 'SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id WHERE n IS DISTINCT FROM o';
+    END IF;
+
+    EXECUTE 'WITH changed AS (' || changed || ') UPDATE {schema}.entries e SET "lastUpdate" = now() WHERE ' || TG_ARGV[0];
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS persons_touch_entries_update ON {schema}.persons;
+DROP TRIGGER IF EXISTS persons_touch_entries_delete ON {schema}.persons;
+CREATE TRIGGER persons_touch_entries_update AFTER UPDATE ON {schema}.persons REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.author_id IN (SELECT id FROM changed) OR e.id IN (SELECT p.entry_id FROM {schema}.nm_persons_entries p WHERE p.person_id IN (SELECT id FROM changed))');
+CREATE TRIGGER persons_touch_entries_delete AFTER DELETE ON {schema}.persons REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.author_id IN (SELECT id FROM changed) OR e.id IN (SELECT p.entry_id FROM {schema}.nm_persons_entries p WHERE p.person_id IN (SELECT id FROM changed))');
+
+DROP TRIGGER IF EXISTS licenses_touch_entries_update ON {schema}.licenses;
+DROP TRIGGER IF EXISTS licenses_touch_entries_delete ON {schema}.licenses;
+CREATE TRIGGER licenses_touch_entries_update AFTER UPDATE ON {schema}.licenses REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.license_id IN (SELECT id FROM changed)');
+CREATE TRIGGER licenses_touch_entries_delete AFTER DELETE ON {schema}.licenses REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.license_id IN (SELECT id FROM changed)');
+
+DROP TRIGGER IF EXISTS variables_touch_entries_update ON {schema}.variables;
+DROP TRIGGER IF EXISTS variables_touch_entries_delete ON {schema}.variables;
+CREATE TRIGGER variables_touch_entries_update AFTER UPDATE ON {schema}.variables REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT id FROM changed)');
+CREATE TRIGGER variables_touch_entries_delete AFTER DELETE ON {schema}.variables REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT id FROM changed)');
+
+DROP TRIGGER IF EXISTS units_touch_entries_update ON {schema}.units;
+DROP TRIGGER IF EXISTS units_touch_entries_delete ON {schema}.units;
+CREATE TRIGGER units_touch_entries_update AFTER UPDATE ON {schema}.units REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.unit_id IN (SELECT id FROM changed))');
+CREATE TRIGGER units_touch_entries_delete AFTER DELETE ON {schema}.units REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.unit_id IN (SELECT id FROM changed))');
+
+DROP TRIGGER IF EXISTS keywords_touch_entries_update ON {schema}.keywords;
+DROP TRIGGER IF EXISTS keywords_touch_entries_delete ON {schema}.keywords;
+CREATE TRIGGER keywords_touch_entries_update AFTER UPDATE ON {schema}.keywords REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.id IN (SELECT k.entry_id FROM {schema}.nm_keywords_entries k WHERE k.keyword_id IN (SELECT id FROM changed)) OR e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.keyword_id IN (SELECT id FROM changed))');
+CREATE TRIGGER keywords_touch_entries_delete AFTER DELETE ON {schema}.keywords REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE touch_referencing_entries('e.id IN (SELECT k.entry_id FROM {schema}.nm_keywords_entries k WHERE k.keyword_id IN (SELECT id FROM changed)) OR e.variable_id IN (SELECT v.id FROM {schema}.variables v WHERE v.keyword_id IN (SELECT id FROM changed))');
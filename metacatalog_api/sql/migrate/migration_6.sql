@@ -0,0 +1,5 @@
+-- Entries without lastUpdate fall back to their publication date, so that every entry has a datestamp for harvesting
+UPDATE {schema}.entries SET "lastUpdate" = COALESCE(publication, now()) WHERE "lastUpdate" IS NULL;
+
+-- keyset index for incremental harvesting ordered by (lastUpdate, id)
+CREATE INDEX IF NOT EXISTS entries_lastupdate_id_idx ON {schema}.entries ("lastUpdate", id);
@@ -0,0 +1,22 @@
+-- durable job queue for background work like share submissions and long exports
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    uuid CHARACTER VARYING (36) NOT NULL UNIQUE,
+    kind CHARACTER VARYING (128) NOT NULL,
+    status CHARACTER VARYING (16) NOT NULL DEFAULT 'queued',
+    payload JSONB NOT NULL DEFAULT jsonb_build_object(),
+    result JSONB,
+    error TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    progress_message TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+    locked_by CHARACTER VARYING (255),
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- workers only ever look for due, queued jobs
+CREATE INDEX IF NOT EXISTS jobs_queued_idx ON jobs (run_after, id) WHERE status = 'queued';
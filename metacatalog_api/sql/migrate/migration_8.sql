@@ -0,0 +1,8 @@
+-- token buckets of the rate limiter, shared by all workers if METACATALOG_RATE_LIMIT_STORE=sql
+-- the buckets refill on their own, thus the table does not need to survive a crash
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+    key CHARACTER VARYING (255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    granted BOOLEAN NOT NULL DEFAULT true,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,75 @@
+-- change log of the entries for incremental synchronisation, written by statement level triggers
+-- txid orders the changes by transaction, readers only consume transactions that are not running anymore
+CREATE TABLE IF NOT EXISTS entry_changes (
+    id BIGSERIAL PRIMARY KEY,
+    txid BIGINT NOT NULL DEFAULT txid_current(),
+    entry_id INTEGER NOT NULL,
+    operation CHARACTER VARYING (8) NOT NULL,
+    source CHARACTER VARYING (64) NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS entry_changes_feed_idx ON entry_changes (txid, id);
+
+-- TG_ARGV[0] is the entry id of a changed row, TG_ARGV[1] an optional join to find it
+CREATE OR REPLACE FUNCTION log_entry_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    operation TEXT := 'updated';
+    transition TEXT := 'new_rows';
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        transition := 'old_rows';
+    END IF;
+    IF TG_TABLE_NAME = 'entries' THEN
+        operation := CASE TG_OP WHEN 'INSERT' THEN 'created' WHEN 'DELETE' THEN 'deleted' ELSE 'updated' END;
+    END IF;
+
+    EXECUTE 'INSERT INTO entry_changes (entry_id, operation, source) SELECT DISTINCT ' || TG_ARGV[0]
+        || ', ' || quote_literal(operation) || ', ' || quote_literal(TG_TABLE_NAME)
+        || ' FROM ' || transition || ' t ' || COALESCE(TG_ARGV[1], '')
+        || ' WHERE ' || TG_ARGV[0] || ' IS NOT NULL';
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS entries_changes_insert ON {schema}.entries;
+DROP TRIGGER IF EXISTS entries_changes_update ON {schema}.entries;
+DROP TRIGGER IF EXISTS entries_changes_delete ON {schema}.entries;
+CREATE TRIGGER entries_changes_insert AFTER INSERT ON {schema}.entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.id');
+CREATE TRIGGER entries_changes_update AFTER UPDATE ON {schema}.entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.id');
+CREATE TRIGGER entries_changes_delete AFTER DELETE ON {schema}.entries REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.id');
+
+DROP TRIGGER IF EXISTS details_changes_insert ON {schema}.details;
+DROP TRIGGER IF EXISTS details_changes_update ON {schema}.details;
+DROP TRIGGER IF EXISTS details_changes_delete ON {schema}.details;
+CREATE TRIGGER details_changes_insert AFTER INSERT ON {schema}.details REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER details_changes_update AFTER UPDATE ON {schema}.details REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER details_changes_delete AFTER DELETE ON {schema}.details REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+
+DROP TRIGGER IF EXISTS datasources_changes_insert ON {schema}.datasources;
+DROP TRIGGER IF EXISTS datasources_changes_update ON {schema}.datasources;
+DROP TRIGGER IF EXISTS datasources_changes_delete ON {schema}.datasources;
+CREATE TRIGGER datasources_changes_insert AFTER INSERT ON {schema}.datasources REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('e.id', 'JOIN {schema}.entries e ON e.datasource_id = t.id');
+CREATE TRIGGER datasources_changes_update AFTER UPDATE ON {schema}.datasources REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('e.id', 'JOIN {schema}.entries e ON e.datasource_id = t.id');
+CREATE TRIGGER datasources_changes_delete AFTER DELETE ON {schema}.datasources REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('e.id', 'JOIN {schema}.entries e ON e.datasource_id = t.id');
+
+DROP TRIGGER IF EXISTS nm_keywords_entries_changes_insert ON {schema}.nm_keywords_entries;
+DROP TRIGGER IF EXISTS nm_keywords_entries_changes_update ON {schema}.nm_keywords_entries;
+DROP TRIGGER IF EXISTS nm_keywords_entries_changes_delete ON {schema}.nm_keywords_entries;
+CREATE TRIGGER nm_keywords_entries_changes_insert AFTER INSERT ON {schema}.nm_keywords_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_keywords_entries_changes_update AFTER UPDATE ON {schema}.nm_keywords_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_keywords_entries_changes_delete AFTER DELETE ON {schema}.nm_keywords_entries REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+
+DROP TRIGGER IF EXISTS nm_persons_entries_changes_insert ON {schema}.nm_persons_entries;
+DROP TRIGGER IF EXISTS nm_persons_entries_changes_update ON {schema}.nm_persons_entries;
+DROP TRIGGER IF EXISTS nm_persons_entries_changes_delete ON {schema}.nm_persons_entries;
+CREATE TRIGGER nm_persons_entries_changes_insert AFTER INSERT ON {schema}.nm_persons_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_persons_entries_changes_update AFTER UPDATE ON {schema}.nm_persons_entries REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_persons_entries_changes_delete AFTER DELETE ON {schema}.nm_persons_entries REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+
+DROP TRIGGER IF EXISTS nm_entrygroups_changes_insert ON {schema}.nm_entrygroups;
+DROP TRIGGER IF EXISTS nm_entrygroups_changes_update ON {schema}.nm_entrygroups;
+DROP TRIGGER IF EXISTS nm_entrygroups_changes_delete ON {schema}.nm_entrygroups;
+CREATE TRIGGER nm_entrygroups_changes_insert AFTER INSERT ON {schema}.nm_entrygroups REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_entrygroups_changes_update AFTER UPDATE ON {schema}.nm_entrygroups REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
+CREATE TRIGGER nm_entrygroups_changes_delete AFTER DELETE ON {schema}.nm_entrygroups REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE log_entry_changes('t.entry_id');
@@ -0,0 +1,4 @@
+import sys
+
+# the server settings parse the command line on import, which holds the arguments of pytest
+sys.argv = sys.argv[:1]
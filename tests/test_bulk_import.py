@@ -0,0 +1,55 @@
+import json
+import os
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from metacatalog_api import bulk_import, core, db
+
+
+# the bulk import runs set based SQL on PostGIS, it is only tested against a database
+TEST_URI = os.environ.get('METACATALOG_TEST_URI')
+
+
+@pytest.fixture
+def session():
+    if TEST_URI is None:
+        pytest.skip('METACATALOG_TEST_URI is not set')
+    try:
+        with core.connect(TEST_URI) as session:
+            if not db.check_installed(session):
+                db.install(session, populate_defaults=True)
+                session.commit()
+            yield session
+            session.rollback()
+    except OperationalError as e:
+        pytest.skip(f'database at METACATALOG_TEST_URI is not reachable: {e}')
+
+
+def entry(title: str, **kwargs) -> dict:
+    return {
+        'title': title,
+        'abstract': 'Imported by the bulk import test',
+        'license': 1,
+        'variable': 1,
+        'author': {'first_name': 'Ada', 'last_name': 'Importer'},
+        **kwargs
+    }
+
+
+def test_row_with_unknown_thesaurus_is_skipped(session, tmp_path):
+    run = uuid4().hex
+    path = tmp_path / 'entries.jsonl'
+    path.write_text('\n'.join(json.dumps(record) for record in [
+        entry(f'valid {run}', details=[{'key': 'station', 'raw_value': {'value': 'A'}}]),
+        entry(f'bad thesaurus {run}', details=[{'key': 'station', 'raw_value': {'value': 'B'}, 'thesaurus': 999999}]),
+    ]))
+
+    report = bulk_import.import_entries(session, path)
+
+    assert report.total == 2
+    assert report.imported == 1
+    assert report.failed == 1
+    assert report.errors[0].line == 2
+    assert 'Thesaurus with id 999999 not found' in report.errors[0].error
@@ -0,0 +1,24 @@
+from metacatalog_api.router.api.preview import SNIFF_BYTES, detect_analyzer, sniff_csv
+
+
+def test_small_csv_is_sniffed_as_csv(tmp_path):
+    path = tmp_path / 'small.csv'
+    path.write_text('a,b\n1,2\n')
+
+    assert sniff_csv(path.read_bytes())
+    assert detect_analyzer(path, 'upload.dat').name == 'csv'
+
+
+def test_last_line_of_a_truncated_head_is_ignored():
+    head = ('a,b\n' + '1,2\n' * SNIFF_BYTES).encode()[:SNIFF_BYTES - 1] + b'x'
+
+    assert len(head) == SNIFF_BYTES
+    assert sniff_csv(head)
+
+
+def test_extension_is_checked_before_the_text_sniffer(tmp_path):
+    path = tmp_path / 'notes.csv'
+    path.write_text('hello world\n')
+
+    assert detect_analyzer(path, 'notes.csv').name == 'csv'
+    assert detect_analyzer(path, 'notes').name == 'text'
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+from fastapi import Request
+
+from metacatalog_api import access_control
+from metacatalog_api.rate_limit import client_key
+
+
+def request(api_key: str | None = None) -> Request:
+    headers = [(b'x-api-key', api_key.encode())] if api_key is not None else []
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers, 'client': ('198.51.100.4', 1234)})
+
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    cache = access_control.TokenCache()
+    monkeypatch.setattr(access_control, 'token_cache', cache)
+    return cache
+
+
+def test_unknown_keys_share_the_bucket_of_the_client_address(token_cache):
+    assert client_key(request('random-1'), 'token') == 'ip:198.51.100.4'
+    assert client_key(request('random-2'), 'token') == 'ip:198.51.100.4'
+
+    # keys known to be invalid as well
+    token_cache.set(access_control.hash_token('random-1'), None)
+    assert client_key(request('random-1'), 'token') == 'ip:198.51.100.4'
+
+
+def test_validated_keys_get_their_own_bucket(token_cache):
+    token_hash = access_control.hash_token('valid')
+    token_cache.set(token_hash, access_control.UserToken(token_hash=token_hash, created_at=datetime.now()))
+
+    assert client_key(request('valid'), 'token') == f"token:{token_hash[:32]}"
+    assert client_key(request('valid'), 'ip') == 'ip:198.51.100.4'
+    assert client_key(request(), 'token') == 'ip:198.51.100.4'
@@ -0,0 +1,129 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from metacatalog_api import core
+from metacatalog_api.http_cache import make_etag, is_not_modified
+from metacatalog_api.response_cache import ResponseCacheMiddleware
+
+
+ETAG = make_etag('group', 1)
+
+
+def build_app(calls: list):
+    app = FastAPI()
+
+    def limited(request: Request):
+        # stands in for the rate_limit dependency of the read router
+        if request.headers.get('x-limited') is not None:
+            raise HTTPException(status_code=429, detail='Rate limit exceeded', headers={'Retry-After': '1'})
+
+    @app.get('/groups/{id}')
+    async def group(id: int, request: Request, response: Response):
+        # slow enough for the second request to arrive while the first is running
+        await asyncio.sleep(0.2)
+        limited(request)
+        if is_not_modified(request, ETAG):
+            raise HTTPException(status_code=304, headers={'ETag': ETAG})
+        calls.append(id)
+        response.headers['ETag'] = ETAG
+        return {'id': id, 'entries': [{'id': 1}]}
+
+    app.add_middleware(ResponseCacheMiddleware)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    # the memory backend is off by default, the tests run in one process
+    monkeypatch.setattr(core.response_cache, 'enabled', True)
+    core.response_cache.clear()
+    yield
+    core.response_cache.clear()
+
+
+async def leader_and_waiter(app: FastAPI, path: str, leader_headers: dict, waiter_headers: dict) -> tuple[httpx.Response, httpx.Response]:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        leader = asyncio.ensure_future(client.get(path, headers=leader_headers))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.ensure_future(client.get(path, headers=waiter_headers))
+        return await leader, await waiter
+
+
+def test_identical_requests_are_coalesced():
+    calls = []
+    app = build_app(calls)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            return await asyncio.gather(*[client.get('/groups/1') for _ in range(5)])
+
+    responses = asyncio.run(run())
+    assert calls == [1]
+    assert all(r.status_code == 200 and r.json()['id'] == 1 for r in responses)
+
+
+def test_waiter_without_validator_does_not_get_the_304_of_the_leader():
+    calls = []
+    leader, waiter = asyncio.run(leader_and_waiter(build_app(calls), '/groups/2', {'If-None-Match': ETAG}, {}))
+
+    assert leader.status_code == 304
+    assert waiter.status_code == 200
+    assert waiter.json() == {'id': 2, 'entries': [{'id': 1}]}
+
+
+def test_waiter_does_not_get_the_429_of_the_leader():
+    calls = []
+    leader, waiter = asyncio.run(leader_and_waiter(build_app(calls), '/groups/3', {'X-Limited': '1'}, {}))
+
+    assert leader.status_code == 429
+    assert waiter.status_code == 200
+    assert waiter.json()['id'] == 3
+
+
+def test_entry_is_invalidated_by_its_embedded_person():
+    calls = []
+    app = FastAPI()
+
+    @app.get('/entries/{id}')
+    async def entry(id: int):
+        calls.append(id)
+        return {'id': id, 'author': {'id': 7}, 'coAuthors': [{'id': 8}], 'license': {'id': 1}, 'variable': {'id': 2}}
+
+    app.add_middleware(ResponseCacheMiddleware)
+
+    async def get() -> httpx.Response:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            return await client.get('/entries/4')
+
+    assert asyncio.run(get()).headers['x-cache'] == 'MISS'
+    assert asyncio.run(get()).headers['x-cache'] == 'HIT'
+
+    core.response_cache.invalidate(['person:8'])
+    assert asyncio.run(get()).headers['x-cache'] == 'MISS'
+    assert calls == [4, 4]
+
+
+def test_cache_hits_take_a_token_of_the_rate_limit(monkeypatch):
+    from metacatalog_api import rate_limit
+    monkeypatch.setattr(rate_limit, 'memory_store', rate_limit.MemoryRateLimitStore())
+    monkeypatch.setattr(rate_limit.rate_limit_settings, 'read', rate_limit.RouteLimit(rate=0.001, burst=2, concurrency=20))
+
+    app = FastAPI()
+
+    @app.get('/entries/{id}')
+    async def entry(id: int):
+        # without the rate_limit dependency only the replayed responses take a token
+        return {'id': id}
+
+    app.add_middleware(ResponseCacheMiddleware)
+
+    async def run() -> list[httpx.Response]:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            return [await client.get('/entries/5') for _ in range(4)]
+
+    responses = asyncio.run(run())
+    assert [r.headers.get('x-cache') for r in responses[:3]] == ['MISS', 'HIT', 'HIT']
+    assert responses[3].status_code == 429
@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+import pytest
+
+from metacatalog_api.router.api.share import transfer
+from metacatalog_api.router.api.share.transfer import transfer_settings, upload_file
+
+
+class RecordingTransport(httpx.MockTransport):
+    """MockTransport recording the chunks of the request body as they are sent"""
+    def __init__(self, handler):
+        super().__init__(handler)
+        self.chunks: list[list[bytes]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        chunks = [chunk async for chunk in request.stream]
+        self.chunks.append(chunks)
+        request._content = b''.join(chunks)
+        return await super().handle_async_request(request)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(transfer_settings, 'retries', 3)
+    monkeypatch.setattr(transfer_settings, 'backoff', 0.0)
+    monkeypatch.setattr(transfer_settings, 'chunk_size', 4)
+
+
+@pytest.fixture
+def package(tmp_path):
+    path = tmp_path / 'package.zip'
+    path.write_bytes(b'0123456789abcdefghij')
+    return path
+
+
+def upload(transport: httpx.AsyncBaseTransport, path) -> httpx.Response:
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await upload_file('PUT', 'https://repository.test/files/package.zip', path, client=client)
+    return asyncio.run(run())
+
+
+def test_retries_on_server_errors_and_connection_errors(package):
+    responses = iter(['connect', 503, 502, 201])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        outcome = next(responses)
+        if outcome == 'connect':
+            raise httpx.ConnectError('connection refused', request=request)
+        assert request.content == b'0123456789abcdefghij'
+        return httpx.Response(outcome)
+
+    transport = RecordingTransport(handler)
+    response = upload(transport, package)
+
+    assert response.status_code == 201
+    # every attempt sends the whole file from the start
+    assert len(transport.chunks) == 4
+    assert all(b''.join(chunks) == b'0123456789abcdefghij' for chunks in transport.chunks)
+
+
+def test_gives_up_after_the_last_retry(package):
+    transport = RecordingTransport(lambda request: httpx.Response(503))
+    response = upload(transport, package)
+
+    assert response.status_code == 503
+    assert len(transport.chunks) == transfer_settings.retries + 1
+
+
+def test_client_errors_are_not_retried(package):
+    transport = RecordingTransport(lambda request: httpx.Response(400, json={'message': 'invalid'}))
+    response = upload(transport, package)
+
+    assert response.status_code == 400
+    assert len(transport.chunks) == 1
+
+
+def test_body_is_streamed_in_chunks(package):
+    transport = RecordingTransport(lambda request: httpx.Response(201))
+    upload(transport, package)
+
+    chunks = transport.chunks[0]
+    assert len(chunks) == 5
+    assert all(len(chunk) <= transfer_settings.chunk_size for chunk in chunks)
+
+
+def test_file_is_read_lazily(package, monkeypatch):
+    # the file is only read while the transport consumes the body
+    reads = []
+    read_chunk = transfer.iter_file_with_progress
+
+    async def recording_iter(*args, **kwargs):
+        async for chunk in read_chunk(*args, **kwargs):
+            reads.append(len(chunk))
+            yield chunk
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(201)
+
+    class CheckingTransport(RecordingTransport):
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            assert reads == []
+            return await super().handle_async_request(request)
+
+    monkeypatch.setattr(transfer, 'iter_file_with_progress', recording_iter)
+    upload(CheckingTransport(handler), package)
+    assert reads == [4, 4, 4, 4, 4]